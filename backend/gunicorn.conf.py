@@ -0,0 +1,88 @@
+"""
+Gunicorn configuration for the production serving mode
+Run with: gunicorn --config gunicorn.conf.py
+
+The app is loaded once in the master and forked into workers. Worker and
+thread counts are sized from the container's CPU and memory limits (see
+``soundvault_backend.server``), and can be overridden with WEB_CONCURRENCY
+and SERVER_THREADS. Workers are recycled after SERVER_MAX_REQUESTS requests
+(with jitter so they do not restart together). On SIGTERM, as sent by App
+Runner and ``docker stop``, the master stops accepting connections and gives
+in-flight requests SERVER_GRACEFUL_TIMEOUT seconds to finish.
+
+SERVER_MODE=asgi serves the ASGI app, with its native async catalog reads,
+on uvicorn workers; the default is the WSGI app on threaded workers.
+"""
+import os
+import shutil
+import tempfile
+
+# Imported as a module: gunicorn reads every top-level name as a setting,
+# and ``config`` is one of them
+import decouple
+
+from soundvault_backend import metrics
+from soundvault_backend.server import (
+    DEFAULT_WORKER_MEMORY_MB, available_cpus, available_memory, size_workers,
+)
+
+SERVER_MODE = decouple.config('SERVER_MODE', default='wsgi')
+_workers, _threads = size_workers(
+    available_cpus(),
+    available_memory(),
+    decouple.config('SERVER_WORKER_MEMORY_MB', default=DEFAULT_WORKER_MEMORY_MB, cast=int),
+)
+
+bind = f"0.0.0.0:{decouple.config('PORT', default='8000')}"
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'soundvault_backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'soundvault_backend.wsgi:application'
+    worker_class = 'gthread'
+workers = decouple.config('WEB_CONCURRENCY', default=_workers, cast=int)
+threads = decouple.config('SERVER_THREADS', default=_threads, cast=int)
+preload_app = True
+
+max_requests = decouple.config('SERVER_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = max_requests // 10
+timeout = decouple.config('SERVER_TIMEOUT', default=30, cast=int)
+graceful_timeout = decouple.config('SERVER_GRACEFUL_TIMEOUT', default=25, cast=int)
+keepalive = 5
+
+# Worker heartbeats on tmpfs: a slow container disk cannot stall them. Gunicorn
+# creates each heartbeat file there with mkstemp and unlinks it at once
+_TMPFS = '/dev/shm'  # nosec B108
+if os.path.isdir(_TMPFS):
+    worker_tmp_dir = _TMPFS
+accesslog = '-'
+errorlog = '-'
+
+# Metrics are per process; with several workers /metrics sums their files.
+# Without METRICS_MULTIPROC_DIR each start gets a private directory of its own
+# (mode 0700), removed again on exit
+_METRICS_TMP_DIR = None
+if workers > 1 and not decouple.config('METRICS_MULTIPROC_DIR', default=''):
+    _METRICS_TMP_DIR = tempfile.mkdtemp(prefix='soundvault-metrics-')
+    os.environ['METRICS_MULTIPROC_DIR'] = _METRICS_TMP_DIR
+
+
+def on_starting(server):
+    # Values of the previous run's workers would otherwise be summed in
+    directory = decouple.config('METRICS_MULTIPROC_DIR', default='')
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        metrics.clear_multiprocess_dir(directory)
+    server.log.info('Serving %s with %d workers x %d threads', SERVER_MODE, workers, threads)
+
+
+def pre_fork(server, worker):
+    # Connections opened while preloading must not be shared with the workers
+    from django.db import connections
+
+    connections.close_all()
+
+
+def on_exit(server):
+    if _METRICS_TMP_DIR:
+        shutil.rmtree(_METRICS_TMP_DIR, ignore_errors=True)
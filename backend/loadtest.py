@@ -0,0 +1,168 @@
+"""
+Local HTTP load test for the backend, standard library only.
+
+Load a running server:
+    python loadtest.py --url http://localhost:8000 --concurrency 32 --duration 15
+
+Compare ``runserver`` with the production server (``gunicorn.conf.py``); each
+is started on a free port, loaded with the same traffic and stopped with
+SIGTERM:
+    python loadtest.py --compare
+
+Every client thread keeps one connection open and requests the paths in
+turn until the duration is up. Run against a migrated database with data
+(``manage.py generate_dataset``); throttling and the response cache are
+switched off for the compared servers so every request does the real work.
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ('/api/sounds/', '/api/tags/', '/api/comments/')
+
+SERVERS = {
+    'runserver': lambda port: [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}'],
+    'gunicorn': lambda port: ['gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}'],
+}
+
+# Disable per-IP throttling and the response cache of the servers under test
+SERVER_ENV = {
+    'ANON_THROTTLE_RATE': '1000000/min',
+    'USER_THROTTLE_RATE': '1000000/min',
+    'RESPONSE_CACHE_ENABLED': 'False',
+    'REQUEST_TIMING_LOG_SAMPLE_RATE': '0',
+}
+
+
+def run_load(base_url, paths, concurrency, duration):
+    parts = urlsplit(base_url)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        done, failed = [], 0
+        number = index
+        while time.monotonic() < deadline:
+            path = paths[number % len(paths)]
+            number += 1
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                continue
+            done.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(done)
+            errors.append(failed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': sum(errors),
+        'throughput': count / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000 if count else 0.0,
+        'p95_ms': latencies[min(count - 1, int(count * 0.95))] * 1000 if count else 0.0,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with code {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', DEFAULT_PATHS[0])
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server did not answer on port {port} within {timeout}s')
+
+
+def compare(paths, concurrency, duration):
+    results = {}
+    for name, command in SERVERS.items():
+        port = free_port()
+        process = subprocess.Popen(
+            command(port), env={**os.environ, **SERVER_ENV},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(port, process)
+            print(f'{name}: loading for {duration}s with {concurrency} clients...', flush=True)
+            results[name] = run_load(f'http://127.0.0.1:{port}', paths, concurrency, duration)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return results
+
+
+def print_results(results):
+    print(f"{'server':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'requests':>10}{'errors':>8}")
+    for name, row in results.items():
+        print(
+            f"{name:<12}{row['throughput']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            f"{row['requests']:>10}{row['errors']:>8}"
+        )
+    if {'runserver', 'gunicorn'} <= results.keys() and results['runserver']['throughput']:
+        ratio = results['gunicorn']['throughput'] / results['runserver']['throughput']
+        print(f'gunicorn throughput: {ratio:.1f}x runserver')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to load')
+    parser.add_argument('--compare', action='store_true', help='Start and compare runserver and gunicorn')
+    parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds of load per server')
+    args = parser.parse_args()
+    paths = args.paths or list(DEFAULT_PATHS)
+
+    if args.compare:
+        results = compare(paths, args.concurrency, args.duration)
+    else:
+        results = {args.url: run_load(args.url, paths, args.concurrency, args.duration)}
+    print_results(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,11 +10,16 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Sound)
 class SoundAdmin(admin.ModelAdmin):
-    list_display = ['name', 'uploaded_by', 'created_at']
-    list_filter = ['created_at', 'tags']
+    list_display = [
+        'name', 'uploaded_by', 'created_at', 'favorite_count', 'comment_count', 'analysis_status'
+    ]
+    list_filter = ['created_at', 'tags', 'analysis_status']
     search_fields = ['name', 'description']
     filter_horizontal = ['tags']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'created_at', 'updated_at', 'favorite_count', 'comment_count',
+        'duration', 'bitrate', 'sample_rate', 'loudness', 'analysis_status',
+    ]
 
 
 @admin.register(Comment)
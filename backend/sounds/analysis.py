@@ -0,0 +1,128 @@
+"""
+Background audio analysis for uploaded sounds.
+
+When a sound is created with, or saved with a replaced, ``mp3_file``,
+``sounds.signals`` marks it pending and schedules it here once the
+transaction commits. The file is decoded in a ``ProcessPoolExecutor`` worker
+(``sounds.audio_analysis``) so the upload request never waits for it; the
+result is written back with a single ``UPDATE`` from the pool's callback
+thread. Jobs lost to a restart stay ``pending`` and are picked up by
+``manage.py analyze_sounds``.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import audio_analysis
+from .models import Sound
+from .response_cache import SOUND_LIST_SCOPE, bump_scopes, sound_scope
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def analysis_enabled():
+    return getattr(settings, 'SOUND_ANALYSIS_ENABLED', True)
+
+
+def get_executor():
+    """Return the shared worker pool, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: workers must not inherit the parent's DB connections or threads
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'SOUND_ANALYSIS_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def shutdown_executor(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def store_result(sound_id, mp3_name, result=None, error=None):
+    """
+    Save an analysis result, unless the file was replaced while it was being
+    analysed; the newer file has its own job queued.
+    """
+    if error is not None:
+        logger.warning('Audio analysis failed for sound %s: %s', sound_id, error)
+        values = {'analysis_status': Sound.AnalysisStatus.FAILED}
+    else:
+        values = dict(result, analysis_status=Sound.AnalysisStatus.DONE)
+    updated = Sound.objects.filter(pk=sound_id, mp3_file=mp3_name).update(**values)
+    if updated:
+        bump_scopes(SOUND_LIST_SCOPE, sound_scope(sound_id))
+    return bool(updated)
+
+
+def _job_done(sound_id, mp3_name, future):
+    try:
+        error = future.exception()
+        store_result(sound_id, mp3_name, None if error else future.result(), error)
+    except Exception:
+        logger.exception('Could not store audio analysis for sound %s', sound_id)
+    finally:
+        # Callbacks run on the pool's management thread, which owns its connection
+        connection.close()
+
+
+def schedule_analysis(sound):
+    """Queue ``sound.mp3_file`` for analysis after the current transaction commits."""
+    if not analysis_enabled() or not sound.mp3_file:
+        return
+    sound_id, mp3_name, path = sound.pk, sound.mp3_file.name, sound.mp3_file.path
+
+    def submit():
+        if getattr(settings, 'SOUND_ANALYSIS_EAGER', False):
+            analyze_now(sound_id, mp3_name, path)
+            return
+        future = get_executor().submit(audio_analysis.analyze_file, path)
+        future.add_done_callback(lambda done: _job_done(sound_id, mp3_name, done))
+
+    transaction.on_commit(submit)
+
+
+def analyze_now(sound_id, mp3_name, path):
+    """Analyse in the calling process; used by the eager mode."""
+    try:
+        result = audio_analysis.analyze_file(path)
+    except audio_analysis.AudioAnalysisError as exc:
+        return store_result(sound_id, mp3_name, error=exc)
+    return store_result(sound_id, mp3_name, result)
+
+
+def analyze_queryset(queryset):
+    """
+    Analyse every sound in ``queryset`` on the worker pool and wait for the
+    results. Returns ``(done, failed)`` counts.
+    """
+    # In id order, which sound_analysis_backlog_idx yields for the default backlog
+    sounds = list(queryset.exclude(mp3_file='').only('pk', 'mp3_file').order_by('pk'))
+    executor = get_executor()
+    futures = [
+        (sound.pk, sound.mp3_file.name, executor.submit(audio_analysis.analyze_file, sound.mp3_file.path))
+        for sound in sounds
+    ]
+    done = failed = 0
+    for sound_id, mp3_name, future in futures:
+        error = future.exception()
+        store_result(sound_id, mp3_name, None if error else future.result(), error)
+        if error:
+            failed += 1
+        else:
+            done += 1
+    return done, failed
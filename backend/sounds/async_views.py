@@ -0,0 +1,140 @@
+"""
+Native async read path for the catalog API under ASGI.
+
+The hot read endpoints (sound list and detail, tags, comments by sound and
+``/api/auth/me/``) are served by ``async_read_view``. It drives the regular
+viewsets, so querysets, filters, serializers, throttles, conditional GET and
+the response cache behave exactly as in the sync path, but rows are fetched
+with Django's async ORM (``AsyncReadMixin``) and access tokens are resolved
+by ``sounds.authentication.AsyncJWTAuthentication``. Shared-cache reads and
+writes (scope versions, cached responses, favorite IDs) go through the cache
+backend's ``aget``/``aset`` family. The throttles still use the sync cache
+API, so ``check_throttles`` runs in a thread via ``sync_to_async``. A worker
+therefore awaits the database, the cache and slow clients instead of
+blocking the event loop on any of them.
+
+Serializers run on fully prefetched rows and must not query. Writes and the
+browsable API on the same URLs fall through to the sync viewset.
+``soundvault_backend.asgi_urls`` mounts these views (``ASYNC_READ_API``).
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .authentication import AsyncJWTAuthentication
+from .favorites import aprime_favorite_sound_ids
+from .pagination import apaginate_page_number
+
+
+async def apaginate(paginator, queryset, request, view):
+    if paginator is None:
+        return None
+    if hasattr(paginator, 'apaginate_queryset'):
+        return await paginator.apaginate_queryset(queryset, request, view)
+    if isinstance(paginator, PageNumberPagination):
+        return await apaginate_page_number(paginator, queryset, request, view)
+    return await sync_to_async(paginator.paginate_queryset)(queryset, request, view)
+
+
+class AsyncReadMixin:
+    """
+    Async ``alist``/``aretrieve`` for a ``GenericAPIView``, mirroring
+    ``ListModelMixin``/``RetrieveModelMixin``. ``get_queryset`` must prefetch
+    everything the serializer reads.
+    """
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await apaginate(self.paginator, queryset, request, self)
+        await aprime_favorite_sound_ids(request)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([item async for item in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        await aprime_favorite_sound_ids(request)
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+
+def wants_browsable_api(request):
+    return request.GET.get('format') == 'api' or 'text/html' in request.headers.get('Accept', '')
+
+
+def async_read_view(view_class, async_actions, sync_view, **initkwargs):
+    """
+    Return an async view that serves ``async_actions`` (``{method: action}``)
+    through ``view_class``'s ``a<action>`` coroutine and hands every other
+    request to ``sync_view`` on a thread, as Django would.
+    """
+    async_actions = dict(async_actions)
+    if 'get' in async_actions:
+        async_actions.setdefault('head', async_actions['get'])
+    sync_handler = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        action = async_actions.get(request.method.lower())
+        if action is None or wants_browsable_api(request):
+            return await sync_handler(request, *args, **kwargs)
+        return await dispatch(view_class(**initkwargs), action, request, args, kwargs)
+
+    view.csrf_exempt = True
+    view.cls = view_class
+    view.initkwargs = initkwargs
+    return view
+
+
+async def dispatch(self, action, request, args, kwargs):
+    """``APIView.dispatch`` for one async action; only JSON is rendered."""
+    self.action = action
+    self.args, self.kwargs = args, kwargs
+    self.format_kwarg = None
+    self.headers = self.default_response_headers
+    authenticator = AsyncJWTAuthentication()
+    request = Request(
+        request,
+        parsers=self.get_parsers(),
+        authenticators=[authenticator],
+        negotiator=self.get_content_negotiator(),
+        parser_context=self.get_parser_context(request),
+    )
+    self.request = request
+    request.accepted_renderer = JSONRenderer()
+    request.accepted_media_type = JSONRenderer.media_type
+
+    try:
+        try:
+            user_auth = await authenticator.aauthenticate(request)
+        except Exception:
+            request._not_authenticated()
+            raise
+        if user_auth is None:
+            request._not_authenticated()
+        else:
+            request.user, request.auth = user_auth
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+        self.check_permissions(request)
+        # Throttle counters live in the shared cache
+        await sync_to_async(self.check_throttles)(request)
+        response = await getattr(self, f'a{action}')(request, *args, **kwargs)
+    except Exception as exc:
+        response = self.handle_exception(exc)
+
+    response = self.finalize_response(request, response, *args, **kwargs)
+    return response.render()
@@ -0,0 +1,290 @@
+"""
+Audio decoding and feature extraction for uploaded sounds.
+
+This module runs inside ``ProcessPoolExecutor`` workers (see
+``sounds.analysis``), so it must not import Django or touch the database:
+it takes a file path and returns plain values. Decoding is delegated to
+``ffprobe``/``ffmpeg``; everything computed from the samples is vectorized
+NumPy.
+
+Uploads can run for hours, so the decoded signal is never held in full.
+``decode_blocks`` reads ffmpeg's output in ``DECODE_BLOCK_BYTES`` blocks, and
+``PeakAccumulator`` and ``LoudnessAccumulator`` fold each block in as it
+arrives, in memory bounded by the number of peak buckets and one loudness
+block.
+"""
+import hashlib
+import json
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# 512 Ki samples of 16-bit mono PCM per read from ffmpeg
+DECODE_BLOCK_BYTES = 1024 * 1024
+ANALYSIS_SAMPLE_RATE = 22050
+PEAK_BUCKETS = 512
+# Running maxima kept per peak bucket before neighbours are merged
+PEAK_RESOLUTION = 256
+LOUDNESS_BLOCK_SECONDS = 0.4
+LOUDNESS_GATE_DB = -70.0
+SILENCE_DB = -100.0
+
+
+class AudioAnalysisError(Exception):
+    """Raised when a file cannot be probed or decoded."""
+
+
+def _executable(name):
+    executable = shutil.which(name)
+    if executable is None:
+        raise AudioAnalysisError(f'{name} is not installed')
+    return executable
+
+
+def _run(command):
+    result = subprocess.run(
+        [_executable(command[0]), *command[1:]], capture_output=True, check=False
+    )
+    if result.returncode != 0:
+        raise AudioAnalysisError(result.stderr.decode(errors='replace').strip() or command[0])
+    return result.stdout
+
+
+def file_sha256(path):
+    """Hex SHA-256 of the file at ``path``, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def probe(path):
+    """Return ``(duration, bitrate, sample_rate)`` as reported by ffprobe."""
+    output = _run([
+        'ffprobe', '-v', 'error', '-select_streams', 'a:0',
+        '-show_entries', 'stream=sample_rate,bit_rate,duration:format=duration,bit_rate',
+        '-of', 'json', path,
+    ])
+    info = json.loads(output or b'{}')
+    streams = info.get('streams') or [{}]
+    stream, container = streams[0], info.get('format', {})
+
+    def first_number(key, cast):
+        for source in (stream, container):
+            try:
+                return cast(float(source[key]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return None
+
+    return first_number('duration', float), first_number('bit_rate', int), first_number('sample_rate', int)
+
+
+def decode_blocks(path, sample_rate=ANALYSIS_SAMPLE_RATE, block_bytes=DECODE_BLOCK_BYTES):
+    """
+    Decode ``path`` with ffmpeg and yield mono float32 samples in [-1, 1] at
+    ``sample_rate``, one block of at most ``block_bytes // 2`` samples at a time.
+    """
+    # stderr goes to a file: a full pipe nobody reads would stall ffmpeg
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [_executable('ffmpeg'), '-v', 'error', '-nostdin', '-i', path,
+             '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-'],
+            stdout=subprocess.PIPE, stderr=stderr,
+        )
+        try:
+            carry = b''
+            while raw := process.stdout.read(block_bytes):
+                raw = carry + raw
+                usable = len(raw) - len(raw) % 2
+                carry = raw[usable:]
+                if usable:
+                    yield np.frombuffer(raw[:usable], dtype='<i2').astype(np.float32) / 32768.0
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise AudioAnalysisError(stderr.read().decode(errors='replace').strip() or 'ffmpeg')
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+class PeakAccumulator:
+    """
+    Waveform peaks of a signal of unknown length, fed block by block.
+
+    Keeps the running maximum of every ``stride`` samples. Once there are more
+    than ``buckets * resolution * 2`` of them, neighbours are merged and the
+    stride doubles, so memory stays bounded. Until the first merge the result
+    is exactly ``compute_peaks`` of the whole signal; after it, bucket edges
+    move by less than one stride.
+    """
+
+    def __init__(self, buckets=PEAK_BUCKETS, resolution=PEAK_RESOLUTION):
+        self.buckets = buckets
+        self.limit = max(buckets * resolution * 2, 2)
+        self.stride = 1
+        self.maxima = []
+        self.size = 0
+        # Maximum and length of the stride still being filled
+        self.partial_max = 0.0
+        self.partial_count = 0
+        self.count = 0
+
+    def add(self, samples):
+        magnitudes = np.abs(samples)
+        self.count += magnitudes.size
+        if self.partial_count:
+            take = min(self.stride - self.partial_count, magnitudes.size)
+            if take:
+                self.partial_max = max(self.partial_max, float(magnitudes[:take].max()))
+                self.partial_count += take
+                magnitudes = magnitudes[take:]
+            if self.partial_count == self.stride:
+                self.append(np.array([self.partial_max], np.float32))
+                self.partial_max, self.partial_count = 0.0, 0
+        usable = magnitudes.size - magnitudes.size % self.stride
+        if usable:
+            self.append(magnitudes[:usable].reshape(-1, self.stride).max(axis=1))
+        if magnitudes.size > usable:
+            self.partial_max = float(magnitudes[usable:].max())
+            self.partial_count = magnitudes.size - usable
+        while self.size > self.limit:
+            self.merge()
+
+    def append(self, maxima):
+        self.maxima.append(maxima)
+        self.size += maxima.size
+
+    def merge(self):
+        maxima = np.concatenate(self.maxima)
+        if maxima.size % 2:
+            # The odd stride out starts the next, wider one
+            self.partial_max = max(self.partial_max, float(maxima[-1]))
+            self.partial_count += self.stride
+            maxima = maxima[:-1]
+        merged = maxima.reshape(-1, 2).max(axis=1)
+        self.stride *= 2
+        self.maxima = [merged]
+        self.size = merged.size
+
+    def result(self):
+        """Peaks scaled to 0-255, one unsigned byte per bucket."""
+        parts = list(self.maxima)
+        if self.partial_count:
+            parts.append(np.array([self.partial_max], np.float32))
+        if not parts:
+            return b''
+        magnitudes = np.concatenate(parts)
+        buckets = min(self.buckets, magnitudes.size)
+        starts = np.linspace(0, magnitudes.size, buckets, endpoint=False).astype(np.intp)
+        peaks = np.maximum.reduceat(magnitudes, starts)
+        loudest = peaks.max()
+        if loudest > 0:
+            peaks = peaks / loudest
+        return np.round(peaks * 255).astype(np.uint8).tobytes()
+
+
+class LoudnessAccumulator:
+    """
+    Gated RMS loudness in dBFS, fed block by block: mean power of 400 ms
+    blocks above an absolute -70 dB gate, in the spirit of EBU R128 without
+    K-weighting. A signal shorter than one block is measured as a whole.
+    """
+
+    def __init__(self, sample_rate=ANALYSIS_SAMPLE_RATE):
+        self.block = max(int(sample_rate * LOUDNESS_BLOCK_SECONDS), 1)
+        self.pending = np.zeros(0, np.float32)
+        self.blocks = 0
+        self.gated_power = 0.0
+        self.gated_blocks = 0
+
+    def add(self, samples):
+        if self.pending.size:
+            samples = np.concatenate([self.pending, samples])
+        usable = samples.size - samples.size % self.block
+        if usable:
+            self.gate(samples[:usable].reshape(-1, self.block))
+        self.pending = samples[usable:]
+
+    def gate(self, blocks):
+        power = np.mean(np.square(blocks, dtype=np.float64), axis=1)
+        self.blocks += power.size
+        with np.errstate(divide='ignore'):
+            levels = 10 * np.log10(power)
+        gated = power[levels > LOUDNESS_GATE_DB]
+        self.gated_power += float(gated.sum())
+        self.gated_blocks += gated.size
+
+    def result(self):
+        if not self.blocks and self.pending.size:
+            self.gate(self.pending[np.newaxis, :])
+        if not self.gated_blocks:
+            return SILENCE_DB
+        return round(float(10 * np.log10(self.gated_power / self.gated_blocks)), 2)
+
+
+def compute_peaks(samples, buckets=PEAK_BUCKETS):
+    """
+    Downsample ``samples`` to ``buckets`` absolute peaks scaled to 0-255 and
+    return them as bytes (one unsigned byte per bucket).
+    """
+    peaks = PeakAccumulator(buckets)
+    peaks.add(samples)
+    return peaks.result()
+
+
+def compute_loudness(samples, sample_rate=ANALYSIS_SAMPLE_RATE):
+    """Gated RMS loudness of ``samples`` in dBFS; see ``LoudnessAccumulator``."""
+    loudness = LoudnessAccumulator(sample_rate)
+    loudness.add(samples)
+    return loudness.result()
+
+
+def analyze_file(path):
+    """Probe and decode ``path``; return the fields stored on ``Sound``."""
+    duration, bitrate, sample_rate = probe(path)
+    peaks = PeakAccumulator()
+    loudness = LoudnessAccumulator()
+    for samples in decode_blocks(path):
+        peaks.add(samples)
+        loudness.add(samples)
+    if duration is None:
+        duration = peaks.count / ANALYSIS_SAMPLE_RATE
+    return {
+        'content_hash': file_sha256(path),
+        'duration': round(duration, 3),
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'loudness': loudness.result(),
+        'waveform_peaks': peaks.result(),
+    }
+
+
+def inspect_file(path):
+    """
+    Hash and probe ``path`` without decoding it; used by bulk imports.
+    Probe failures (or a missing ffprobe) leave the metadata empty; an
+    unreadable file is reported as ``{'path': ..., 'error': ...}``.
+    """
+    try:
+        content_hash = file_sha256(path)
+    except OSError as exc:
+        return {'path': path, 'error': str(exc)}
+    try:
+        duration, bitrate, sample_rate = probe(path)
+    except AudioAnalysisError:
+        duration = bitrate = sample_rate = None
+    return {
+        'path': path,
+        'content_hash': content_hash,
+        'duration': duration,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+    }
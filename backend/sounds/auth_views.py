@@ -2,21 +2,26 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.contrib.auth import authenticate, password_validation
+from django.contrib.auth import password_validation
+from django.contrib.auth.signals import user_login_failed
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
-from rest_framework.throttling import SimpleRateThrottle
 from django.core.exceptions import ValidationError
 from django.conf import settings
 
+from .authentication import ClaimsRefreshToken
+from .passwords import HashingBusy, hash_password, verify_password
+from .throttling import SlidingWindowRateThrottle
 
-class LoginRateThrottle(SimpleRateThrottle):
+
+class LoginRateThrottle(SlidingWindowRateThrottle):
     """
     Limit login attempts per client IP to slow down brute-force attacks.
+    Refuses logins while the throttle counters are unavailable.
     """
 
     scope = 'login'
+    fail_open = False
 
     def get_cache_key(self, request, view):
         return self.cache_format % {
@@ -25,6 +30,14 @@ class LoginRateThrottle(SimpleRateThrottle):
         }
 
 
+def hashing_busy(exc):
+    return Response(
+        {'error': 'Too many sign-ins in progress. Please retry shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(exc.retry_after)},
+    )
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -80,13 +93,20 @@ def register(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    user = User.objects.create_user(
-        username=username,
-        email=email,
-        password=password
+    try:
+        encoded = hash_password(password)
+    except HashingBusy as exc:
+        return hashing_busy(exc)
+
+    # create_user without hashing again on the request thread
+    user = User(
+        username=User.normalize_username(username),
+        email=User.objects.normalize_email(email),
+        password=encoded,
     )
+    user.save()
 
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsRefreshToken.for_user(user)
     
     return Response({
         'user': {
@@ -128,18 +148,16 @@ def login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Try to authenticate by username first, then by email
-    user = None
+    # One query by email or username; the password is checked on the hashing pool
+    field = 'email' if '@' in username_or_email else 'username'
+    user = User.objects.filter(**{field: username_or_email}).first()
     try:
-        if '@' in username_or_email:
-            user = User.objects.get(email=username_or_email)
-            user = authenticate(username=user.username, password=password)
-        else:
-            user = authenticate(username=username_or_email, password=password)
-    except User.DoesNotExist:
-        pass
-
-    if user is None:
+        valid = verify_password(user, password)
+    except HashingBusy as exc:
+        return hashing_busy(exc)
+
+    if not valid:
+        user_login_failed.send(sender=__name__, credentials={field: username_or_email}, request=request)
         return Response(
             {'error': 'Invalid credentials.'},
             status=status.HTTP_401_UNAUTHORIZED
@@ -151,7 +169,7 @@ def login(request):
             status=status.HTTP_401_UNAUTHORIZED
         )
 
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsRefreshToken.for_user(user)
     
     return Response({
         'user': {
@@ -186,7 +204,7 @@ def logout(request):
         )
 
     try:
-        token = RefreshToken(refresh_token)
+        token = ClaimsRefreshToken(refresh_token)
         token.blacklist()
         return Response(
             {'message': 'Successfully logged out.'},
@@ -206,9 +224,20 @@ def me(request):
     Get current user information
     GET /api/auth/me/
     """
-    return Response({
-        'id': request.user.id,
-        'username': request.user.username,
-        'email': request.user.email,
-        'isAdmin': request.user.is_staff,
-    })
+    return Response(user_payload(request.user))
+
+
+def user_payload(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'isAdmin': user.is_staff,
+    }
+
+
+class AsyncMeView(me.cls):
+    """``me`` for the async read path (sounds.async_views)."""
+
+    async def aget(self, request):
+        return Response(user_payload(request.user))
@@ -0,0 +1,318 @@
+"""
+Stateless JWT authentication.
+
+Tokens issued by ``ClaimsRefreshToken.for_user`` (``register``/``login``)
+carry ``username`` and ``is_staff`` next to the user id, and refreshed
+access tokens copy them. ``StatelessJWTAuthentication`` builds
+``request.user`` from those claims (``ClaimsUser``) instead of loading the
+``User`` row for every request. Any other attribute, and model code that
+needs a real ``User`` (foreign keys, ``==``), gets the full row lazily.
+
+Revocation is still honored. The token is checked against the user's row,
+which each process keeps for ``JWT_USER_CACHE_TTL`` seconds. A deleted,
+deactivated or demoted user, or a password change (simplejwt's
+``CHECK_REVOKE_TOKEN`` claim), locks out existing tokens within the TTL.
+The process that saved the change forgets the row at once. A TTL of 0
+disables the cache: the row is then read on every request, as with
+``JWTAuthentication``. A login that only rehashes the same password
+(``sounds.passwords.verify_password``) is not a password change: the shared
+cache maps the old and new revoke claims to each other for the lifetime of
+a refresh token, and refreshing stamps the current claim.
+
+Refreshing (``ClaimsTokenRefreshSerializer``) checks the refresh token the
+same way, and looks it up in the blacklist through the Bloom filter of
+``sounds.token_blacklist``.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch, get_md5_hash_password
+
+from soundvault_backend.security_log import security_event
+
+from .token_blacklist import is_blacklisted, remember_blacklisted, schedule_pruning
+
+# User fields copied into tokens; a token whose claims no longer match the row is rejected
+USER_CLAIMS = ('username', 'is_staff')
+MAX_CACHED_USERS = 10000
+UPGRADED_CLAIM_KEY = 'jwt:upgraded-password:{user_id}:{claim}'
+
+_users = OrderedDict()
+_lock = threading.Lock()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token carrying ``USER_CLAIMS``; its access tokens inherit them.
+    Blacklist checks skip the database when the filter rules the token out,
+    and the user row comes from this process's cache.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self[jwt_settings.JTI_CLAIM], self['exp']):
+            # A rotated refresh token used again may have been stolen
+            security_event(
+                'refresh_token_reused', username=self.get('username'),
+                user_id=self.get(jwt_settings.USER_ID_CLAIM), jti=self[jwt_settings.JTI_CLAIM],
+            )
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self, user=None):
+        jti = self[jwt_settings.JTI_CLAIM]
+        # Into the filter first: it must never miss a blacklisted token
+        remember_blacklisted(jti, self['exp'])
+        token = OutstandingToken.objects.filter(jti=jti).first() or self.outstand(user)[0]
+        return BlacklistedToken.objects.get_or_create(token=token)
+
+    def outstand(self, user=None):
+        return OutstandingToken.objects.get_or_create(
+            jti=self[jwt_settings.JTI_CLAIM], defaults=self._outstanding_fields(user),
+        )
+
+    def _outstanding_fields(self, user):
+        user_id = self.get(jwt_settings.USER_ID_CLAIM)
+        if user is None and user_id is not None:
+            user = get_cached_user(str(user_id))
+        return {
+            'user': user,
+            'created_at': self.current_time,
+            'token': str(self),
+            'expires_at': datetime_from_epoch(self['exp']),
+        }
+
+
+def _upgraded_claim_key(user_id, claim):
+    return UPGRADED_CLAIM_KEY.format(user_id=user_id, claim=claim)
+
+
+def remember_password_upgrade(user, previous_hash):
+    """
+    Keep ``user``'s tokens valid after ``previous_hash`` was replaced by a new
+    hash of the same password. Each revoke claim stands in for the other, so
+    processes still caching the old row also accept tokens issued from now on.
+    """
+    previous = get_md5_hash_password(previous_hash)
+    current = get_md5_hash_password(user.password)
+    cache.set_many(
+        {
+            _upgraded_claim_key(user.pk, previous): current,
+            _upgraded_claim_key(user.pk, current): previous,
+        },
+        int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+    )
+
+
+def _cache_ttl():
+    return getattr(settings, 'JWT_USER_CACHE_TTL', 0)
+
+
+def _cached(user_id):
+    with _lock:
+        entry = _users.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return True, entry[1]
+    return False, None
+
+
+def _remember(user_id, user):
+    ttl = _cache_ttl()
+    if ttl <= 0:
+        return
+    with _lock:
+        _users[user_id] = (time.monotonic() + ttl, user)
+        _users.move_to_end(user_id)
+        while len(_users) > MAX_CACHED_USERS:
+            _users.popitem(last=False)
+
+
+def _user_lookup(user_id):
+    return get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id})
+
+
+def get_cached_user(user_id):
+    """Return the user row (None if deleted), from this process's cache when fresh."""
+    hit, user = _cached(user_id)
+    if not hit:
+        user = _user_lookup(user_id).first()
+        _remember(user_id, user)
+    return user
+
+
+async def aget_cached_user(user_id):
+    hit, user = _cached(user_id)
+    if not hit:
+        user = await _user_lookup(user_id).afirst()
+        _remember(user_id, user)
+    return user
+
+
+def forget_user(user_id):
+    with _lock:
+        _users.pop(str(user_id), None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    ``request.user`` answered from token claims. Anything the claims do not
+    cover is read from a private copy of the full ``User`` row.
+    """
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token, load_user):
+        self.__dict__['token'] = token
+        super().__init__(load_user)
+
+    @property
+    def pk(self):
+        return get_user_model()._meta.pk.to_python(self.token[jwt_settings.USER_ID_CLAIM])
+
+    id = pk
+
+    @property
+    def username(self):
+        return self._claim('username')
+
+    @property
+    def is_staff(self):
+        return self._claim('is_staff')
+
+    def _claim(self, name):
+        if name in self.token:
+            return self.token[name]
+        # Tokens issued without claims fall back to the row
+        return getattr(self._full_user(), name)
+
+    def _full_user(self):
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` returning a ``ClaimsUser`` checked against the cached row."""
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        return self.claims_user(validated_token, get_cached_user(user_id))
+
+    def get_user_id(self, validated_token):
+        try:
+            return str(validated_token[jwt_settings.USER_ID_CLAIM])
+        except KeyError as exc:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from exc
+
+    def revoke_claim(self, validated_token, user):
+        """The token's revoke claim, carried across a rehash of the same password."""
+        claim = validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM)
+        if user is None or claim is None or claim == get_md5_hash_password(user.password):
+            return claim
+        return cache.get(_upgraded_claim_key(user.pk, claim), claim)
+
+    async def arevoke_claim(self, validated_token, user):
+        claim = validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM)
+        if user is None or claim is None or claim == get_md5_hash_password(user.password):
+            return claim
+        return await cache.aget(_upgraded_claim_key(user.pk, claim), claim)
+
+    def claims_user(self, validated_token, user, revoke_claim=None):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if revoke_claim is None:
+                revoke_claim = self.revoke_claim(validated_token, user)
+            if revoke_claim != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        if any(claim in validated_token and validated_token[claim] != getattr(user, claim)
+               for claim in USER_CLAIMS):
+            raise AuthenticationFailed(_('Token is out of date; log in again.'), code='token_outdated')
+        # The cached row is shared between requests; each request gets its own copy
+        return ClaimsUser(validated_token, lambda: copy.copy(user))
+
+
+class AsyncJWTAuthentication(StatelessJWTAuthentication):
+    """``StatelessJWTAuthentication`` for async views (see ``sounds.async_views``)."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        revoke_claim = None
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            # Resolved here so the check does not read the cache on the event loop
+            revoke_claim = await self.arevoke_claim(validated_token, user)
+        return self.claims_user(validated_token, user, revoke_claim)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    ``TokenRefreshSerializer`` for ``ClaimsRefreshToken``. The user is checked
+    as for an access token, from the cached row, and passed on so rotating
+    the token does not load it again. Refreshes also schedule the pruning of
+    expired tokens.
+    """
+
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = None
+        if jwt_settings.USER_ID_CLAIM in refresh:
+            authentication = StatelessJWTAuthentication()
+            user = get_cached_user(authentication.get_user_id(refresh))
+            authentication.claims_user(refresh, user)
+            if jwt_settings.CHECK_REVOKE_TOKEN and user is not None:
+                # A claim accepted across a hash upgrade is replaced by the current one
+                refresh[jwt_settings.REVOKE_TOKEN_CLAIM] = get_md5_hash_password(user.password)
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist(user)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            # A fresh jti: insert without looking it up first
+            OutstandingToken.objects.create(
+                jti=refresh[jwt_settings.JTI_CLAIM], **refresh._outstanding_fields(user),
+            )
+            data['refresh'] = str(refresh)
+            schedule_pruning()
+        return data
@@ -0,0 +1,142 @@
+"""
+API benchmark scenarios and baseline comparison.
+
+Each scenario issues one request through the real URLconf with DRF's
+``APIClient``. ``run_benchmarks`` records p50/p95 latency, SQL query count
+and response size per scenario; ``compare_results`` checks a run against a
+saved baseline. Driven by ``manage.py benchmark_api``.
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import Favorite, Sound, Tag
+
+
+BENCHMARK_PASSWORD = 'benchmark-password-123'
+FAVORITES_PER_USER = 20
+
+# Latency changes smaller than this are noise, whatever the relative change
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+def prepare_context():
+    """
+    Pick realistic targets from the current data and create a benchmark user
+    with some favorites. Call inside a transaction that is rolled back.
+    """
+    sound = Sound.objects.order_by('-comment_count', 'pk').first()
+    if sound is None:
+        raise ValueError('No sounds to benchmark; generate a dataset first')
+    tag = Tag.objects.annotate(uses=Count('sounds')).order_by('-uses', 'pk').first()
+    user = User.objects.create_user(
+        username=f'benchmark-{time.time_ns()}', password=BENCHMARK_PASSWORD
+    )
+    popular = Sound.objects.order_by('-favorite_count', 'pk')[:FAVORITES_PER_USER]
+    Favorite.objects.bulk_create([Favorite(user=user, sound=item) for item in popular])
+
+    client = APIClient()
+    tokens = client.post(
+        '/api/auth/login/', {'username': user.username, 'password': BENCHMARK_PASSWORD}
+    ).data['tokens']
+    return {
+        'sound_id': sound.pk,
+        'search': sound.name.split()[0],
+        'tag': tag.name if tag else '',
+        'username': user.username,
+        'access': tokens['access'],
+        'refresh': tokens['refresh'],
+    }
+
+
+def _authenticated(ctx):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {ctx['access']}")
+    return client
+
+
+def _refresh(client, ctx):
+    response = client.post('/api/auth/token/refresh/', {'refresh': ctx['refresh']})
+    # Refresh tokens rotate; the next call must use the new one
+    ctx['refresh'] = response.data.get('refresh', ctx['refresh'])
+    return response
+
+
+# name -> callable(client, ctx) returning the response
+SCENARIOS = {
+    'sound_list': lambda client, ctx: client.get('/api/sounds/'),
+    'sound_search': lambda client, ctx: client.get('/api/sounds/', {'search': ctx['search']}),
+    'sound_tag_filter': lambda client, ctx: client.get('/api/sounds/', {'tag': ctx['tag']}),
+    'sound_detail': lambda client, ctx: client.get(f"/api/sounds/{ctx['sound_id']}/"),
+    'comment_list': lambda client, ctx: client.get('/api/comments/', {'sound': ctx['sound_id']}),
+    'favorite_list': lambda client, ctx: _authenticated(ctx).get('/api/favorites/'),
+    'login': lambda client, ctx: client.post(
+        '/api/auth/login/', {'username': ctx['username'], 'password': BENCHMARK_PASSWORD}
+    ),
+    'token_refresh': _refresh,
+}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def measure(scenario, ctx, repeat, warmup=1):
+    client = APIClient()
+    for _ in range(warmup):
+        scenario(client, ctx)
+    timings = []
+    queries = size = status = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario(client, ctx)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = len(captured.captured_queries)
+        size = len(response.content)
+        status = response.status_code
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': queries,
+        'bytes': size,
+        'status': status,
+    }
+
+
+def run_benchmarks(ctx, repeat=20, warmup=1, names=None):
+    return {
+        name: measure(scenario, ctx, repeat, warmup)
+        for name, scenario in SCENARIOS.items()
+        if not names or name in names
+    }
+
+
+def compare_results(baseline, current, threshold=0.25):
+    """
+    Return a list of human-readable regressions of ``current`` against
+    ``baseline``. Latency and size regress when they grow by more than
+    ``threshold`` (a fraction); any extra SQL query is a regression.
+    """
+    regressions = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if now['status'] != before['status']:
+            regressions.append(f"{name}: status {before['status']} -> {now['status']}")
+        if now['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {now['queries']}")
+        for key in ('p50_ms', 'p95_ms'):
+            limit = max(before[key] * (1 + threshold), before[key] + MIN_LATENCY_DELTA_MS)
+            if now[key] > limit:
+                regressions.append(f'{name}: {key} {before[key]:.2f} -> {now[key]:.2f}')
+        if now['bytes'] > before['bytes'] * (1 + threshold):
+            regressions.append(f"{name}: bytes {before['bytes']} -> {now['bytes']}")
+    return regressions
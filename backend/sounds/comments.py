@@ -0,0 +1,58 @@
+"""
+Loading the latest comments of sounds.
+
+``latest_comments_queryset`` numbers each sound's comments newest first with
+``ROW_NUMBER() OVER (PARTITION BY sound_id ...)`` and keeps the first
+``limit``, with the authors joined. The latest comments of any number of
+sounds therefore take one query, and each partition is read in the order of
+the ``(sound, -created_at, -id)`` index. ``latest_comments`` returns them per
+sound; ``prefetch_latest_comments`` sets them on every sound of a queryset as
+``recent_comments``, which ``SoundDetailSerializer`` renders.
+
+``sound_comments`` is the queryset behind ``/api/sounds/<id>/comments/``:
+keyset pages over ``(created_at, id)`` within one sound, on the same index.
+"""
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+from .models import Comment
+
+RECENT_COMMENTS = 10
+NEWEST_FIRST = ('-created_at', '-id')
+
+
+def sound_comments(sound_id):
+    """A sound's comments with their authors, newest first."""
+    return Comment.objects.filter(sound_id=sound_id).select_related('user').order_by(*NEWEST_FIRST)
+
+
+def latest_comments_queryset(limit=RECENT_COMMENTS, sound_ids=None):
+    """The ``limit`` newest comments of each sound (of ``sound_ids``, if given)."""
+    queryset = Comment.objects.select_related('user')
+    if sound_ids is not None:
+        queryset = queryset.filter(sound_id__in=sound_ids)
+    return (
+        queryset
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=F('sound_id'),
+            order_by=[F('created_at').desc(), F('id').desc()],
+        ))
+        .filter(position__lte=limit)
+        .order_by('sound_id', *NEWEST_FIRST)
+    )
+
+
+def latest_comments(sound_ids, limit=RECENT_COMMENTS):
+    """Return ``{sound_id: [comment, ...]}``, newest first, for every id in ``sound_ids``."""
+    sound_ids = list(sound_ids)
+    comments = {sound_id: [] for sound_id in sound_ids}
+    if sound_ids:
+        for comment in latest_comments_queryset(limit, sound_ids):
+            comments[comment.sound_id].append(comment)
+    return comments
+
+
+def prefetch_latest_comments(limit=RECENT_COMMENTS, to_attr='recent_comments'):
+    """``Prefetch`` setting the ``limit`` newest comments on each sound as ``to_attr``."""
+    return Prefetch('comments', queryset=latest_comments_queryset(limit), to_attr=to_attr)
@@ -0,0 +1,183 @@
+"""
+Concurrency benchmark of the catalog reads: sync WSGI versus native async ASGI.
+
+Both deployments are driven in-process with the same closed-loop load:
+``clients`` concurrent clients each issue ``requests`` GETs in turn. Every
+client is slow to read its response (``client_delay`` seconds per body), as
+on a mobile link. Under WSGI the worker thread that produced the response is
+held until the client has drained it, so at most ``threads`` clients make
+progress at once. Under ASGI the event loop awaits the slow ``send`` and
+serves other clients meanwhile. Driven by ``manage.py benchmark_concurrency``.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from io import BytesIO
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .benchmarks import percentile
+from .models import Sound, Tag
+
+HOST = 'testserver'
+
+
+def build_targets():
+    """Return ``[(name, path, headers)]`` for the async-served reads, from the current data."""
+    sound = Sound.objects.select_related('uploaded_by').order_by('-comment_count', 'pk').first()
+    if sound is None:
+        raise ValueError('No sounds to benchmark; generate a dataset first')
+    tag = Tag.objects.annotate(uses=Count('sounds')).order_by('-uses', 'pk').first()
+    # An access token needs no database write, unlike a login
+    auth = {'Authorization': f'Bearer {AccessToken.for_user(sound.uploaded_by)}'}
+    return [
+        ('sound_list', '/api/sounds/', {}),
+        ('sound_list_auth', '/api/sounds/', auth),
+        ('sound_tag_filter', f"/api/sounds/?tag={tag.name if tag else ''}", {}),
+        ('sound_detail', f'/api/sounds/{sound.pk}/', {}),
+        ('tag_list', '/api/tags/', {}),
+        ('comment_list', f'/api/comments/?sound={sound.pk}', {}),
+        ('me', '/api/auth/me/', auth),
+    ]
+
+
+def summarize(latencies, statuses, seconds):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for code in statuses if code != 200),
+        'seconds': round(seconds, 3),
+        'throughput': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+    }
+
+
+def _wsgi_environ(path, headers):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': HOST,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    return environ
+
+
+def run_wsgi(targets, clients, requests, threads, client_delay):
+    """One sync worker with ``threads`` request threads, with the regular URLconf."""
+    handler = WSGIHandler()
+    worker_threads = threading.BoundedSemaphore(threads)
+    latencies, statuses = [], []
+    lock = threading.Lock()
+
+    def serve(path, headers):
+        status = []
+        body = handler(_wsgi_environ(path, headers), lambda line, response_headers, exc_info=None: status.append(line))
+        try:
+            for _ in body:
+                pass
+            # The thread stays busy writing until the slow client has read the body
+            time.sleep(client_delay)
+        finally:
+            body.close()
+        return int(status[0][:3])
+
+    def client(index):
+        for number in range(requests):
+            _, path, headers = targets[(index + number) % len(targets)]
+            start = time.perf_counter()
+            with worker_threads:
+                code = serve(path, headers)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                statuses.append(code)
+
+    with override_settings(ROOT_URLCONF='soundvault_backend.urls'):
+        started = time.perf_counter()
+        pool = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def _asgi_request(application, path, headers, client_delay):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode())] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    sent_request = False
+    status = []
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected until the response is complete
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            await asyncio.sleep(client_delay)
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(targets, clients, requests, client_delay):
+    """One ASGI worker on a single event loop, with the async read URLconf."""
+
+    async def main():
+        application = ASGIHandler()
+        latencies, statuses = [], []
+
+        async def client(index):
+            for number in range(requests):
+                _, path, headers = targets[(index + number) % len(targets)]
+                start = time.perf_counter()
+                statuses.append(await _asgi_request(application, path, headers, client_delay))
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(index) for index in range(clients)))
+        return summarize(latencies, statuses, time.perf_counter() - started)
+
+    with override_settings(ROOT_URLCONF='soundvault_backend.asgi_urls'):
+        return asyncio.run(main())
@@ -0,0 +1,165 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304) for catalog viewsets.
+
+Validators are built from the response-cache scope versions (see
+``sounds.response_cache``), which change on every write that affects a
+response, including counter and comment updates that do not touch
+``Sound.updated_at``. Lists are versioned by their scopes alone, so a list
+request never counts or aggregates its rows; a detail response also folds in
+one ``values()`` row of its object. A matching ``If-None-Match`` or
+``If-Modified-Since`` returns 304 before any serializer runs. The async path
+reads both the row and the scope versions without blocking the event loop.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .response_cache import aget_scope_versions, get_scope_versions
+
+
+class ConditionalGetMixin:
+    """
+    Emit strong validators for ``list`` and ``retrieve``.
+
+    Views configure:
+    - ``get_cache_scopes()``: scopes whose versions are folded in
+    - ``object_validator_fields``: per-object fields that act as a version
+    - ``last_modified_key``: which of those values is a datetime
+    """
+    object_validator_fields = ()
+    last_modified_key = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional_response(request, super().alist, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(request, super().aretrieve, *args, **kwargs)
+
+    def validator_state_query(self):
+        """
+        Return the ``values()`` queryset whose first row versions an object,
+        or None when there is nothing to version.
+        """
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if lookup is None:
+            return None
+        return (
+            self.get_queryset()
+            .filter(**{self.lookup_field: lookup})
+            .values(*self.object_validator_fields)
+        )
+
+    def get_validator_state(self):
+        """Return a dict of values that change whenever the response does."""
+        if self.action == 'list':
+            # Every write that changes a list bumps its scopes
+            return {}
+        try:
+            queryset = self.validator_state_query()
+            return None if queryset is None else queryset.first()
+        except (TypeError, ValueError):
+            return None
+
+    async def aget_validator_state(self):
+        if self.action == 'list':
+            return {}
+        try:
+            queryset = self.validator_state_query()
+            return None if queryset is None else await queryset.afirst()
+        except (TypeError, ValueError):
+            return None
+
+    def get_validators(self, request, state=None):
+        scopes = self.get_cache_scopes()
+        if state is None:
+            state = self.get_validator_state()
+        if scopes is None or state is None:
+            return None, None
+        return self.build_validators(request, state, get_scope_versions(scopes))
+
+    async def aget_validators(self, request):
+        scopes = self.get_cache_scopes()
+        if scopes is None:
+            return None, None
+        state = await self.aget_validator_state()
+        if state is None:
+            return None, None
+        return self.build_validators(request, state, await aget_scope_versions(scopes))
+
+    def build_validators(self, request, state, versions):
+        auth_state = f'user:{request.user.pk}' if request.user.is_authenticated else 'anon'
+        # Same origin parts as the response cache key: bodies hold absolute URLs
+        parts = [
+            request.scheme,
+            request.get_host(),
+            request.path,
+            repr(sorted(request.query_params.lists())),
+            auth_state,
+            repr(sorted(state.items())),
+            repr(sorted(versions.items())),
+        ]
+        etag = '"%s"' % hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+        candidates = [
+            datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+            for version in versions.values()
+        ]
+        if self.last_modified_key and state.get(self.last_modified_key):
+            candidates.append(state[self.last_modified_key])
+        last_modified = max(candidates) if candidates else None
+        return etag, last_modified
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = await self.aget_validators(request)
+        if etag is None:
+            return await handler(request, *args, **kwargs)
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = await handler(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    @staticmethod
+    def add_validators(response, etag, last_modified):
+        if response.status_code not in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match uses weak comparison and takes precedence over If-Modified-Since
+            candidates = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+            return '*' in candidates or etag in candidates
+
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_modified_since is not None and last_modified is not None:
+            return int(last_modified.timestamp()) <= if_modified_since
+        return False
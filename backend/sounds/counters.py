@@ -0,0 +1,40 @@
+"""
+Denormalized engagement counters on ``Sound``.
+
+Counters are adjusted with single ``UPDATE ... SET x = x + n`` statements so
+concurrent writers never lose increments, and can be rebuilt from the source
+tables at any time.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Favorite, Sound
+
+
+COUNTER_FIELDS = ('favorite_count', 'comment_count')
+
+
+def adjust_counter(sound_id, field, delta):
+    """Atomically add ``delta`` to a counter, never going below zero."""
+    Sound.objects.filter(pk=sound_id).update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def _count_subquery(model):
+    counts = (
+        model.objects.filter(sound=OuterRef('pk'))
+        .order_by()
+        .values('sound')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def rebuild_counters(queryset=None):
+    """Recompute every counter from the comment and favorite tables."""
+    if queryset is None:
+        queryset = Sound.objects.all()
+    return queryset.update(
+        favorite_count=_count_subquery(Favorite),
+        comment_count=_count_subquery(Comment),
+    )
@@ -0,0 +1,298 @@
+"""
+Synthetic catalog data for load tests and benchmarks.
+
+``DatasetGenerator`` fills the database with users, tags, sounds, tag links,
+comments and favorites whose popularity follows a Zipf distribution, the way
+real catalogs concentrate engagement on a few items. All randomness comes
+from one seeded ``random.Random`` and timestamps fall in the ``days`` before
+the fixed ``DATASET_EPOCH``, so the same arguments always produce the same
+rows. Primary keys continue from each table's current largest id, so the
+ids themselves only repeat on the same starting database.
+
+Rows are written with explicit primary keys in batches: PostgreSQL ``COPY``
+when available, otherwise multi-row ``executemany`` INSERTs (which also works
+under ``USE_SQLITE``). Denormalized columns are filled in the same pass
+(``search_document``) or rebuilt once at the end (engagement counters).
+"""
+import io
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .counters import rebuild_counters
+from .models import Comment, Favorite, Sound, Tag
+from .response_cache import SOUND_LIST_SCOPE, TAG_LIST_SCOPE, bump_scopes
+from .search import build_search_document
+
+
+ADJECTIVES = [
+    'Calm', 'Distant', 'Gentle', 'Heavy', 'Soft', 'Deep', 'Bright', 'Dark', 'Warm', 'Cold',
+    'Early', 'Late', 'Quiet', 'Loud', 'Slow', 'Fast', 'Ancient', 'Urban', 'Wild', 'Hollow',
+]
+NOUNS = [
+    'Rain', 'Thunder', 'Waves', 'Forest', 'Birds', 'Wind', 'River', 'Traffic', 'Fire', 'Piano',
+    'Crowd', 'Train', 'Bells', 'Engine', 'Footsteps', 'Harbor', 'Market', 'Storm', 'Night', 'Cafe',
+]
+WORDS = [
+    'recorded', 'at', 'dawn', 'near', 'the', 'coast', 'with', 'a', 'field', 'recorder', 'stereo',
+    'ambience', 'loop', 'texture', 'close', 'mic', 'background', 'layer', 'for', 'film', 'games',
+    'meditation', 'sleep', 'focus', 'long', 'take', 'natural', 'reverb', 'city', 'evening',
+]
+# Generated timestamps end here rather than at the wall clock
+DATASET_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+BITRATES = [96000, 128000, 192000, 256000, 320000]
+SAMPLE_RATES = [44100, 44100, 44100, 48000, 22050]
+
+
+def zipf_cum_weights(n, exponent):
+    """Cumulative weights for ``random.choices`` over ``n`` ranks."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _copy_literal(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\\\x' + bytes(value).hex()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+def insert_rows(model, field_names, rows, use_copy):
+    """Write ``rows`` (tuples ordered like ``field_names``) into ``model``'s table."""
+    if not rows:
+        return
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        if use_copy:
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(_copy_literal(value) for value in row))
+                buffer.write('\n')
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+            return
+        placeholders = ', '.join(['%s'] * len(fields))
+        # Table and column names come from the model's _meta through quote_name;
+        # every value is a bound parameter
+        cursor.executemany(
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders})',  # nosec B608
+            [
+                [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)]
+                for row in rows
+            ],
+        )
+
+
+class DatasetGenerator:
+    """Generate a reproducible synthetic dataset; see the module docstring."""
+
+    def __init__(self, users=1000, tags=200, sounds=10000, comments_per_sound=3.0,
+                 favorites_per_user=10.0, days=365, seed=42, prefix='loadtest',
+                 batch_size=5000, zipf_exponent=1.1, method='auto', password=None, log=None):
+        self.counts = {'users': users, 'tags': tags, 'sounds': sounds}
+        self.comments_per_sound = comments_per_sound
+        self.favorites_per_user = favorites_per_user
+        self.days = days
+        self.prefix = prefix
+        # None leaves the generated accounts without a usable password
+        self.password = password
+        self.batch_size = batch_size
+        self.zipf_exponent = zipf_exponent
+        self.rng = random.Random(seed)
+        self.now = DATASET_EPOCH
+        self.log = log or (lambda message: None)
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'insert'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise ValueError('COPY is only available on PostgreSQL')
+        self.use_copy = method == 'copy'
+
+    def run(self):
+        if User.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise ValueError(f"Users prefixed '{self.prefix}_' already exist; choose another prefix")
+        started = time.perf_counter()
+        summary = {}
+        user_ids = self.generate_users(summary)
+        tag_ids = self.generate_tags(summary)
+        sounds = self.generate_sounds(summary, user_ids, tag_ids)
+        self.generate_comments(summary, user_ids, sounds)
+        self.generate_favorites(summary, user_ids, sounds)
+
+        with transaction.atomic():
+            rebuild_counters(Sound.objects.filter(pk__gte=sounds[0][0]) if sounds else Sound.objects.none())
+        if connection.vendor == 'postgresql':
+            self.reset_sequences()
+        bump_scopes(SOUND_LIST_SCOPE, TAG_LIST_SCOPE)
+        summary['seconds'] = round(time.perf_counter() - started, 2)
+        return summary
+
+    # Helpers
+
+    def next_id(self, model):
+        return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+    def random_time(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=int(self.rng.random() * span))
+
+    def write(self, model, field_names, rows, summary, key):
+        started = time.perf_counter()
+        total = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                insert_rows(model, field_names, batch, self.use_copy)
+            total += len(batch)
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        summary[key] = total
+        self.log(f'{key}: {total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)')
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Tag, Sound, Sound.tags.through, Comment, Favorite]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    # Tables
+
+    def generate_users(self, summary):
+        first_id = self.next_id(User)
+        count = self.counts['users']
+        password = make_password(self.password)
+
+        def rows():
+            for offset in range(count):
+                username = f'{self.prefix}_{offset:07d}'
+                yield (
+                    first_id + offset, password, None, False, username, '', '',
+                    f'{username}@example.com', False, True, self.random_time(),
+                )
+
+        self.write(User, [
+            'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name',
+            'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+        ], rows(), summary, 'users')
+        return list(range(first_id, first_id + count))
+
+    def generate_tags(self, summary):
+        first_id = self.next_id(Tag)
+        count = self.counts['tags']
+        names = [f'{self.prefix}-{self.rng.choice(NOUNS).lower()}-{i:05d}' for i in range(count)]
+        self.write(Tag, ['id', 'name'], ((first_id + i, name) for i, name in enumerate(names)), summary, 'tags')
+        return [(first_id + i, name) for i, name in enumerate(names)]
+
+    def generate_sounds(self, summary, user_ids, tag_ids):
+        first_id = self.next_id(Sound)
+        count = self.counts['sounds']
+        uploaders = user_ids[:max(len(user_ids) // 100, 1)]
+        tag_weights = zipf_cum_weights(len(tag_ids), self.zipf_exponent)
+        sounds = []
+        links = []
+
+        def rows():
+            for offset in range(count):
+                sound_id = first_id + offset
+                name = f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)} {offset}'
+                description = ' '.join(self.rng.choices(WORDS, k=self.rng.randint(5, 30))).capitalize()
+                tags = {}
+                for tag_id, tag_name in self.rng.choices(tag_ids, cum_weights=tag_weights, k=self.rng.randint(1, 5)):
+                    tags[tag_id] = tag_name
+                links.extend((sound_id, tag_id) for tag_id in tags)
+                created_at = self.random_time()
+                sounds.append((sound_id, created_at))
+                yield (
+                    sound_id, name, description, '', None, '', self.rng.choice(uploaders), created_at,
+                    created_at, build_search_document(name, description, tags.values()), 0, 0, '',
+                    round(self.rng.lognormvariate(4.5, 1.0), 3), self.rng.choice(BITRATES),
+                    self.rng.choice(SAMPLE_RATES), round(self.rng.uniform(-30, -8), 2),
+                    b'', Sound.AnalysisStatus.DONE,
+                )
+
+        self.write(Sound, [
+            'id', 'name', 'description', 'mp3_file', 'image', 'image_hash', 'uploaded_by',
+            'created_at', 'updated_at', 'search_document', 'favorite_count', 'comment_count',
+            'content_hash', 'duration', 'bitrate', 'sample_rate', 'loudness', 'waveform_peaks',
+            'analysis_status',
+        ], rows(), summary, 'sounds')
+
+        first_link = self.next_id(Sound.tags.through)
+        self.write(
+            Sound.tags.through, ['id', 'sound', 'tag'],
+            ((first_link + i, sound_id, tag_id) for i, (sound_id, tag_id) in enumerate(links)),
+            summary, 'sound_tags',
+        )
+        return sounds
+
+    def popular(self, population):
+        """Shuffle ``population`` so popularity is independent of id order."""
+        ranked = list(population)
+        self.rng.shuffle(ranked)
+        return ranked, zipf_cum_weights(len(ranked), self.zipf_exponent)
+
+    def generate_comments(self, summary, user_ids, sounds):
+        if not sounds:
+            summary['comments'] = 0
+            return
+        first_id = self.next_id(Comment)
+        total = round(len(sounds) * self.comments_per_sound)
+        ranked_sounds, sound_weights = self.popular(sounds)
+        ranked_users, user_weights = self.popular(user_ids)
+
+        def rows():
+            for offset in range(total):
+                sound_id, sound_created = self.rng.choices(ranked_sounds, cum_weights=sound_weights)[0]
+                user_id = self.rng.choices(ranked_users, cum_weights=user_weights)[0]
+                content = ' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 25))).capitalize()
+                yield first_id + offset, sound_id, user_id, content, self.random_time(after=sound_created)
+
+        self.write(Comment, ['id', 'sound', 'user', 'content', 'created_at'], rows(), summary, 'comments')
+
+    def generate_favorites(self, summary, user_ids, sounds):
+        if not sounds:
+            summary['favorites'] = 0
+            return
+        first_id = self.next_id(Favorite)
+        ranked_sounds, sound_weights = self.popular(sounds)
+        counter = itertools.count(first_id)
+
+        def rows():
+            for user_id in user_ids:
+                # Geometric-like per-user activity with the requested mean
+                wanted = min(int(self.rng.expovariate(1 / self.favorites_per_user)), len(sounds)) \
+                    if self.favorites_per_user > 0 else 0
+                chosen = {}
+                attempts = 0
+                while len(chosen) < wanted and attempts < wanted * 4:
+                    sound_id, sound_created = self.rng.choices(ranked_sounds, cum_weights=sound_weights)[0]
+                    chosen.setdefault(sound_id, sound_created)
+                    attempts += 1
+                for sound_id, sound_created in chosen.items():
+                    yield next(counter), user_id, sound_id, self.random_time(after=sound_created)
+
+        self.write(Favorite, ['id', 'user', 'sound', 'created_at'], rows(), summary, 'favorites')
+
@@ -0,0 +1,67 @@
+"""
+Per-user favorite sound IDs, resolved once per request and cached between
+requests so sound serializers never query favorites row by row.
+"""
+from django.core.cache import cache
+
+from .models import Favorite
+
+
+FAVORITE_IDS_CACHE_KEY = 'favorites:sound-ids:{user_id}'
+FAVORITE_IDS_CACHE_TIMEOUT = 60 * 15
+
+
+def _cache_key(user_id):
+    return FAVORITE_IDS_CACHE_KEY.format(user_id=user_id)
+
+
+def get_favorite_sound_ids(user):
+    """Return the set of sound IDs favorited by ``user``."""
+    key = _cache_key(user.pk)
+    sound_ids = cache.get(key)
+    if sound_ids is None:
+        sound_ids = frozenset(
+            Favorite.objects.filter(user=user).values_list('sound_id', flat=True)
+        )
+        cache.set(key, sound_ids, FAVORITE_IDS_CACHE_TIMEOUT)
+    return sound_ids
+
+
+async def aget_favorite_sound_ids(user):
+    """``get_favorite_sound_ids`` for async views."""
+    key = _cache_key(user.pk)
+    sound_ids = await cache.aget(key)
+    if sound_ids is None:
+        sound_ids = frozenset([
+            sound_id
+            async for sound_id in Favorite.objects.filter(user=user).values_list('sound_id', flat=True)
+        ])
+        await cache.aset(key, sound_ids, FAVORITE_IDS_CACHE_TIMEOUT)
+    return sound_ids
+
+
+def invalidate_favorite_sound_ids(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def favorite_sound_ids_for_request(request):
+    """
+    Resolve the requesting user's favorite sound IDs once and memoize them on
+    the request, so every serializer rendering that request shares one lookup.
+    """
+    if request is None or not request.user.is_authenticated:
+        return frozenset()
+    sound_ids = getattr(request, '_favorite_sound_ids', None)
+    if sound_ids is None:
+        sound_ids = get_favorite_sound_ids(request.user)
+        request._favorite_sound_ids = sound_ids
+    return sound_ids
+
+
+async def aprime_favorite_sound_ids(request):
+    """
+    Resolve the favorite IDs ahead of serialization in async views, where the
+    lazy lookup in ``favorite_sound_ids_for_request`` could not query.
+    """
+    if request.user.is_authenticated and getattr(request, '_favorite_sound_ids', None) is None:
+        request._favorite_sound_ids = await aget_favorite_sound_ids(request.user)
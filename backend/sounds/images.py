@@ -0,0 +1,189 @@
+"""
+Responsive image variants for ``Sound.image``.
+
+Every stored image is identified by a hash of its bytes (``Sound.image_hash``,
+kept up to date by ``sounds.signals``). Variants are resized WebP/JPEG copies
+stored under ``sounds/variants/<hash>/<width>.<ext>`` and generated lazily the
+first time their URL is requested. Because the URL changes whenever the
+image does, variants are served as immutable.
+
+Variants of a hash that no sound references any more are deleted when the
+image is replaced or the sound is removed; ``manage.py prune_image_variants``
+sweeps anything left behind.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+from .models import Sound
+
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'sounds/variants'
+HASH_LENGTH = 16
+
+# extension -> (Pillow format, MIME type)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+
+def variant_widths(original_width):
+    """Widths offered for an image; never upscaled past ``original_width``."""
+    if not original_width:
+        return []
+    configured = getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1280))
+    return sorted({min(width, original_width) for width in configured})
+
+
+def variant_name(image_hash, width, ext):
+    return posixpath.join(VARIANTS_DIR, image_hash, f'{width}.{ext}')
+
+
+def describe_image(field_file):
+    """
+    Return ``(hash, width, height)`` of ``field_file``, or ``('', None, None)``
+    for a missing or unreadable image. The size is after EXIF rotation.
+    """
+    if not field_file:
+        return '', None, None
+    try:
+        digest = hashlib.sha256()
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+        field_file.seek(0)
+        with Image.open(field_file) as image:
+            width, height = ImageOps.exif_transpose(image).size
+        field_file.seek(0)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning('Could not read image %s', field_file.name)
+        return '', None, None
+    finally:
+        if field_file._committed:
+            # Already in storage: opened here only to be read
+            field_file.close()
+    return digest.hexdigest()[:HASH_LENGTH], width, height
+
+
+def render_variant(source, width, ext):
+    """Resize ``source`` (a readable file) to ``width`` and encode it as ``ext``."""
+    pillow_format, _ = VARIANT_FORMATS[ext]
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if pillow_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB' if pillow_format == 'JPEG' else 'RGBA')
+        output = BytesIO()
+        image.save(output, pillow_format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def ensure_variant(sound, width, ext, storage=default_storage):
+    """Return the storage name of a variant, generating it on first use."""
+    name = variant_name(sound.image_hash, width, ext)
+    if storage.exists(name):
+        return name
+    with sound.image.open('rb') as source:
+        data = render_variant(source, width, ext)
+    store_complete(storage, name, data)
+    return name
+
+
+def store_complete(storage, name, data):
+    """
+    Store ``data`` as ``name`` so that it only ever exists complete: variants
+    are served as immutable, and a concurrent request must not see a file
+    that is still being written.
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Object stores only make an upload visible once it is complete
+        saved = storage.save(name, ContentFile(data))
+        if saved != name:
+            # A concurrent request stored the same bytes first; keep that copy
+            storage.delete(saved)
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            output.write(data)
+        os.chmod(temporary, storage.file_permissions_mode or 0o644)
+        # Atomic: a concurrent render of the same bytes just replaces it
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def srcset(sound, build_url=None):
+    """
+    Return ``{mime_type: "url 320w, url 640w, ..."}`` for ``sound``, or None
+    when it has no analysable image.
+    """
+    if not sound.image or not sound.image_hash:
+        return None
+    widths = variant_widths(sound.image_width)
+    result = {}
+    for ext, (_, mime_type) in VARIANT_FORMATS.items():
+        entries = []
+        for width in widths:
+            url = reverse(
+                'image-variant',
+                kwargs={'image_hash': sound.image_hash, 'width': width, 'ext': ext},
+            )
+            entries.append(f'{build_url(url) if build_url else url} {width}w')
+        result[mime_type] = ', '.join(entries)
+    return result
+
+
+def delete_variants(image_hash, storage=default_storage):
+    """Remove every stored variant of ``image_hash``."""
+    directory = posixpath.join(VARIANTS_DIR, image_hash)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for filename in files:
+        storage.delete(posixpath.join(directory, filename))
+    try:
+        os.rmdir(storage.path(directory))
+    except (NotImplementedError, OSError):
+        pass
+    return len(files)
+
+
+def release_image_hash_on_commit(image_hash):
+    """Delete ``image_hash``'s variants after commit unless a sound still uses it."""
+    if not image_hash:
+        return
+
+    def release():
+        if not Sound.objects.filter(image_hash=image_hash).exists():
+            delete_variants(image_hash)
+
+    transaction.on_commit(release)
+
+
+def stored_variant_hashes(storage=default_storage):
+    try:
+        directories, _ = storage.listdir(VARIANTS_DIR)
+    except FileNotFoundError:
+        return []
+    return directories
@@ -0,0 +1,40 @@
+"""
+Management command to run the audio analysis stage for stored sounds
+Run with: python manage.py analyze_sounds
+"""
+from django.core.management.base import BaseCommand
+
+from sounds.analysis import analyze_queryset, shutdown_executor
+from sounds.models import Sound
+
+
+class Command(BaseCommand):
+    help = 'Analyses pending and failed sounds (duration, bitrate, loudness, waveform peaks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sound',
+            type=int,
+            action='append',
+            dest='sound_ids',
+            help='Only analyse the given sound ID (may be repeated)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-analyse every sound, including those already done',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Sound.objects.all()
+        if options['sound_ids']:
+            queryset = queryset.filter(pk__in=options['sound_ids'])
+        elif not options['all']:
+            queryset = queryset.exclude(analysis_status=Sound.AnalysisStatus.DONE)
+
+        try:
+            done, failed = analyze_queryset(queryset)
+        finally:
+            shutdown_executor()
+
+        self.stdout.write(self.style.SUCCESS(f'Analysed {done} sound(s), {failed} failed.'))
@@ -0,0 +1,116 @@
+"""
+Management command benchmarking the main API endpoints against a dataset
+Run with: python manage.py benchmark_api --sounds 20000 --save baseline.json
+     and: python manage.py benchmark_api --sounds 20000 --compare baseline.json
+
+Covers sound list, search, tag filter, detail, comments, favorites, login and
+token refresh (see ``sounds.benchmarks``). With ``--sounds`` a synthetic
+dataset is generated first; otherwise the existing data is used. Everything
+the run writes is rolled back. ``--compare`` exits non-zero on regressions.
+"""
+import json
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.views import APIView
+
+from sounds.benchmarks import SCENARIOS, compare_results, prepare_context, run_benchmarks
+from sounds.dataset import DatasetGenerator
+from sounds.models import Sound
+
+
+class Rollback(Exception):
+    """Raised to discard rows written by the benchmark."""
+
+
+class Command(BaseCommand):
+    help = 'Measures p50/p95 latency, query count and response size of the main API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sounds', type=int, default=0,
+                            help='Generate a temporary dataset with this many sounds (rolled back afterwards)')
+        parser.add_argument('--users', type=int, default=1000, help='Users in the generated dataset')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the generated dataset')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint')
+        parser.add_argument('--only', default='', help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache enabled')
+        parser.add_argument('--save', metavar='PATH', help='Write the results as a JSON baseline')
+        parser.add_argument('--compare', metavar='PATH', help='Compare against a JSON baseline')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative growth of latency and size before flagging')
+
+    def handle(self, *args, **options):
+        names = [name for name in options['only'].split(',') if name]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline: {exc}')
+
+        # Throttle classes are bound to the views at import time, so switch
+        # them off on APIView itself for the duration of the run.
+        with override_settings(RESPONSE_CACHE_ENABLED=options['with_cache'], ALLOWED_HOSTS=['testserver']), \
+                mock.patch.object(APIView, 'get_throttles', return_value=[]):
+            try:
+                with transaction.atomic():
+                    report = self.run(options, names)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        self.print_report(report['results'], baseline['results'] if baseline else None)
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Baseline written to {options['save']}")
+        if baseline:
+            regressions = compare_results(baseline['results'], report['results'], options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(f'  {line}')
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def run(self, options, names):
+        if options['sounds']:
+            DatasetGenerator(
+                users=options['users'], sounds=options['sounds'], seed=options['seed'],
+                prefix=f"bench{options['seed']}", log=self.stdout.write,
+            ).run()
+        try:
+            ctx = prepare_context()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        results = run_benchmarks(ctx, options['repeat'], options['warmup'], names)
+        return {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'sounds': Sound.objects.count(),
+                'repeat': options['repeat'],
+                'response_cache': options['with_cache'],
+            },
+            'results': results,
+        }
+
+    def print_report(self, results, baseline=None):
+        self.stdout.write(f"{'endpoint':<18}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'bytes':>10}  status")
+        for name, row in results.items():
+            line = (
+                f"{name:<18}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['queries']:>9}{row['bytes']:>10}  {row['status']}"
+            )
+            if baseline and name in baseline:
+                before = baseline[name]
+                line += f"  (was p50 {before['p50_ms']:.2f}, queries {before['queries']})"
+            self.stdout.write(line)
@@ -0,0 +1,64 @@
+"""
+Management command comparing sync WSGI and native async ASGI under concurrent slow clients
+Run with: python manage.py benchmark_concurrency --clients 100 --client-delay 0.2
+
+Drives the async-served catalog reads (see ``sounds.async_views``) through
+Django's WSGI and ASGI handlers in-process, against the existing data
+(``generate_dataset`` first). Reads only; nothing is written. Throttles are
+disabled and the response cache is off unless ``--with-cache`` is given.
+"""
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.views import APIView
+
+from sounds.concurrency import build_targets, run_asgi, run_wsgi
+
+
+class Command(BaseCommand):
+    help = 'Compares WSGI and ASGI throughput and latency with many concurrent slow clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per client')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Request threads of the WSGI worker (the ASGI worker uses one event loop)')
+        parser.add_argument('--client-delay', type=float, default=0.1,
+                            help='Seconds each client takes to read a response')
+        parser.add_argument('--mode', choices=('both', 'wsgi', 'asgi'), default='both')
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache enabled')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError('--clients, --requests and --threads must be positive')
+        try:
+            targets = build_targets()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        results = {}
+        with override_settings(RESPONSE_CACHE_ENABLED=options['with_cache'], ALLOWED_HOSTS=['testserver'],
+                               REQUEST_TIMING_LOG_SAMPLE_RATE=0), \
+                mock.patch.object(APIView, 'get_throttles', return_value=[]):
+            if options['mode'] in ('both', 'wsgi'):
+                results['wsgi'] = run_wsgi(
+                    targets, options['clients'], options['requests'], options['threads'], options['client_delay']
+                )
+            if options['mode'] in ('both', 'asgi'):
+                results['asgi'] = run_asgi(targets, options['clients'], options['requests'], options['client_delay'])
+
+        self.stdout.write(
+            f"{options['clients']} clients x {options['requests']} requests, "
+            f"{options['client_delay'] * 1000:.0f} ms client delay, endpoints: {', '.join(t[0] for t in targets)}"
+        )
+        self.stdout.write(f"{'server':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<8}{row['throughput']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['errors']:>8}"
+            )
+        if len(results) == 2 and results['wsgi']['throughput']:
+            ratio = results['asgi']['throughput'] / results['wsgi']['throughput']
+            self.stdout.write(self.style.SUCCESS(f'ASGI throughput: {ratio:.1f}x WSGI'))
+        if any(row['errors'] for row in results.values()):
+            raise CommandError('Some requests did not return 200')
@@ -0,0 +1,101 @@
+"""
+Management command comparing deep-page latency of page-number and cursor pagination
+Run with: python manage.py benchmark_pagination --rows 50000 --depth 500
+"""
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from sounds.models import Sound
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Raised to discard rows seeded for the benchmark."""
+
+
+class Command(BaseCommand):
+    help = 'Measures GET /api/sounds/ latency at a deep page in page-number and cursor modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=0,
+                            help='Temporarily insert this many sounds (rolled back afterwards)')
+        parser.add_argument('--depth', type=int, default=100, help='Page number to measure')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per mode')
+        parser.add_argument('--ordering', default='', help='Optional ?ordering= value, e.g. name')
+
+    def handle(self, *args, **options):
+        # Throttle classes are bound to the views at import time, so switch
+        # them off on APIView itself for the duration of the run.
+        with override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['testserver']), \
+                mock.patch.object(APIView, 'get_throttles', return_value=[]):
+            try:
+                with transaction.atomic():
+                    if options['rows']:
+                        self.seed(options['rows'])
+                    self.run(options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def seed(self, rows):
+        user = User.objects.create(username=f'pagination-bench-{time.time_ns()}')
+        batch = [
+            Sound(
+                name=f'Benchmark sound {i:07d}',
+                mp3_file=f'sounds/mp3/benchmark-{i}.mp3',
+                uploaded_by=user,
+            )
+            for i in range(rows)
+        ]
+        Sound.objects.bulk_create(batch, batch_size=2000)
+        self.stdout.write(f'Seeded {rows} sounds')
+
+    def run(self, options):
+        client = APIClient()
+        depth = options['depth']
+        # Both modes use the default PAGE_SIZE; page-number mode ignores ?page_size
+        params = {'ordering': options['ordering']} if options['ordering'] else {}
+        page_params = dict(params, page=depth)
+
+        # Walk the cursor chain (untimed) to obtain the link for the same depth
+        cursor_url, cursor_params, page = '/api/sounds/', params, 1
+        while page < depth:
+            response = client.get(cursor_url, cursor_params)
+            cursor_url, cursor_params = response.data.get('next'), None
+            if not cursor_url:
+                self.stderr.write(f'Only {page} pages available; lower --depth or add --rows')
+                return
+            page += 1
+
+        results = {
+            'page-number': self.measure(client, '/api/sounds/', page_params, options['repeat']),
+            'cursor': self.measure(client, cursor_url, None, options['repeat']),
+        }
+        self.stdout.write(f'Sounds: {Sound.objects.count()}, depth: page {depth}')
+        for mode, (p50, p95, queries) in results.items():
+            self.stdout.write(f'{mode:>12}: p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  queries {queries}')
+        speedup = results['page-number'][0] / results['cursor'][0] if results['cursor'][0] else 0
+        self.stdout.write(self.style.SUCCESS(f'Cursor mode p50 speedup: {speedup:.1f}x'))
+
+    def measure(self, client, url, params, repeat):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+            queries = len(ctx.captured_queries)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95, queries
@@ -0,0 +1,95 @@
+"""
+Management command comparing DRF's timestamp-list throttle with the sliding-window throttle
+Run with: python manage.py benchmark_throttles --rate 1000/hour
+
+Each throttle is asked ``--requests`` times (by default the rate's limit,
+so DRF's history list grows to its full length) for one client address.
+Reported per request: process CPU time and cache round trips. A round trip
+is a Redis command with django-redis, otherwise a cache backend call.
+The counters are written under a throwaway client address.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework import throttling
+
+from sounds import throttling as sliding
+
+CACHE_METHODS = ('get', 'set', 'add', 'incr', 'decr', 'get_many', 'delete')
+
+
+@contextmanager
+def count_round_trips():
+    calls = [0]
+    if settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+        import redis
+
+        execute_command = redis.Redis.execute_command
+
+        def counted(client, *args, **kwargs):
+            calls[0] += 1
+            return execute_command(client, *args, **kwargs)
+
+        with mock.patch.object(redis.Redis, 'execute_command', counted):
+            yield calls
+        return
+
+    backend = type(caches['default'])
+    patches = []
+    for name in CACHE_METHODS:
+        method = getattr(backend, name)
+
+        def counted(self, *args, _method=method, **kwargs):
+            calls[0] += 1
+            return _method(self, *args, **kwargs)
+
+        patches.append(mock.patch.object(backend, name, counted))
+    for patch in patches:
+        patch.start()
+    try:
+        yield calls
+    finally:
+        for patch in patches:
+            patch.stop()
+
+
+class Command(BaseCommand):
+    help = 'Measures CPU time and cache round trips per request of the anonymous throttles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', default='1000/hour', help='Throttle rate to test')
+        parser.add_argument('--requests', type=int, default=0,
+                            help='Requests per throttle (default: the rate limit)')
+
+    def handle(self, *args, **options):
+        throttles = {
+            'drf (timestamp list)': throttling.AnonRateThrottle,
+            'sliding window': sliding.AnonRateThrottle,
+        }
+        limit, _ = throttling.SimpleRateThrottle.parse_rate(None, options['rate'])
+        count = options['requests'] or limit
+        self.stdout.write(f"Cache: {settings.CACHES['default']['BACKEND']}, rate {options['rate']}, "
+                          f'{count} requests per throttle')
+        self.stdout.write(f"{'throttle':<22}{'CPU us/req':>12}{'round trips/req':>17}{'allowed':>9}")
+        for name, throttle_class in throttles.items():
+            cpu_us, round_trips, allowed = self.measure(throttle_class, options['rate'], count)
+            self.stdout.write(f'{name:<22}{cpu_us:>12.1f}{round_trips:>17.2f}{allowed:>9}')
+
+    def measure(self, throttle_class, rate, count):
+        throttle_class = type('BenchmarkThrottle', (throttle_class,), {'rate': rate})
+        request = RequestFactory().get('/api/sounds/', REMOTE_ADDR=f'bench-{uuid.uuid4().hex}')
+        request.user = AnonymousUser()
+        allowed = 0
+        with count_round_trips() as calls:
+            start = time.process_time()
+            for _ in range(count):
+                allowed += throttle_class().allow_request(request, None)
+            elapsed = time.process_time() - start
+        return elapsed / count * 1e6, calls[0] / count, allowed
@@ -0,0 +1,15 @@
+"""
+Management command to garbage-collect abandoned chunked upload sessions
+Run with: python manage.py cleanup_upload_sessions
+"""
+from django.core.management.base import BaseCommand
+
+from sounds.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Deletes upload sessions idle for longer than UPLOAD_SESSION_TTL and orphaned part files'
+
+    def handle(self, *args, **options):
+        removed = purge_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired upload session(s).'))
@@ -0,0 +1,63 @@
+"""
+Management command to fill the database with a synthetic load-test dataset
+Run with: python manage.py generate_dataset --users 10000 --sounds 1000000 --seed 42
+
+Popularity of sounds, tags and commenters follows a Zipf distribution, and
+the same ``--seed`` always produces the same rows. Rows go in through
+PostgreSQL ``COPY`` when available, otherwise batched INSERTs (SQLite).
+Generated users are named ``<prefix>_0000000``..., none of them staff. They
+cannot log in unless ``--password`` gives them all that password. The command
+only runs with ``DEBUG`` on, so it cannot fill a production database.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sounds.dataset import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generates a reproducible synthetic dataset of users, tags, sounds, comments and favorites'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--sounds', type=int, default=10000)
+        parser.add_argument('--comments-per-sound', type=float, default=3.0, help='Mean comments per sound')
+        parser.add_argument('--favorites-per-user', type=float, default=10.0, help='Mean favorites per user')
+        parser.add_argument('--days', type=int, default=365, help='Spread timestamps over this many past days')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for popularity skew')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='loadtest', help='Username and tag name prefix')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per COPY/INSERT batch')
+        parser.add_argument('--method', choices=['auto', 'copy', 'insert'], default='auto')
+        parser.add_argument('--password', help='Password for every generated user (default: no login)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError('generate_dataset only runs with DEBUG=True')
+        if options['users'] < 1 or options['tags'] < 1:
+            raise CommandError('--users and --tags must be at least 1')
+        try:
+            generator = DatasetGenerator(
+                users=options['users'],
+                tags=options['tags'],
+                sounds=options['sounds'],
+                comments_per_sound=options['comments_per_sound'],
+                favorites_per_user=options['favorites_per_user'],
+                days=options['days'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                zipf_exponent=options['zipf'],
+                method=options['method'],
+                password=options['password'],
+                log=self.stdout.write,
+            )
+            summary = generator.run()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {summary['users']} users, {summary['tags']} tags, {summary['sounds']} sounds, "
+            f"{summary['comments']} comments and {summary['favorites']} favorites in {summary['seconds']}s."
+        ))
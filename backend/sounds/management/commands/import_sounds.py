@@ -0,0 +1,199 @@
+"""
+Management command to bulk-import a library of MP3 files
+Run with: python manage.py import_sounds /path/to/pack --user admin
+
+The source is either a directory (every ``*.mp3`` below it; folder names
+become tags) or a manifest file:
+- CSV with a header row: ``path,name,description,tags`` (tags ``;``-separated)
+- JSON: a list of objects with the same keys
+Manifest paths are relative to the manifest's directory.
+
+Files are hashed and probed on a process pool. Anything whose SHA-256 is
+already stored as ``Sound.content_hash`` is skipped, and each batch commits on
+its own, so re-running after an interruption resumes where it stopped.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sounds.audio_analysis import inspect_file
+from sounds.models import Sound, Tag
+from sounds.response_cache import SOUND_LIST_SCOPE, TAG_LIST_SCOPE, bump_scopes
+from sounds.search import build_search_document
+
+User = get_user_model()
+
+IMPORT_DIR = 'sounds/mp3/imported'
+
+
+def entries_from_directory(root):
+    for path in sorted(root.rglob('*')):
+        if path.is_file() and path.suffix.lower() == '.mp3':
+            yield {
+                'path': str(path),
+                'name': path.stem.replace('_', ' ').strip(),
+                'description': '',
+                'tags': [part for part in path.relative_to(root).parent.parts],
+            }
+
+
+def entries_from_manifest(manifest):
+    base = manifest.parent
+    with open(manifest, newline='', encoding='utf-8') as f:
+        if manifest.suffix.lower() == '.json':
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    for row in rows:
+        tags = row.get('tags') or []
+        if isinstance(tags, str):
+            tags = tags.split(';')
+        path = base / row['path']
+        yield {
+            'path': str(path),
+            'name': (row.get('name') or path.stem.replace('_', ' ')).strip(),
+            'description': row.get('description') or '',
+            'tags': tags,
+        }
+
+
+class Command(BaseCommand):
+    help = 'Imports MP3 files from a directory or manifest using a process pool and batched inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory of MP3 files, or a .csv/.json manifest')
+        parser.add_argument('--user', help='Username recorded as uploader (default: first superuser)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                            help='Hash/probe worker processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        source = Path(options['source'])
+        if source.is_dir():
+            entries = list(entries_from_directory(source))
+        elif source.is_file():
+            entries = list(entries_from_manifest(source))
+        else:
+            raise CommandError(f'{source} does not exist')
+        uploader = self.get_uploader(options['user'])
+
+        self.stdout.write(f'Found {len(entries)} file(s); hashing with {options["workers"]} worker(s)...')
+        started = time.perf_counter()
+        totals = {'imported': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+
+        by_path = {entry['path']: entry for entry in entries}
+        seen_hashes = set()
+        batch = []
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            results = executor.map(inspect_file, by_path, chunksize=8)
+            for info in results:
+                if 'error' in info:
+                    totals['failed'] += 1
+                    self.stderr.write(f"Skipping {info['path']}: {info['error']}")
+                    continue
+                if info['content_hash'] in seen_hashes:
+                    totals['skipped'] += 1
+                    continue
+                seen_hashes.add(info['content_hash'])
+                batch.append({**by_path[info['path']], **info})
+                if len(batch) >= options['batch_size']:
+                    self.flush(batch, uploader, totals, started)
+                    batch = []
+        if batch:
+            self.flush(batch, uploader, totals, started)
+
+        bump_scopes(SOUND_LIST_SCOPE, TAG_LIST_SCOPE)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['imported']}, skipped {totals['skipped']} duplicate(s), "
+            f"{totals['failed']} failed in {elapsed:.1f}s "
+            f"({self.rate(totals, elapsed)}). Run analyze_sounds to compute loudness and waveforms."
+        ))
+
+    def get_uploader(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User {username!r} does not exist')
+        uploader = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if uploader is None:
+            raise CommandError('No superuser found; pass --user')
+        return uploader
+
+    @staticmethod
+    def rate(totals, elapsed):
+        elapsed = max(elapsed, 1e-6)
+        return f"{totals['imported'] / elapsed:.1f} files/s, {totals['bytes'] / elapsed / 2 ** 20:.1f} MiB/s"
+
+    def flush(self, batch, uploader, totals, started):
+        existing = set(
+            Sound.objects.filter(content_hash__in=[item['content_hash'] for item in batch])
+            .values_list('content_hash', flat=True)
+        )
+        new_items = [item for item in batch if item['content_hash'] not in existing]
+        totals['skipped'] += len(batch) - len(new_items)
+        if not new_items:
+            return
+
+        tag_names = {name.strip()[:50] for item in new_items for name in item['tags'] if name.strip()}
+        with transaction.atomic():
+            Tag.objects.bulk_create([Tag(name=name) for name in tag_names], ignore_conflicts=True)
+            tag_ids = dict(Tag.objects.filter(name__in=tag_names).values_list('name', 'pk'))
+
+            sounds = []
+            for item in new_items:
+                tags = [name.strip()[:50] for name in item['tags'] if name.strip()]
+                sound = Sound(
+                    name=item['name'][:200],
+                    description=item['description'],
+                    uploaded_by=uploader,
+                    content_hash=item['content_hash'],
+                    duration=item['duration'],
+                    bitrate=item['bitrate'],
+                    sample_rate=item['sample_rate'],
+                    search_document=build_search_document(item['name'], item['description'], tags),
+                )
+                sound.mp3_file.name = self.store_file(item)
+                sound._import_tags = tags
+                sounds.append(sound)
+            Sound.objects.bulk_create(sounds, batch_size=len(sounds))
+
+            Through = Sound.tags.through
+            Through.objects.bulk_create(
+                [
+                    Through(sound_id=sound.pk, tag_id=tag_ids[name])
+                    for sound in sounds
+                    for name in dict.fromkeys(sound._import_tags)
+                ],
+                batch_size=1000,
+            )
+
+        totals['imported'] += len(sounds)
+        totals['bytes'] += sum(os.path.getsize(item['path']) for item in new_items)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {totals['imported']} imported so far ({self.rate(totals, elapsed)})")
+
+    @staticmethod
+    def store_file(item):
+        """
+        Copy the file into storage under its content hash. A copy left behind
+        by an interrupted run has the same name and is reused.
+        """
+        name = f"{IMPORT_DIR}/{item['content_hash'][:2]}/{item['content_hash']}.mp3"
+        if not default_storage.exists(name):
+            with open(item['path'], 'rb') as f:
+                name = default_storage.save(name, File(f))
+        return name
@@ -0,0 +1,38 @@
+"""
+Management command to delete image variants no sound references any more
+Run with: python manage.py prune_image_variants
+"""
+from django.core.management.base import BaseCommand
+
+from sounds.images import delete_variants, stored_variant_hashes
+from sounds.models import Sound
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored image variants whose source image hash is no longer used by any sound'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        stored = set(stored_variant_hashes())
+        in_use = set(
+            Sound.objects.filter(image_hash__in=stored).values_list('image_hash', flat=True)
+        )
+        unused = sorted(stored - in_use)
+
+        files = 0
+        for image_hash in unused:
+            if options['dry_run']:
+                self.stdout.write(f'Would delete variants of {image_hash}')
+            else:
+                files += delete_variants(image_hash)
+
+        verb = 'Would prune' if options['dry_run'] else 'Pruned'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(unused)} unused image hash(es), {files} file(s) deleted.'
+        ))
@@ -0,0 +1,34 @@
+"""
+Management command to delete expired refresh tokens and their blacklist entries
+Run with: python manage.py prune_tokens
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sounds.token_blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired outstanding and blacklisted refresh tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'TOKEN_PRUNE_BATCH_SIZE', 1000),
+            help='Tokens deleted per transaction',
+        )
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='Stop after this many batches (default: until none are left)',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help='Seconds to wait between batches',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_tokens(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s).'))
@@ -0,0 +1,32 @@
+"""
+Management command to rebuild denormalized sound counters
+Run with: python manage.py rebuild_sound_counters
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sounds.counters import rebuild_counters
+from sounds.models import Sound
+
+
+class Command(BaseCommand):
+    help = 'Recomputes favorite_count and comment_count for every sound from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sound',
+            type=int,
+            action='append',
+            dest='sound_ids',
+            help='Only rebuild the given sound ID (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Sound.objects.all()
+        if options['sound_ids']:
+            queryset = queryset.filter(pk__in=options['sound_ids'])
+
+        with transaction.atomic():
+            updated = rebuild_counters(queryset)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} sound(s).'))
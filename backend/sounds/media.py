@@ -0,0 +1,214 @@
+"""
+Media delivery for ``Sound.mp3_file`` and image variants (``sounds.images``).
+
+Responses carry strong validators and ``Cache-Control`` and honour
+single-range ``Range`` / ``If-Range`` requests with ``206 Partial Content``,
+so players can seek without downloading the whole file. An unsatisfiable
+range gets a bare ``416`` marked ``no-store``. Bodies are streamed
+from disk in fixed-size chunks; under a WSGI server with ``wsgi.file_wrapper``
+(gunicorn) the bounded file is handed to ``sendfile()``.
+
+With ``SOUND_MEDIA_OFFLOAD`` set, Django only checks validators and answers
+with an ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache/lighttpd)
+header; the front proxy then does the byte transfer and range handling.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+
+OFFLOAD_X_ACCEL = 'x-accel-redirect'
+OFFLOAD_X_SENDFILE = 'x-sendfile'
+
+AUDIO_CHUNK_SIZE = 64 * 1024
+DEFAULT_AUDIO_CONTENT_TYPE = 'audio/mpeg'
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised for a well-formed byte range that lies outside the file."""
+
+
+class BoundedFile:
+    """
+    Read-only view of ``length`` bytes of an open file from its current offset.
+
+    ``fileno()`` is exposed so ``wsgi.file_wrapper`` implementations can use
+    ``sendfile()``; they bound the transfer by ``Content-Length``.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range_header(header, size):
+    """
+    Return the inclusive ``(start, end)`` of a single byte range, or None when
+    the header should be ignored (missing, malformed or multi-range).
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def file_validators(name, stat):
+    """Return ``(etag, last_modified)`` for a stored file."""
+    digest = hashlib.sha256(f'{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+    return f'"{digest[:32]}"', int(stat.st_mtime)
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        candidates = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+        return '*' in candidates or etag in candidates
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def if_range_matches(request, etag, last_modified):
+    """``If-Range`` needs a strong ETag match or the exact Last-Modified date."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def get_offload_mode():
+    mode = (getattr(settings, 'SOUND_MEDIA_OFFLOAD', '') or '').lower()
+    if mode not in ('', OFFLOAD_X_ACCEL, OFFLOAD_X_SENDFILE):
+        raise ImproperlyConfigured(
+            f"SOUND_MEDIA_OFFLOAD must be '', '{OFFLOAD_X_ACCEL}' or '{OFFLOAD_X_SENDFILE}'"
+        )
+    return mode
+
+
+def set_validator_headers(response, etag, last_modified, immutable=False):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if immutable:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=getattr(settings, 'SOUND_MEDIA_MAX_AGE', 86400)
+        )
+    return response
+
+
+def offload_response(mode, name, path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if mode == OFFLOAD_X_ACCEL:
+        prefix = getattr(settings, 'SOUND_MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_field_file(request, field_file):
+    """
+    Build the response for ``field_file``: 304, 416, offload, 206 or 200.
+
+    Storages without local paths are answered with a redirect to their URL.
+    """
+    return serve_stored_file(request, field_file.storage, field_file.name)
+
+
+def serve_stored_file(request, storage, name, immutable=False):
+    """
+    Serve ``name`` from ``storage``; see ``serve_field_file``. ``immutable``
+    is for content-addressed names and sets a one-year ``Cache-Control``.
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return redirect(storage.url(name))
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('File not found')
+    etag, last_modified = file_validators(name, stat)
+    content_type = mimetypes.guess_type(name)[0] or DEFAULT_AUDIO_CONTENT_TYPE
+
+    def finish(response):
+        return set_validator_headers(response, etag, last_modified, immutable)
+
+    if is_not_modified(request, etag, last_modified):
+        return finish(HttpResponseNotModified())
+
+    mode = get_offload_mode()
+    if mode:
+        return finish(offload_response(mode, name, path, content_type))
+
+    size = stat.st_size
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            # An error, not a representation: no validators, and no cache may keep it
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            patch_cache_control(response, no_store=True)
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    file = open(path, 'rb')
+    file.seek(start)
+    response = FileResponse(BoundedFile(file, length), content_type=content_type)
+    response.block_size = AUDIO_CHUNK_SIZE
+    response['Content-Length'] = str(length)
+    if byte_range is not None:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finish(response)
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+from sounds.search import build_search_document, install_search_index, uninstall_search_index
+
+
+def populate_search_documents(apps, schema_editor):
+    Sound = apps.get_model('sounds', 'Sound')
+    sounds = list(Sound.objects.prefetch_related('tags'))
+    for sound in sounds:
+        sound.search_document = build_search_document(
+            sound.name, sound.description, [tag.name for tag in sound.tags.all()]
+        )
+    Sound.objects.bulk_update(sounds, ['search_document'], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sound',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
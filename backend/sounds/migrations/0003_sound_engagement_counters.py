@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Sound = apps.get_model('sounds', 'Sound')
+    Comment = apps.get_model('sounds', 'Comment')
+    Favorite = apps.get_model('sounds', 'Favorite')
+
+    def count_of(model):
+        counts = (
+            model.objects.filter(sound=OuterRef('pk'))
+            .order_by()
+            .values('sound')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts), Value(0))
+
+    Sound.objects.update(
+        favorite_count=count_of(Favorite),
+        comment_count=count_of(Comment),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0002_sound_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sound',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0003_sound_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['-created_at', '-id'], name='comment_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sound',
+            index=models.Index(fields=['-created_at', '-id'], name='sound_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sound',
+            index=models.Index(fields=['name', 'id'], name='sound_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sound',
+            name='analysis_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='bitrate',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Bits per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='duration',
+            field=models.FloatField(blank=True, editable=False, help_text='Seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='loudness',
+            field=models.FloatField(blank=True, editable=False, help_text='Gated RMS loudness, dBFS', null=True),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='sample_rate',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Hz', null=True),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='waveform_peaks',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+    ]
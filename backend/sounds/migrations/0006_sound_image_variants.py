@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:25
+
+from django.db import migrations, models
+
+from sounds.images import describe_image
+
+
+def populate_image_descriptors(apps, schema_editor):
+    Sound = apps.get_model('sounds', 'Sound')
+    sounds = list(Sound.objects.exclude(image='').exclude(image__isnull=True).only('image'))
+    for sound in sounds:
+        sound.image_hash, sound.image_width, sound.image_height = describe_image(sound.image)
+    Sound.objects.bulk_update(sounds, ['image_hash', 'image_width', 'image_height'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0005_sound_audio_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sound',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sound',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_image_descriptors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0007_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sound',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Hex SHA-256 of mp3_file; import_sounds skips files already stored', max_length=64),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# simplejwt's table has no index on expires_at; pruning and the blacklist
+# filter rebuild select by it. The table is written on every login and
+# refresh, so on PostgreSQL the index is built without blocking writes.
+INDEX_NAME = 'outstandingtoken_expires_at_idx'
+TABLE_NAME = 'token_blacklist_outstandingtoken'
+
+
+def create_expiry_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {TABLE_NAME} (expires_at)'
+    )
+
+
+def drop_expiry_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sounds', '0008_sound_content_hash'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_expiry_index, drop_expiry_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sounds', '0009_outstandingtoken_expiry_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['sound', '-created_at', '-id'], name='comment_sound_created_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+
+# ?tag= and the tag search filter with name__icontains, which PostgreSQL runs
+# as UPPER(name::text) LIKE UPPER(%s); a trigram index on that expression
+# serves it. pg_trgm was installed by 0002_sound_search_document.
+TAG_NAME_TRGM_INDEX = 'sounds_tag_name_upper_trgm'
+
+
+def concurrently(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """``AddIndex`` built without blocking writes on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            options = {'concurrently': True} if concurrently(schema_editor) else {}
+            schema_editor.add_index(model, self.index, **options)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            options = {'concurrently': True} if concurrently(schema_editor) else {}
+            schema_editor.remove_index(model, self.index, **options)
+
+
+def create_trigram_index(apps, schema_editor):
+    if concurrently(schema_editor):
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {TAG_NAME_TRGM_INDEX} '
+            'ON sounds_tag USING gin ((UPPER(name::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if concurrently(schema_editor):
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {TAG_NAME_TRGM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sounds', '0011_drop_redundant_fk_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='sound',
+            index=models.Index(condition=models.Q(('analysis_status', 'done'), _negated=True), fields=['id'], name='sound_analysis_backlog_idx'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -16,25 +18,84 @@ class Tag(models.Model):
 
 class Sound(models.Model):
     """Sound model for storing audio files and metadata"""
+
+    class AnalysisStatus(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    # Only ever written with queryset UPDATEs, so a regular save() skips them
+    UPDATE_ONLY_FIELDS = (
+        'favorite_count', 'comment_count',
+        'duration', 'bitrate', 'sample_rate', 'loudness', 'waveform_peaks', 'analysis_status',
+        'content_hash',
+    )
+
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     mp3_file = models.FileField(upload_to='sounds/mp3/')
     image = models.ImageField(upload_to='sounds/images/', blank=True, null=True)
+    # Content hash and size of `image`, maintained by sounds.signals; keys the variants in sounds.images
+    image_hash = models.CharField(max_length=16, blank=True, default='', db_index=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_sounds')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     tags = models.ManyToManyField(Tag, related_name='sounds', blank=True)
+    # Denormalized name/description/tag text, indexed for full-text search (see sounds.search)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Engagement counters maintained by sounds.signals; rebuild with `manage.py rebuild_sound_counters`
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Filled in by the background analysis stage (see sounds.analysis)
+    content_hash = models.CharField(
+        max_length=64, blank=True, default='', db_index=True, editable=False,
+        help_text='Hex SHA-256 of mp3_file; import_sounds skips files already stored'
+    )
+    duration = models.FloatField(null=True, blank=True, editable=False, help_text='Seconds')
+    bitrate = models.PositiveIntegerField(null=True, blank=True, editable=False, help_text='Bits per second')
+    sample_rate = models.PositiveIntegerField(null=True, blank=True, editable=False, help_text='Hz')
+    loudness = models.FloatField(null=True, blank=True, editable=False, help_text='Gated RMS loudness, dBFS')
+    waveform_peaks = models.BinaryField(default=b'', blank=True, editable=False)
+    analysis_status = models.CharField(
+        max_length=10, choices=AnalysisStatus.choices, default=AnalysisStatus.PENDING, editable=False
+    )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Counters and analysis results are only ever changed by UPDATEs (see
+        # sounds.counters and sounds.analysis); never write back a possibly
+        # stale in-memory value on a regular save.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.UPDATE_ONLY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on the default and ?ordering=name orderings
+            models.Index(fields=['-created_at', '-id'], name='sound_created_id_idx'),
+            models.Index(fields=['name', 'id'], name='sound_name_id_idx'),
+            # analyze_sounds' backlog: the few sounds not analysed yet
+            models.Index(
+                fields=['id'], condition=~models.Q(analysis_status='done'), name='sound_analysis_backlog_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
     """Comment model for user comments on sounds"""
-    sound = models.ForeignKey(Sound, on_delete=models.CASCADE, related_name='comments')
+    # Indexed by comment_sound_created_idx, whose first column it is
+    sound = models.ForeignKey(Sound, on_delete=models.CASCADE, related_name='comments', db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -44,17 +105,46 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='comment_created_id_idx'),
+            # A sound's comments, newest first (sounds.comments)
+            models.Index(fields=['sound', '-created_at', '-id'], name='comment_sound_created_idx'),
+        ]
 
 
 class Favorite(models.Model):
     """Favorite model for users to favorite sounds"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
+    # Indexed by the (user, sound) unique constraint and favorite_user_created_id_idx
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites', db_index=False)
     sound = models.ForeignKey(Sound, on_delete=models.CASCADE, related_name='favorited_by')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ['user', 'sound']
         ordering = ['-created_at']
+        indexes = [
+            # Favorites are always listed for one user, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} favorited {self.sound.name}"
+
+
+class UploadSession(models.Model):
+    """Resumable chunked upload of an audio file (see sounds.uploads)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Hex SHA-256 of the whole file; checked on finalize
+    checksum = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched by every chunk; sessions idle for UPLOAD_SESSION_TTL are garbage-collected
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.user.username} uploading {self.filename}"
+
+    class Meta:
+        ordering = ['-created_at']
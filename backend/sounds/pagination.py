@@ -0,0 +1,237 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with ``WHERE (a, b, id) < (:a, :b, :id)``-style predicates
+on the queryset's ordering plus the primary key as a tiebreaker, so every page
+costs the same index range scan and no ``COUNT(*)`` is issued. Requests that
+pass ``?page=`` still get classic page-number pagination while clients move
+over.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Requests carrying this parameter use page-number pagination instead
+    legacy_page_query_param = 'page'
+    legacy_pagination_class = PageNumberPagination
+
+    def __init__(self):
+        self.legacy = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.legacy_page_query_param in request.query_params:
+            self.legacy = self.legacy_pagination_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        window = self.page_window(queryset, request)
+        return self.finish_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, using the async ORM."""
+        if self.legacy_page_query_param in request.query_params:
+            self.legacy = self.legacy_pagination_class()
+            return await apaginate_page_number(self.legacy, queryset, request, view)
+        window = self.page_window(queryset, request)
+        return self.finish_page([item async for item in window])
+
+    def page_window(self, queryset, request):
+        """Return the (unevaluated) slice holding the page plus one look-ahead row."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        self.position, self.reverse = self.decode_cursor(request)
+        if self.position is not None:
+            queryset = queryset.filter(self.position_filter(self.position, self.reverse))
+        return queryset.order_by(*self.directed_ordering(self.reverse))[:self.page_size + 1]
+
+    def finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering as ``[(field, descending), ...]`` ending with the
+        primary key, which makes every position unique.
+        """
+        names = list(queryset.query.order_by) or list(self.model._meta.ordering)
+        ordering = []
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            descending = name.startswith('-')
+            field = name.lstrip('-')
+            if field == 'pk':
+                field = self.model._meta.pk.name
+            ordering.append((field, descending))
+        pk_name = self.model._meta.pk.name
+        if not any(field == pk_name for field, _ in ordering):
+            last_descending = ordering[-1][1] if ordering else True
+            ordering.append((pk_name, last_descending))
+        return ordering
+
+    def directed_ordering(self, reverse):
+        return [
+            f'-{field}' if descending != reverse else field
+            for field, descending in self.ordering
+        ]
+
+    def position_filter(self, position, reverse):
+        """Build ``(a, b, pk) > (va, vb, vpk)`` as an OR of prefix equalities."""
+        condition = Q()
+        equal_prefix = {}
+        for (field, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal_prefix, **{f'{field}__{lookup}': value})
+            equal_prefix[field] = value
+        return condition
+
+    def position_of(self, item):
+        values = []
+        for field, _ in self.ordering:
+            value = getattr(item, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            raw_position = payload['p']
+            reverse = bool(payload.get('r'))
+            if not isinstance(raw_position, list) or len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.to_python(field, value)
+                for (field, _), value in zip(self.ordering, raw_position)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def to_python(self, field_name, value):
+        try:
+            field = self.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            # Annotations such as search_rank are plain JSON scalars
+            return value
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.position_of(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.position_of(self.page[0]), reverse=True)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+async def apaginate_page_number(pagination, queryset, request, view=None):
+    """
+    ``PageNumberPagination.paginate_queryset`` for async views: the count and
+    the page are fetched with the async ORM before Django's ``Paginator``
+    sees them, so it never queries on its own.
+    """
+    pagination.request = request
+    page_size = pagination.get_page_size(request)
+    if not page_size:
+        return None
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    pagination.page.object_list = [item async for item in pagination.page.object_list]
+    if paginator.num_pages > 1 and pagination.template is not None:
+        pagination.display_page_controls = True
+    return list(pagination.page)
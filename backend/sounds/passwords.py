@@ -0,0 +1,130 @@
+"""
+Password hashing on a small dedicated thread pool.
+
+PBKDF2 is slow on purpose, so a burst of logins (brute force included) can
+take every core on the instance away from the catalog endpoints. ``login``
+and ``register`` therefore hash on at most ``PASSWORD_HASH_WORKERS`` threads
+per process. ``hashlib`` runs PBKDF2 without the GIL, so those threads really
+do run in parallel, and nothing else does the hashing. Up to
+``PASSWORD_HASH_QUEUE`` more requests wait their turn. Beyond that,
+``HashingBusy`` is raised at once and the view answers 503 with a
+Retry-After estimated from recent hash times.
+
+Only the hashing runs on the pool. The user row is read and written on the
+request thread, inside its transaction. A login whose stored hash is
+weaker than the current hasher settings gets an upgraded hash. The user's
+existing tokens stay valid (see ``remember_password_upgrade``).
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from soundvault_backend import metrics
+
+from .authentication import remember_password_upgrade
+
+metrics.describe(
+    'password_hashing_rejections_total', 'counter',
+    'Logins and registrations refused with 503 because the password hashing pool was full.',
+)
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+# Moving average of one hash, seeded with a typical PBKDF2 time
+_average_seconds = 0.3
+
+
+class HashingBusy(Exception):
+    """The hashing pool and its queue are full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Password hashing is saturated; retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+def _workers():
+    return max(1, getattr(settings, 'PASSWORD_HASH_WORKERS', 2))
+
+
+def get_executor():
+    """Return the shared pool and the semaphore bounding its running and queued jobs."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = _workers()
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'PASSWORD_HASH_QUEUE', 8))
+        return _executor, _slots
+
+
+def shutdown_executor(wait=True):
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = _slots = None
+
+
+def retry_after():
+    """Seconds for a full pool and queue to drain, rounded up."""
+    queued = _workers() + getattr(settings, 'PASSWORD_HASH_QUEUE', 8)
+    return max(1, math.ceil(queued * _average_seconds / _workers()))
+
+
+def _timed(func, *args):
+    global _average_seconds
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        _average_seconds = 0.8 * _average_seconds + 0.2 * (time.perf_counter() - start)
+
+
+def run_hashing(func, *args):
+    """Run ``func(*args)`` on the pool and wait for it; raise ``HashingBusy`` when full."""
+    executor, slots = get_executor()
+    if not slots.acquire(blocking=False):
+        metrics.increment('password_hashing_rejections_total')
+        raise HashingBusy(retry_after())
+    try:
+        future = executor.submit(_timed, func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    # Released when the job finishes, even if the waiting request has gone
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    return run_hashing(make_password, password)
+
+
+def _check(password, encoded):
+    if encoded is None:
+        # Unknown account: hash anyway so it takes as long as a known one
+        make_password(password)
+        return False, None
+    outdated = []
+    valid = check_password(password, encoded, setter=outdated.append)
+    return valid, make_password(password) if outdated else None
+
+
+def verify_password(user, password):
+    """
+    Check ``password`` for ``user`` (which may be None) and save an upgraded
+    hash when the stored one is outdated.
+    """
+    valid, upgraded = run_hashing(_check, password, user.password if user else None)
+    if upgraded:
+        previous = user.password
+        user.password = upgraded
+        user.save(update_fields=['password'])
+        # Same password, new hash: not a reason to revoke the user's tokens
+        remember_password_upgrade(user, previous)
+    return valid
@@ -0,0 +1,182 @@
+"""
+Response cache for public catalog reads.
+
+Anonymous ``list``/``retrieve`` responses are stored under keys that embed the
+current version of every *scope* they depend on (the sound list, one sound,
+the tag list). Writes never delete response keys; they bump the affected
+scope versions from ``sounds.signals`` once the transaction commits, which
+orphans exactly the stale entries and lets them expire on their own.
+
+``aget_scope_versions`` and ``CachedCatalogMixin.acached_response`` use the
+cache backend's ``aget``/``aset`` family, so the async read path awaits the
+cache instead of blocking the event loop on it.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from soundvault_backend import metrics
+
+
+SOUND_LIST_SCOPE = 'sound-list'
+TAG_LIST_SCOPE = 'tag-list'
+
+VERSION_KEY = 'catalog:version:{scope}'
+RESPONSE_KEY = 'catalog:response:{digest}'
+
+metrics.describe('response_cache_requests_total', 'counter', 'Anonymous catalog reads by cache result.')
+
+
+def sound_scope(sound_id):
+    return f'sound:{sound_id}'
+
+
+def response_cache_enabled():
+    return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+
+def get_scope_versions(scopes):
+    """
+    Return ``{scope: version}``. Versions are nanosecond timestamps of the
+    last bump, so a version lost to eviction is never reissued.
+    """
+    keys = {VERSION_KEY.format(scope=scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        found.update(cache.get_many(list(missing)))
+    return {scope: found.get(key, missing.get(key)) for key, scope in keys.items()}
+
+
+async def aget_scope_versions(scopes):
+    """``get_scope_versions`` for async views."""
+    keys = {VERSION_KEY.format(scope=scope): scope for scope in scopes}
+    found = await cache.aget_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        for key, version in missing.items():
+            await cache.aadd(key, version, timeout=None)
+        found.update(await cache.aget_many(list(missing)))
+    return {scope: found.get(key, missing.get(key)) for key, scope in keys.items()}
+
+
+def bump_scopes(*scopes):
+    """Invalidate every cached response that depends on one of ``scopes``."""
+    version = time.time_ns()
+    cache.set_many({VERSION_KEY.format(scope=scope): version for scope in scopes}, timeout=None)
+
+
+def bump_scopes_on_commit(*scopes):
+    scopes = tuple(scopes)
+    if scopes:
+        transaction.on_commit(lambda: bump_scopes(*scopes))
+
+
+def build_cache_key(request, versions):
+    auth_state = f'user:{request.user.pk}' if request.user.is_authenticated else 'anon'
+    params = sorted(request.query_params.lists())
+    # Bodies hold absolute URLs (media, srcset, keyset links), so the origin is part of the key
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        repr(params),
+        auth_state,
+        repr(sorted(versions.items())),
+    ]
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return RESPONSE_KEY.format(digest=digest)
+
+
+class CachedCatalogMixin:
+    """
+    Serve anonymous ``list``/``retrieve`` from the response cache.
+
+    Views declare which scopes their responses depend on through
+    ``get_cache_scopes()``. Authenticated responses carry per-user fields such
+    as ``is_favorite`` and are never cached.
+    """
+    cache_metric_name = 'response_cache_requests_total'
+
+    def get_cache_scopes(self):
+        """Return the scopes this response depends on, or None to bypass the cache."""
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(request, super().alist, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(request, super().aretrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key, response = self.cache_lookup(request)
+        if response is None:
+            response = self.cache_store(key, handler(request, *args, **kwargs))
+        return response
+
+    async def acached_response(self, request, handler, *args, **kwargs):
+        key, response = await self.acache_lookup(request)
+        if response is None:
+            response = await self.acache_store(key, await handler(request, *args, **kwargs))
+        return response
+
+    def cache_bypassed(self, request, scopes):
+        return not response_cache_enabled() or request.user.is_authenticated or scopes is None
+
+    def cache_lookup(self, request):
+        """Return ``(key, cached response or None)``; the key is None when bypassing."""
+        scopes = self.get_cache_scopes()
+        if self.cache_bypassed(request, scopes):
+            return None, None
+        key = build_cache_key(request, get_scope_versions(scopes))
+        return key, self.cache_hit(key, cache.get(key))
+
+    async def acache_lookup(self, request):
+        scopes = self.get_cache_scopes()
+        if self.cache_bypassed(request, scopes):
+            return None, None
+        key = build_cache_key(request, await aget_scope_versions(scopes))
+        return key, self.cache_hit(key, await cache.aget(key))
+
+    def cache_hit(self, key, data):
+        """Count the lookup and wrap a cached body in a response."""
+        view_name = f'{self.basename}-{self.action}'
+        if data is None:
+            metrics.increment(self.cache_metric_name, view=view_name, result='miss')
+            return None
+        metrics.increment(self.cache_metric_name, view=view_name, result='hit')
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def cache_store(self, key, response):
+        if key is not None and response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout())
+        return self.cache_miss(key, response)
+
+    async def acache_store(self, key, response):
+        if key is not None and response.status_code == 200:
+            await cache.aset(key, response.data, self.cache_timeout())
+        return self.cache_miss(key, response)
+
+    @staticmethod
+    def cache_timeout():
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+    @staticmethod
+    def cache_miss(key, response):
+        if key is not None:
+            response['X-Cache'] = 'MISS'
+        return response
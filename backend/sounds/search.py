@@ -0,0 +1,243 @@
+"""
+Full-text search over sounds.
+
+Every sound keeps a denormalized ``search_document`` (name, description and
+tag names) that is refreshed by the signal handlers in ``sounds.signals``.
+The document is indexed per database backend:
+
+- PostgreSQL: a generated ``search_vector`` tsvector column with a GIN index,
+  plus a trigram GIN index on ``search_document`` for fuzzy word matches.
+- SQLite (``USE_SQLITE``): an FTS5 external-content table kept in sync by
+  triggers on ``sounds_sound``.
+
+Both are created by migration ``0002_sound_search_document``; the SQLite
+triggers are restored after ``migrate`` if a table rebuild dropped them.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+SEARCH_CONFIG = 'english'
+SQLITE_FTS_TABLE = 'sounds_sound_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+POSTGRES_INSTALL_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    (
+        "ALTER TABLE sounds_sound ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', coalesce(search_document, ''))) STORED"
+    ),
+    "CREATE INDEX IF NOT EXISTS sounds_sound_search_vector_gin ON sounds_sound USING gin (search_vector)",
+    (
+        "CREATE INDEX IF NOT EXISTS sounds_sound_search_document_trgm "
+        "ON sounds_sound USING gin (search_document gin_trgm_ops)"
+    ),
+]
+
+POSTGRES_UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS sounds_sound_search_document_trgm",
+    "DROP INDEX IF EXISTS sounds_sound_search_vector_gin",
+    "ALTER TABLE sounds_sound DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL_SQL = [
+    (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+        "search_document, content='sounds_sound', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ),
+    (
+        f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai AFTER INSERT ON sounds_sound BEGIN "
+        f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); "
+        "END"
+    ),
+    (
+        f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad AFTER DELETE ON sounds_sound BEGIN "
+        f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, search_document) "
+        "VALUES ('delete', old.id, old.search_document); "
+        "END"
+    ),
+    (
+        f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au AFTER UPDATE OF search_document ON sounds_sound BEGIN "
+        f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, search_document) "
+        "VALUES ('delete', old.id, old.search_document); "
+        f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); "
+        "END"
+    ),
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}",
+]
+
+
+def install_search_index(schema_editor):
+    """
+    Create the backend-specific search index. Safe to run more than once, so
+    later migrations that rebuild ``sounds_sound`` on SQLite can call it again.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_INSTALL_SQL
+    elif vendor == 'sqlite':
+        statements = SQLITE_INSTALL_SQL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def uninstall_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_UNINSTALL_SQL
+    elif vendor == 'sqlite':
+        statements = SQLITE_UNINSTALL_SQL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def restore_sqlite_search_index(using):
+    """
+    SQLite drops triggers when a migration rebuilds ``sounds_sound`` (for
+    example to add a column with a CHECK constraint). Reinstall them, and
+    resync the FTS table, whenever the index exists but a trigger is missing.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name LIKE %s",
+            (f'{SQLITE_FTS_TABLE}%',),
+        )
+        objects = set(cursor.fetchall())
+    if ('table', SQLITE_FTS_TABLE) not in objects:
+        return False
+    triggers = {name for kind, name in objects if kind == 'trigger'}
+    expected = {f'{SQLITE_FTS_TABLE}_{suffix}' for suffix in ('ai', 'ad', 'au')}
+    if expected <= triggers:
+        return False
+    with conn.schema_editor() as schema_editor:
+        install_search_index(schema_editor)
+    return True
+
+
+def build_search_document(name, description, tag_names):
+    """Concatenate the searchable text of a sound into a single document."""
+    parts = [name, description, *tag_names]
+    return ' '.join(part.strip() for part in parts if part and part.strip())
+
+
+def refresh_search_documents(sound_ids):
+    """Recompute ``search_document`` for the given sounds in one batch."""
+    from .models import Sound
+
+    sound_ids = list(sound_ids)
+    if not sound_ids:
+        return
+    sounds = list(
+        Sound.objects.filter(pk__in=sound_ids)
+        .only('id', 'name', 'description', 'search_document')
+        .prefetch_related('tags')
+    )
+    changed = []
+    for sound in sounds:
+        document = build_search_document(
+            sound.name, sound.description, [tag.name for tag in sound.tags.all()]
+        )
+        if document != sound.search_document:
+            sound.search_document = document
+            changed.append(sound)
+    if changed:
+        Sound.objects.bulk_update(changed, ['search_document'], batch_size=500)
+
+
+def search_terms(query):
+    """Split a user query into plain word tokens safe for tsquery/FTS5 syntax."""
+    return _TOKEN_RE.findall(query or '')
+
+
+def search_sounds(queryset, query):
+    """
+    Filter ``queryset`` to sounds matching ``query`` and annotate each row with
+    a ``search_rank`` where higher means more relevant.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        phrase = ' '.join(terms)
+        # The search terms are bound as params; only the SEARCH_CONFIG constant is inlined
+        match = RawSQL(  # nosec B611
+            f"(sounds_sound.search_vector @@ to_tsquery('{SEARCH_CONFIG}', %s) "
+            "OR %s <%% sounds_sound.search_document)",
+            (tsquery, phrase),
+            output_field=BooleanField(),
+        )
+        # Bound and inlined the same way as the match.
+        rank = RawSQL(  # nosec B611
+            f"(ts_rank(sounds_sound.search_vector, to_tsquery('{SEARCH_CONFIG}', %s)) "
+            "+ word_similarity(%s, sounds_sound.search_document))",
+            (tsquery, phrase),
+            output_field=FloatField(),
+        )
+        return queryset.alias(search_match=match).filter(search_match=True).annotate(search_rank=rank)
+
+    if vendor == 'sqlite':
+        fts_query = ' '.join(f'"{term}"*' for term in terms)
+        # The FTS query is bound as a param; only the SQLITE_FTS_TABLE constant is inlined
+        matching_ids = RawSQL(  # nosec B611
+            f"SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s",
+            (fts_query,),
+        )
+        # bm25() is lower for better matches, so negate it to rank descending.
+        # Bound and inlined the same way as matching_ids.
+        rank = RawSQL(  # nosec B611
+            f"-(SELECT bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND {SQLITE_FTS_TABLE}.rowid = sounds_sound.id)",
+            (fts_query,),
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matching_ids).annotate(search_rank=rank)
+
+    # Unknown backends fall back to a plain scan of the search document.
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return queryset.annotate(search_rank=RawSQL('0', (), output_field=FloatField()))
+
+
+class SoundSearchFilter(BaseFilterBackend):
+    """
+    Single search path for ``?search=`` on sounds.
+
+    Results are ordered by relevance unless the client asked for an explicit
+    ``?ordering=``, so place this backend after ``OrderingFilter``.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if not search_terms(query):
+            return queryset.none()
+        queryset = search_sounds(queryset, query)
+        if not request.query_params.get(OrderingFilter.ordering_param):
+            fallback = getattr(view, 'ordering', None) or []
+            queryset = queryset.order_by('-search_rank', *fallback)
+        return queryset
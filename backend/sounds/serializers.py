@@ -1,9 +1,36 @@
+import base64
+import os
+import re
+
 from rest_framework import serializers
 import bleach
 from django.contrib.auth.models import User
 from django.conf import settings
-from .models import Sound, Tag, Comment, Favorite
+from django.urls import reverse
+from .models import Sound, Tag, Comment, Favorite, UploadSession
+from .comments import latest_comments
+from .favorites import favorite_sound_ids_for_request
+from .images import srcset as image_srcset
+from .uploads import current_offset
+
+
+def audio_url(sound):
+    """Path of the range-capable audio endpoint (sounds.media) for ``sound``."""
+    return reverse('sound-audio', kwargs={'pk': sound.pk})
+
+
+class Base64BinaryField(serializers.Field):
+    """Read-only field rendering a binary blob as a base64 string."""
 
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return base64.b64encode(bytes(value)).decode('ascii')
+
+
+ANALYSIS_FIELDS = ['duration', 'bitrate', 'sample_rate', 'loudness', 'waveform_peaks', 'analysis_status']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -19,21 +46,51 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_staff']
 
 
-class SoundListSerializer(serializers.ModelSerializer):
+class ImageSrcsetMixin:
+    """Expose ``image_srcset``: ``{mime_type: srcset}`` of resized variants (sounds.images)."""
+
+    def get_image_srcset(self, obj):
+        request = self.context.get('request')
+
+        def build_url(path):
+            if request:
+                url = request.build_absolute_uri(path)
+                if url.startswith('http://'):
+                    if request.META.get('HTTP_X_FORWARDED_PROTO') == 'https' or not settings.DEBUG:
+                        url = url.replace('http://', 'https://')
+                return url
+            if settings.BASE_URL:
+                return f"{settings.BASE_URL.rstrip('/')}{path}"
+            return path
+
+        return image_srcset(obj, build_url)
+
+
+class FavoriteStatusMixin:
+    """Resolve ``is_favorite`` from the request-wide favorite ID set."""
+
+    def get_is_favorite(self, obj):
+        return obj.pk in favorite_sound_ids_for_request(self.context.get('request'))
+
+
+class SoundListSerializer(FavoriteStatusMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     """Serializer for listing sounds (less detail)"""
     tags = TagSerializer(many=True, read_only=True)
     uploaded_by = serializers.StringRelatedField()
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     mp3_url = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
+    waveform_peaks = Base64BinaryField()
 
     class Meta:
         model = Sound
         fields = [
-            'id', 'name', 'description', 'image_url', 'mp3_url',
-            'tags', 'uploaded_by', 'created_at', 'is_favorite'
+            'id', 'name', 'description', 'image_url', 'image_srcset', 'mp3_url',
+            'tags', 'uploaded_by', 'created_at', 'is_favorite',
+            'favorite_count', 'comment_count', *ANALYSIS_FIELDS
         ]
-        read_only_fields = ['created_at']
+        read_only_fields = ['created_at', 'favorite_count', 'comment_count', *ANALYSIS_FIELDS]
 
     def get_image_url(self, obj):
         if obj.image:
@@ -57,7 +114,7 @@ class SoundListSerializer(serializers.ModelSerializer):
         if obj.mp3_file:
             request = self.context.get('request')
             if request:
-                url = request.build_absolute_uri(obj.mp3_file.url)
+                url = request.build_absolute_uri(audio_url(obj))
                 # Force HTTPS - App Runner serves over HTTPS
                 # Check if behind proxy (X-Forwarded-Proto header) or force HTTPS
                 if url.startswith('http://'):
@@ -67,35 +124,32 @@ class SoundListSerializer(serializers.ModelSerializer):
                 return url
             # Fallback: use BASE_URL if available
             if settings.BASE_URL:
-                return f"{settings.BASE_URL.rstrip('/')}{obj.mp3_file.url}"
-            return obj.mp3_file.url
+                return f"{settings.BASE_URL.rstrip('/')}{audio_url(obj)}"
+            return audio_url(obj)
         return None
 
-    def get_is_favorite(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, sound=obj).exists()
-        return False
-
 
-class SoundDetailSerializer(serializers.ModelSerializer):
+class SoundDetailSerializer(FavoriteStatusMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     """Serializer for detailed sound view"""
     tags = TagSerializer(many=True, read_only=True)
     uploaded_by = UserSerializer(read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     mp3_url = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
     comments = serializers.SerializerMethodField()
-    favorite_count = serializers.SerializerMethodField()
+    waveform_peaks = Base64BinaryField()
 
     class Meta:
         model = Sound
         fields = [
-            'id', 'name', 'description', 'image_url', 'mp3_url',
+            'id', 'name', 'description', 'image_url', 'image_srcset', 'mp3_url',
             'tags', 'uploaded_by', 'created_at', 'updated_at',
-            'is_favorite', 'comments', 'favorite_count'
+            'is_favorite', 'comments', 'favorite_count', 'comment_count', *ANALYSIS_FIELDS
+        ]
+        read_only_fields = [
+            'created_at', 'updated_at', 'favorite_count', 'comment_count', *ANALYSIS_FIELDS
         ]
-        read_only_fields = ['created_at', 'updated_at']
 
     def get_image_url(self, obj):
         if obj.image:
@@ -119,7 +173,7 @@ class SoundDetailSerializer(serializers.ModelSerializer):
         if obj.mp3_file:
             request = self.context.get('request')
             if request:
-                url = request.build_absolute_uri(obj.mp3_file.url)
+                url = request.build_absolute_uri(audio_url(obj))
                 # Force HTTPS - App Runner serves over HTTPS
                 # Check if behind proxy (X-Forwarded-Proto header) or force HTTPS
                 if url.startswith('http://'):
@@ -129,23 +183,17 @@ class SoundDetailSerializer(serializers.ModelSerializer):
                 return url
             # Fallback: use BASE_URL if available
             if settings.BASE_URL:
-                return f"{settings.BASE_URL.rstrip('/')}{obj.mp3_file.url}"
-            return obj.mp3_file.url
+                return f"{settings.BASE_URL.rstrip('/')}{audio_url(obj)}"
+            return audio_url(obj)
         return None
 
-    def get_is_favorite(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, sound=obj).exists()
-        return False
-
     def get_comments(self, obj):
-        comments = obj.comments.all()[:10]  # Limit to 10 most recent
+        # The 10 most recent; the viewset prefetches them as recent_comments
+        comments = getattr(obj, 'recent_comments', None)
+        if comments is None:
+            comments = latest_comments([obj.pk])[obj.pk]
         return CommentSerializer(comments, many=True, context=self.context).data
 
-    def get_favorite_count(self, obj):
-        return obj.favorited_by.count()
-
 
 class CommentSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -215,3 +263,46 @@ class SoundCreateUpdateSerializer(serializers.ModelSerializer):
             instance.tags.set(tags_data)
         return instance
 
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for resumable upload sessions (see sounds.uploads)"""
+    offset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'checksum', 'offset', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def get_offset(self, obj):
+        return current_offset(obj)
+
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value.lower().endswith('.mp3'):
+            raise serializers.ValidationError('Only .mp3 files can be uploaded.')
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Size must be positive.')
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Files larger than {settings.UPLOAD_MAX_SIZE} bytes are not accepted.')
+        return value
+
+    def validate_checksum(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError('Checksum must be a hex SHA-256 digest.')
+        return value.lower()
+
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    """Target of a finished upload: a new sound, or an existing one whose audio is replaced"""
+    sound = serializers.PrimaryKeyRelatedField(queryset=Sound.objects.all(), required=False)
+    name = serializers.CharField(max_length=200, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('sound') and not attrs.get('name'):
+            raise serializers.ValidationError('Either an existing sound or a name is required.')
+        return attrs
@@ -0,0 +1,177 @@
+"""
+Signal handlers that keep denormalized sound data in sync with writes coming
+from the API, the Django admin or the shell.
+"""
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save,
+)
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from soundvault_backend.security_log import security_event
+
+from .analysis import schedule_analysis
+from .authentication import forget_user
+from .counters import adjust_counter
+from .favorites import invalidate_favorite_sound_ids
+from .images import describe_image, release_image_hash_on_commit
+from .models import Comment, Favorite, Sound, Tag
+from .response_cache import SOUND_LIST_SCOPE, TAG_LIST_SCOPE, bump_scopes_on_commit, sound_scope
+from .search import refresh_search_documents, restore_sqlite_search_index
+from .token_blacklist import remember_blacklisted
+
+
+def invalidate_sounds(sound_ids, *extra_scopes):
+    """Drop cached catalog responses for the given sounds and the sound list."""
+    bump_scopes_on_commit(SOUND_LIST_SCOPE, *extra_scopes, *(sound_scope(pk) for pk in sound_ids))
+
+
+@receiver(post_migrate)
+def search_index_migrated(sender, using, **kwargs):
+    if sender.name == 'sounds':
+        restore_sqlite_search_index(using)
+
+
+@receiver(pre_save, sender=Sound)
+def sound_saving(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = {}
+    if not instance._state.adding:
+        previous = (
+            Sound.objects.filter(pk=instance.pk)
+            .values('mp3_file', 'image', 'image_hash')
+            .first()
+        ) or {}
+    instance._audio_changed = bool(instance.mp3_file) and instance.mp3_file.name != previous.get('mp3_file')
+
+    if (instance.image.name or '') != (previous.get('image') or '') or (instance.image and not instance.image_hash):
+        instance.image_hash, instance.image_width, instance.image_height = describe_image(instance.image)
+        if previous.get('image_hash') != instance.image_hash:
+            release_image_hash_on_commit(previous.get('image_hash'))
+
+
+@receiver(post_save, sender=Sound)
+def sound_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_audio_changed', False):
+        instance._audio_changed = False
+        if not created:
+            # Stale results from the previous file must not outlive it
+            Sound.objects.filter(pk=instance.pk).update(
+                duration=None, bitrate=None, sample_rate=None, loudness=None, content_hash='',
+                waveform_peaks=b'', analysis_status=Sound.AnalysisStatus.PENDING,
+            )
+        schedule_analysis(instance)
+    refresh_search_documents([instance.pk])
+    invalidate_sounds([instance.pk])
+
+
+@receiver(post_delete, sender=Sound)
+def sound_deleted(sender, instance, **kwargs):
+    release_image_hash_on_commit(instance.image_hash)
+    invalidate_sounds([instance.pk])
+
+
+@receiver(m2m_changed, sender=Sound.tags.through)
+def sound_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # tag.sounds.add()/remove()/clear(): pk_set holds sound ids
+        if action == 'pre_clear':
+            instance._search_sound_ids = list(instance.sounds.values_list('pk', flat=True))
+            return
+        if action == 'post_clear':
+            sound_ids = getattr(instance, '_search_sound_ids', [])
+        elif action in ('post_add', 'post_remove'):
+            sound_ids = pk_set or []
+        else:
+            return
+    else:
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        sound_ids = [instance.pk]
+    refresh_search_documents(sound_ids)
+    invalidate_sounds(sound_ids)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_scopes_on_commit(TAG_LIST_SCOPE)
+        return
+    sound_ids = list(instance.sounds.values_list('pk', flat=True))
+    refresh_search_documents(sound_ids)
+    invalidate_sounds(sound_ids, TAG_LIST_SCOPE)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    instance._search_sound_ids = list(instance.sounds.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    sound_ids = getattr(instance, '_search_sound_ids', [])
+    refresh_search_documents(sound_ids)
+    invalidate_sounds(sound_ids, TAG_LIST_SCOPE)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def favorite_changed(sender, instance, **kwargs):
+    invalidate_favorite_sound_ids(instance.user_id)
+    invalidate_sounds([instance.sound_id])
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_counter(instance.sound_id, 'favorite_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    adjust_counter(instance.sound_id, 'favorite_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_sounds([instance.sound_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_counter(instance.sound_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    adjust_counter(instance.sound_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    # Token revocation checks in this process see the change at once
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, raw=False, **kwargs):
+    # Tokens blacklisted outside ClaimsRefreshToken.blacklist (admin, shell)
+    if created and not raw:
+        remember_blacklisted(instance.token.jti, instance.token.expires_at.timestamp())
+
+
+@receiver(user_login_failed)
+def login_failed(sender, credentials, request=None, **kwargs):
+    username = credentials.get('username') or credentials.get('email')
+    security_event('login_failed', request, username=username, message=f'Failed login for {username!r}')
+
@@ -1,9 +1,51 @@
-from django.test import TestCase
-from django.contrib.auth.models import User
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from urllib.parse import unquote
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser, User
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Sound, Tag, Comment, Favorite
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+import numpy as np
+from PIL import Image
+from soundvault_backend import metrics, security_log, server
+from soundvault_backend.security_index import SecurityLogIndex
+from soundvault_backend.middleware import RequestTimingMiddleware
+from . import analysis, audio_analysis, benchmarks, dataset, images, passwords, throttling, token_blacklist
+from .authentication import ClaimsRefreshToken, clear_user_cache
+from .comments import latest_comments, sound_comments
+from .models import Sound, Tag, Comment, Favorite, UploadSession
+from .token_blacklist import prune_expired_tokens, reset_blacklist_filter
 
 
 class SoundModelTest(TestCase):
@@ -244,3 +286,2084 @@ class AuthAPITest(TestCase):
         response = self.client.get('/api/auth/me/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['username'], 'testuser')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class SoundSearchTest(TestCase):
+    """Test full-text search on GET /api/sounds/?search="""
+
+    def setUp(self):
+        # Anonymous requests share the throttle history kept in the cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.ocean = Sound.objects.create(
+            name='Ocean Waves',
+            description='Peaceful waves on a calm beach',
+            uploaded_by=self.user
+        )
+        self.forest = Sound.objects.create(
+            name='Forest Birds',
+            description='Morning chorus',
+            uploaded_by=self.user
+        )
+        self.tag = Tag.objects.create(name='Relaxation')
+        self.forest.tags.add(self.tag)
+
+    def search(self, query):
+        response = self.client.get('/api/sounds/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['results']]
+
+    def test_search_matches_name_description_and_prefix(self):
+        self.assertEqual(self.search('ocean'), ['Ocean Waves'])
+        self.assertEqual(self.search('beach'), ['Ocean Waves'])
+        self.assertEqual(self.search('wav'), ['Ocean Waves'])
+
+    def test_search_document_follows_tag_changes(self):
+        self.assertEqual(self.search('relaxation'), ['Forest Birds'])
+        self.tag.name = 'Chill'
+        self.tag.save()
+        self.assertEqual(self.search('relaxation'), [])
+        self.assertEqual(self.search('chill'), ['Forest Birds'])
+        self.ocean.tags.add(self.tag)
+        self.assertEqual(sorted(self.search('chill')), ['Forest Birds', 'Ocean Waves'])
+        self.tag.delete()
+        self.assertEqual(self.search('chill'), [])
+
+    def test_search_ranks_by_relevance(self):
+        Sound.objects.create(
+            name='Ocean Ocean Ocean',
+            description='ocean',
+            uploaded_by=self.user
+        )
+        self.assertEqual(self.search('ocean')[0], 'Ocean Ocean Ocean')
+
+    def test_search_ignores_query_syntax(self):
+        self.assertEqual(self.search('"ocean*)'), ['Ocean Waves'])
+        self.assertEqual(self.search('!!!'), [])
+
+
+class FavoriteStatusTest(TestCase):
+    """Test batched is_favorite resolution"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.sounds = [
+            Sound.objects.create(name=f'Sound {i}', uploaded_by=self.user)
+            for i in range(5)
+        ]
+        Favorite.objects.create(user=self.user, sound=self.sounds[0])
+        Favorite.objects.create(user=self.user, sound=self.sounds[3])
+        self.client.force_authenticate(user=self.user)
+
+    def favorite_flags(self):
+        response = self.client.get('/api/sounds/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item['id']: item['is_favorite'] for item in response.data['results']}
+
+    def test_list_resolves_favorites_with_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            flags = self.favorite_flags()
+        favorite_queries = [q for q in ctx.captured_queries if 'sounds_favorite' in q['sql']]
+        self.assertEqual(len(favorite_queries), 1)
+        self.assertEqual(
+            {pk for pk, is_favorite in flags.items() if is_favorite},
+            {self.sounds[0].pk, self.sounds[3].pk}
+        )
+
+        # Served from the per-user cache on the next request
+        with CaptureQueriesContext(connection) as ctx:
+            self.favorite_flags()
+        self.assertFalse([q for q in ctx.captured_queries if 'sounds_favorite' in q['sql']])
+
+    def test_favorite_writes_invalidate_cached_ids(self):
+        self.favorite_flags()
+        response = self.client.post('/api/favorites/', {'sound': self.sounds[1].id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['sound_detail']['is_favorite'])
+        self.assertTrue(self.favorite_flags()[self.sounds[1].pk])
+
+        response = self.client.delete(f'/api/favorites/remove/?sound={self.sounds[0].id}')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(self.favorite_flags()[self.sounds[0].pk])
+
+
+class SoundCounterTest(TestCase):
+    """Test denormalized favorite/comment counters on Sound"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.sound = Sound.objects.create(name='Test Sound', uploaded_by=self.user)
+        self.other = Sound.objects.create(name='Other Sound', uploaded_by=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_counters_follow_api_writes(self):
+        self.client.post('/api/favorites/', {'sound': self.sound.id})
+        response = self.client.post('/api/comments/', {'sound': self.sound.id, 'content': 'Nice'})
+        comment_id = response.data['id']
+        self.sound.refresh_from_db()
+        self.assertEqual((self.sound.favorite_count, self.sound.comment_count), (1, 1))
+
+        response = self.client.get(f'/api/sounds/{self.sound.id}/')
+        self.assertEqual(response.data['favorite_count'], 1)
+        self.assertEqual(response.data['comment_count'], 1)
+
+        self.client.delete(f'/api/favorites/remove/?sound={self.sound.id}')
+        self.client.delete(f'/api/comments/{comment_id}/')
+        self.sound.refresh_from_db()
+        self.assertEqual((self.sound.favorite_count, self.sound.comment_count), (0, 0))
+
+    def test_regular_save_does_not_overwrite_counters(self):
+        stale = Sound.objects.get(pk=self.sound.pk)
+        Favorite.objects.create(user=self.user, sound=self.sound)
+        stale.name = 'Renamed'
+        stale.save()
+        self.sound.refresh_from_db()
+        self.assertEqual(self.sound.favorite_count, 1)
+
+    def test_ordering_by_counters(self):
+        Favorite.objects.create(user=self.user, sound=self.other)
+        response = self.client.get('/api/sounds/', {'ordering': '-favorite_count'})
+        self.assertEqual(response.data['results'][0]['id'], self.other.id)
+        self.assertEqual(response.data['results'][0]['favorite_count'], 1)
+
+    def test_rebuild_command(self):
+        Comment.objects.create(sound=self.sound, user=self.user, content='Hi')
+        Sound.objects.update(comment_count=42, favorite_count=7)
+        call_command('rebuild_sound_counters', stdout=StringIO())
+        self.sound.refresh_from_db()
+        self.assertEqual((self.sound.favorite_count, self.sound.comment_count), (0, 1))
+
+
+class ResponseCacheTest(TestCase):
+    """Test the versioned response cache for anonymous catalog reads"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.sound = Sound.objects.create(name='Test Sound', uploaded_by=self.user)
+        self.other = Sound.objects.create(name='Other Sound', uploaded_by=self.user)
+        self.tag = Tag.objects.create(name='Nature')
+
+    def test_anonymous_reads_are_cached(self):
+        first = self.client.get('/api/sounds/')
+        second = self.client.get('/api/sounds/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(self.client.get('/api/sounds/', {'ordering': 'name'})['X-Cache'], 'MISS')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'cdn.example.com'])
+    def test_entries_are_kept_per_origin(self):
+        url = '/api/sounds/?page_size=1'
+        self.client.get(url)
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['next'].startswith('https://testserver/'))
+        response = self.client.get(url, HTTP_HOST='cdn.example.com')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['next'].startswith('http://cdn.example.com/'))
+        self.assertEqual(self.client.get(url, HTTP_HOST='cdn.example.com')['X-Cache'], 'HIT')
+
+    def test_authenticated_reads_bypass_cache(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/tags/')
+        self.assertNotIn('X-Cache', self.client.get('/api/tags/'))
+
+    def test_writes_invalidate_only_affected_entries(self):
+        self.client.get(f'/api/sounds/{self.sound.id}/')
+        self.client.get(f'/api/sounds/{self.other.id}/')
+        self.client.get('/api/tags/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(sound=self.sound, user=self.user, content='Hi')
+
+        response = self.client.get(f'/api/sounds/{self.sound.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['comment_count'], 1)
+        self.assertEqual(self.client.get(f'/api/sounds/{self.other.id}/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/tags/')['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.tags.add(self.tag)
+        self.assertEqual(self.client.get(f'/api/sounds/{self.other.id}/')['X-Cache'], 'MISS')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Forest'
+            self.tag.save()
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['name'], 'Forest')
+        self.assertEqual(self.client.get(f'/api/sounds/{self.sound.id}/')['X-Cache'], 'HIT')
+
+    def test_hits_and_misses_are_counted(self):
+        metrics.reset()
+        self.client.get('/api/tags/')
+        self.client.get('/api/tags/')
+        self.assertEqual(metrics.get_value('response_cache_requests_total', view='tag-list', result='miss'), 1)
+        self.assertEqual(metrics.get_value('response_cache_requests_total', view='tag-list', result='hit'), 1)
+
+
+class ConditionalGetTest(TestCase):
+    """Test ETag / Last-Modified handling on catalog endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.sound = Sound.objects.create(name='Test Sound', uploaded_by=self.user)
+        Tag.objects.create(name='Nature')
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        return response
+
+    def test_sound_list_revalidates(self):
+        self.assert_revalidates('/api/sounds/')
+
+    def test_sound_detail_revalidates(self):
+        self.assert_revalidates(f'/api/sounds/{self.sound.id}/')
+
+    def test_tags_revalidate(self):
+        self.assert_revalidates('/api/tags/')
+
+    def test_comments_revalidate(self):
+        self.assert_revalidates(f'/api/comments/?sound={self.sound.id}')
+
+    def test_not_modified_skips_serialization(self):
+        etag = self.client.get('/api/sounds/')['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/sounds/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_cached_list_runs_no_query(self):
+        self.client.get('/api/sounds/', {'search': 'test'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/sounds/', {'search': 'test'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(ctx.captured_queries, [])
+
+    def test_list_writes_change_validators(self):
+        etag = self.client.get('/api/sounds/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Sound.objects.create(name='Another Sound', uploaded_by=self.user)
+        response = self.client.get('/api/sounds/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_writes_change_validators(self):
+        url = f'/api/sounds/{self.sound.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(sound=self.sound, user=self.user, content='Hi')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_validators_depend_on_user(self):
+        anonymous = self.client.get('/api/sounds/')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/sounds/', HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Authorization', response['Vary'])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'cdn.example.com'])
+    def test_validators_depend_on_origin(self):
+        url = f'/api/sounds/{self.sound.id}/'
+        etag = self.client.get(url)['ETag']
+        for headers in ({'secure': True}, {'HTTP_HOST': 'cdn.example.com'}):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, headers)
+            self.assertNotEqual(response['ETag'], etag, headers)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class KeysetPaginationTest(TestCase):
+    """Test cursor pagination on sounds, comments and favorites"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.sounds = [
+            Sound.objects.create(name=f'Sound {i:02d}', uploaded_by=self.user)
+            for i in range(25)
+        ]
+        # Identical timestamps exercise the id tiebreaker
+        Sound.objects.filter(pk__in=[s.pk for s in self.sounds[:10]]).update(
+            created_at=self.sounds[0].created_at
+        )
+
+    def walk(self, url, params=None, key='name'):
+        names, previous = [], None
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            names.extend(item[key] for item in response.data['results'])
+            previous = response.data['previous']
+            if not response.data['next']:
+                return names, previous
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages_cover_every_sound_once(self):
+        names, _ = self.walk('/api/sounds/', {'page_size': 7})
+        expected = [
+            s.name for s in Sound.objects.order_by('-created_at', '-id')
+        ]
+        self.assertEqual(names, expected)
+
+    def test_cursor_pages_with_name_ordering(self):
+        names, previous = self.walk('/api/sounds/', {'ordering': 'name', 'page_size': 10})
+        self.assertEqual(names, sorted(s.name for s in self.sounds))
+
+        response = self.client.get(previous)
+        self.assertEqual(
+            [item['name'] for item in response.data['results']],
+            [f'Sound {i:02d}' for i in range(10, 20)]
+        )
+
+    def test_page_number_mode_is_still_available(self):
+        response = self.client.get('/api/sounds/', {'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_comments_and_favorites_use_cursors(self):
+        sound = self.sounds[0]
+        for i in range(3):
+            Comment.objects.create(sound=sound, user=self.user, content=f'Comment {i}')
+        for other in self.sounds[:3]:
+            Favorite.objects.create(user=self.user, sound=other)
+
+        response = self.client.get('/api/comments/', {'sound': sound.id, 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        ids, _ = self.walk('/api/favorites/', {'page_size': 2}, key='id')
+        self.assertEqual(
+            ids,
+            list(Favorite.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/sounds/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TempDirMixin:
+    """Temporary directories and settings overrides undone when the test ends"""
+
+    def temp_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        return directory
+
+    def use_settings(self, **settings):
+        override = override_settings(**settings)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class TempMediaMixin(TempDirMixin):
+    """Start each test with an empty cache and MEDIA_ROOT in a fresh temporary directory"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.media_root = self.temp_dir()
+        self.use_settings(MEDIA_ROOT=self.media_root)
+
+
+def nginx_stand_in(response, media_root, prefix='/protected-media/', range_header=None):
+    """
+    Resolve an ``X-Accel-Redirect`` the way an nginx ``internal`` location
+    aliased to ``media_root`` would, including a single ``bytes=a-b`` range.
+    """
+    target = response['X-Accel-Redirect']
+    assert target.startswith(prefix), target
+    with open(os.path.join(media_root, unquote(target[len(prefix):])), 'rb') as f:
+        body = f.read()
+    if range_header:
+        start, end = (int(part) for part in range_header.removeprefix('bytes=').split('-'))
+        return 206, body[start:end + 1]
+    return 200, body
+
+
+class SoundAudioDeliveryTest(TempMediaMixin, TestCase):
+    """Test the range-capable audio endpoint and proxy offload"""
+
+    def setUp(self):
+        super().setUp()
+
+        self.payload = bytes(range(256)) * 1024
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.sound = Sound(name='Rain', uploaded_by=user)
+        self.sound.mp3_file.save('rain.mp3', ContentFile(self.payload), save=False)
+        self.sound.save()
+        self.url = reverse('sound-audio', kwargs={'pk': self.sound.pk})
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_response_is_streamed_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'audio/mpeg')
+        self.assertEqual(response['Content-Length'], str(len(self.payload)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self.body(response), self.payload)
+
+    def test_range_requests_return_partial_content(self):
+        cases = {
+            'bytes=100-199': (100, 199),
+            'bytes=262000-': (262000, len(self.payload) - 1),
+            'bytes=-500': (len(self.payload) - 500, len(self.payload) - 1),
+            'bytes=0-999999999': (0, len(self.payload) - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/{len(self.payload)}'
+                )
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+                self.assertEqual(self.body(response), self.payload[start:end + 1])
+
+    def test_unsatisfiable_and_ignored_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.payload)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.payload)}')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+        for header in ('bytes=0-1,5-9', 'items=0-1', 'bytes=9-1'):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), self.payload)
+
+    def test_conditional_get(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_audio(self):
+        empty = Sound.objects.create(name='Silent', uploaded_by=self.sound.uploaded_by)
+        response = self.client.get(reverse('sound-audio', kwargs={'pk': empty.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_serializers_link_to_audio_endpoint(self):
+        response = self.client.get(f'/api/sounds/{self.sound.pk}/')
+        self.assertTrue(response.data['mp3_url'].endswith(self.url))
+
+    @override_settings(SOUND_MEDIA_OFFLOAD='x-accel-redirect')
+    def test_x_accel_redirect_offload(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+        self.assertEqual(
+            nginx_stand_in(response, self.media_root, range_header='bytes=10-19'),
+            (206, self.payload[10:20])
+        )
+        self.assertEqual(nginx_stand_in(response, self.media_root), (200, self.payload))
+
+    @override_settings(SOUND_MEDIA_OFFLOAD='x-sendfile')
+    def test_x_sendfile_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.sound.mp3_file.path)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+
+class AudioFeatureTest(TestCase):
+    """Test the NumPy feature extraction used by the analysis workers"""
+
+    def test_peaks_are_downsampled_and_normalized(self):
+        rng = np.random.default_rng(0)
+        samples = rng.uniform(-0.5, 0.5, 100_003).astype(np.float32)
+        samples[777] = -0.9
+
+        peaks = np.frombuffer(audio_analysis.compute_peaks(samples, buckets=512), dtype=np.uint8)
+        self.assertEqual(len(peaks), 512)
+        self.assertEqual(peaks.max(), 255)
+
+        starts = np.linspace(0, samples.size, 512, endpoint=False).astype(int)
+        bounds = list(starts[1:]) + [samples.size]
+        expected = [np.abs(samples[a:b]).max() for a, b in zip(starts, bounds)]
+        expected = np.round(np.array(expected) / max(expected) * 255).astype(np.uint8)
+        np.testing.assert_array_equal(peaks, expected)
+
+    def test_short_and_empty_signals(self):
+        self.assertEqual(audio_analysis.compute_peaks(np.zeros(0, np.float32)), b'')
+        self.assertEqual(len(audio_analysis.compute_peaks(np.ones(10, np.float32))), 10)
+        self.assertEqual(audio_analysis.compute_loudness(np.zeros(0, np.float32)), audio_analysis.SILENCE_DB)
+
+    def test_loudness(self):
+        t = np.arange(audio_analysis.ANALYSIS_SAMPLE_RATE * 2) / audio_analysis.ANALYSIS_SAMPLE_RATE
+        sine = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+        self.assertAlmostEqual(audio_analysis.compute_loudness(sine), -3.01, places=1)
+        # Silence below the gate does not drag the level down
+        padded = np.concatenate([sine, np.zeros_like(sine)])
+        self.assertAlmostEqual(audio_analysis.compute_loudness(padded), -3.01, places=1)
+        self.assertEqual(audio_analysis.compute_loudness(np.zeros_like(sine)), audio_analysis.SILENCE_DB)
+
+    def fake_ffmpeg(self, samples, returncode=0, stderr=b''):
+        """Patch ffmpeg to stream ``samples`` as s16le; return the fake process."""
+        process = mock.Mock(returncode=None)
+        process.stdout = BytesIO(np.round(samples * 32767).astype('<i2').tobytes())
+
+        def start(command, stdout, stderr_file):
+            stderr_file.write(stderr)
+            return process
+
+        def wait():
+            process.returncode = returncode
+            return returncode
+
+        process.wait.side_effect = wait
+        process.poll.side_effect = lambda: process.returncode
+        patches = [
+            mock.patch.object(audio_analysis.shutil, 'which', return_value='/usr/bin/ffmpeg'),
+            mock.patch.object(
+                audio_analysis.subprocess, 'Popen',
+                side_effect=lambda command, stdout, stderr: start(command, stdout, stderr),
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return process
+
+    def test_features_are_computed_block_by_block(self):
+        t = np.arange(audio_analysis.ANALYSIS_SAMPLE_RATE * 3) / audio_analysis.ANALYSIS_SAMPLE_RATE
+        samples = (np.sin(2 * np.pi * 440 * t) * np.linspace(0.1, 0.9, t.size)).astype(np.float32)
+        self.fake_ffmpeg(samples)
+        exact = np.round(samples * 32767).astype(np.float32) / 32768.0
+
+        peaks = audio_analysis.PeakAccumulator()
+        small_peaks = audio_analysis.PeakAccumulator(resolution=4)
+        loudness = audio_analysis.LoudnessAccumulator()
+        blocks = list(audio_analysis.decode_blocks('sound.mp3', block_bytes=10_001))
+        self.assertGreater(len(blocks), 10)
+        for block in blocks:
+            peaks.add(block)
+            small_peaks.add(block)
+            loudness.add(block)
+
+        self.assertEqual(peaks.count, samples.size)
+        self.assertEqual(peaks.result(), audio_analysis.compute_peaks(exact))
+        self.assertEqual(loudness.result(), audio_analysis.compute_loudness(exact))
+        # Merged maxima keep memory bounded and stay within a step of the exact peaks
+        self.assertLessEqual(small_peaks.size, 512 * 4 * 2)
+        merged = np.frombuffer(small_peaks.result(), np.uint8).astype(int)
+        expected = np.frombuffer(peaks.result(), np.uint8).astype(int)
+        self.assertLessEqual(np.abs(merged - expected).max(), 2)
+
+    def test_decode_failure_is_reported(self):
+        self.fake_ffmpeg(np.zeros(0, np.float32), returncode=1, stderr=b'Invalid data found')
+        with self.assertRaisesMessage(audio_analysis.AudioAnalysisError, 'Invalid data found'):
+            list(audio_analysis.decode_blocks('broken.mp3'))
+
+    @skipUnless(shutil.which('ffmpeg') and shutil.which('ffprobe'), 'ffmpeg is not installed')
+    def test_analyze_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'tone.mp3')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        audio_analysis.subprocess.run([
+            shutil.which('ffmpeg'), '-v', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=2',
+            '-ar', '44100', '-b:a', '128k', path,
+        ], check=True)
+
+        result = audio_analysis.analyze_file(path)
+        self.assertAlmostEqual(result['duration'], 2.0, delta=0.1)
+        self.assertEqual(result['sample_rate'], 44100)
+        self.assertAlmostEqual(result['bitrate'], 128000, delta=8000)
+        self.assertEqual(len(result['waveform_peaks']), audio_analysis.PEAK_BUCKETS)
+
+
+class SoundAnalysisPipelineTest(TempMediaMixin, TestCase):
+    """Test that uploads schedule analysis without waiting for it"""
+
+    RESULT = {
+        'duration': 12.5, 'bitrate': 192000, 'sample_rate': 44100,
+        'loudness': -14.2, 'waveform_peaks': bytes([0, 128, 255]),
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', password='admin123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def upload(self):
+        return self.client.post('/api/sounds/', {
+            'name': 'Rain',
+            'mp3_file': SimpleUploadedFile('rain.mp3', b'ID3fake', content_type='audio/mpeg'),
+        }, format='multipart')
+
+    def test_upload_submits_job_after_commit_without_blocking(self):
+        executor = mock.Mock()
+        with mock.patch.object(analysis, 'get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.upload()
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+                executor.submit.assert_not_called()
+
+        sound = Sound.objects.get(pk=response.data['id'])
+        self.assertEqual(sound.analysis_status, Sound.AnalysisStatus.PENDING)
+        executor.submit.assert_called_once_with(audio_analysis.analyze_file, sound.mp3_file.path)
+
+        # The worker's callback stores the result
+        future = mock.Mock()
+        future.exception.return_value = None
+        future.result.return_value = self.RESULT
+        with mock.patch.object(analysis.connection, 'close'):
+            executor.submit.return_value.add_done_callback.call_args.args[0](future)
+
+        self.client.force_authenticate(user=None)
+        data = self.client.get(f'/api/sounds/{sound.pk}/').data
+        self.assertEqual(data['analysis_status'], 'done')
+        self.assertEqual(data['duration'], 12.5)
+        self.assertEqual(data['bitrate'], 192000)
+        self.assertEqual(data['sample_rate'], 44100)
+        self.assertEqual(data['loudness'], -14.2)
+        self.assertEqual(base64.b64decode(data['waveform_peaks']), bytes([0, 128, 255]))
+        listed = self.client.get('/api/sounds/').data['results'][0]
+        self.assertEqual(listed['waveform_peaks'], data['waveform_peaks'])
+
+    @override_settings(SOUND_ANALYSIS_EAGER=True)
+    def test_replacing_audio_resets_and_reanalyses(self):
+        with mock.patch.object(audio_analysis, 'analyze_file', return_value=self.RESULT):
+            with self.captureOnCommitCallbacks(execute=True):
+                sound_id = self.upload().data['id']
+        sound = Sound.objects.get(pk=sound_id)
+        self.assertEqual(sound.analysis_status, Sound.AnalysisStatus.DONE)
+
+        # Saving without touching the file keeps the results
+        with mock.patch.object(audio_analysis, 'analyze_file') as analyze:
+            with self.captureOnCommitCallbacks(execute=True):
+                sound.name = 'Heavy rain'
+                sound.save()
+            analyze.assert_not_called()
+        sound.refresh_from_db()
+        self.assertEqual(sound.duration, 12.5)
+
+        error = audio_analysis.AudioAnalysisError('not an mp3')
+        with mock.patch.object(audio_analysis, 'analyze_file', side_effect=error), \
+                self.assertLogs('sounds.analysis', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                sound.mp3_file.save('storm.mp3', ContentFile(b'ID3other'))
+        sound.refresh_from_db()
+        self.assertEqual(sound.analysis_status, Sound.AnalysisStatus.FAILED)
+        self.assertIsNone(sound.duration)
+        self.assertEqual(bytes(sound.waveform_peaks), b'')
+
+    def test_stale_result_is_discarded(self):
+        with mock.patch.object(analysis, 'get_executor'):
+            sound_id = self.upload().data['id']
+        self.assertFalse(analysis.store_result(sound_id, 'sounds/mp3/replaced.mp3', self.RESULT))
+        self.assertIsNone(Sound.objects.get(pk=sound_id).duration)
+
+
+def make_image(width, height, fmt='PNG', mode='RGB'):
+    output = BytesIO()
+    Image.new(mode, (width, height), 'red').save(output, fmt)
+    return ContentFile(output.getvalue())
+
+
+class ImageVariantTest(TempMediaMixin, TestCase):
+    """Test responsive image variants for Sound.image"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.sound = Sound(name='Rain', uploaded_by=self.user)
+        self.sound.image.save('cover.png', make_image(1000, 500, mode='RGBA'), save=False)
+        self.sound.save()
+
+    def variant_path(self, image_hash, width, ext):
+        return os.path.join(self.media_root, images.variant_name(image_hash, width, ext))
+
+    def test_image_is_described_on_save(self):
+        self.assertEqual(len(self.sound.image_hash), images.HASH_LENGTH)
+        self.assertEqual((self.sound.image_width, self.sound.image_height), (1000, 500))
+
+    def test_srcset_lists_widths_without_upscaling(self):
+        data = self.client.get(f'/api/sounds/{self.sound.pk}/').data
+        srcset = data['image_srcset']
+        self.assertEqual(set(srcset), {'image/webp', 'image/jpeg'})
+        widths = [entry.rsplit(' ', 1)[1] for entry in srcset['image/webp'].split(', ')]
+        self.assertEqual(widths, ['320w', '640w', '1000w'])
+        listed = self.client.get('/api/sounds/').data['results'][0]
+        self.assertEqual(listed['image_srcset'], srcset)
+
+        plain = Sound.objects.create(name='No cover', uploaded_by=self.user)
+        self.assertIsNone(self.client.get(f'/api/sounds/{plain.pk}/').data['image_srcset'])
+
+    def test_variant_is_generated_lazily_and_immutable(self):
+        url = reverse('image-variant', kwargs={
+            'image_hash': self.sound.image_hash, 'width': 320, 'ext': 'webp'
+        })
+        path = self.variant_path(self.sound.image_hash, 320, 'webp')
+        self.assertFalse(os.path.exists(path))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as variant:
+            self.assertEqual(variant.size, (320, 160))
+        self.assertTrue(os.path.exists(path))
+
+        jpeg = self.client.get(url.replace('.webp', '.jpg'))
+        self.assertEqual(jpeg['Content-Type'], 'image/jpeg')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unknown_variants_404(self):
+        for width, image_hash in ((777, self.sound.image_hash), (320, '0' * images.HASH_LENGTH)):
+            url = reverse('image-variant', kwargs={'image_hash': image_hash, 'width': width, 'ext': 'jpg'})
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_replaced_and_deleted_images_release_variants(self):
+        old_hash = self.sound.image_hash
+        images.ensure_variant(self.sound, 320, 'jpg')
+        self.assertTrue(os.path.exists(self.variant_path(old_hash, 320, 'jpg')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sound.image.save('other.jpg', make_image(400, 400, 'JPEG'))
+        self.assertNotEqual(self.sound.image_hash, old_hash)
+        self.assertEqual(self.sound.image_width, 400)
+        self.assertFalse(os.path.exists(self.variant_path(old_hash, 320, 'jpg')))
+
+        new_hash = self.sound.image_hash
+        images.ensure_variant(self.sound, 320, 'webp')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sound.delete()
+        self.assertFalse(os.path.exists(self.variant_path(new_hash, 320, 'webp')))
+
+    def test_variants_appear_only_once_complete(self):
+        path = self.variant_path(self.sound.image_hash, 320, 'jpg')
+        replace = os.replace
+
+        def checked_replace(source, target):
+            # Until the rename nothing is visible under the served name
+            self.assertFalse(os.path.exists(path))
+            with Image.open(source) as image:
+                image.verify()
+            replace(source, target)
+
+        with mock.patch('sounds.images.os.replace', side_effect=checked_replace) as renamed:
+            images.ensure_variant(self.sound, 320, 'jpg')
+        self.assertEqual(renamed.call_count, 1)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['320.jpg'])
+
+    def test_prune_command_removes_orphans(self):
+        images.ensure_variant(self.sound, 320, 'jpg')
+        orphan = '0123456789abcdef'
+        os.makedirs(os.path.dirname(self.variant_path(orphan, 320, 'jpg')))
+        with open(self.variant_path(orphan, 320, 'jpg'), 'wb') as f:
+            f.write(b'stale')
+
+        out = StringIO()
+        call_command('prune_image_variants', stdout=out)
+        self.assertIn('Pruned 1 unused image hash(es), 1 file(s) deleted.', out.getvalue())
+        self.assertEqual(images.stored_variant_hashes(), [self.sound.image_hash])
+
+
+@override_settings(SOUND_ANALYSIS_ENABLED=False)
+class ChunkedUploadTest(TempMediaMixin, TestCase):
+    """Test the resumable chunked upload protocol"""
+
+    def setUp(self):
+        super().setUp()
+        self.upload_dir = self.temp_dir()
+        self.use_settings(UPLOAD_SESSION_DIR=self.upload_dir)
+
+        self.admin = User.objects.create_user(username='admin', password='admin123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.payload = os.urandom(300_000)
+        self.checksum = hashlib.sha256(self.payload).hexdigest()
+
+    def open_session(self, **overrides):
+        data = {'filename': 'field recording.mp3', 'size': len(self.payload), 'checksum': self.checksum}
+        data.update(overrides)
+        return self.client.post('/api/uploads/', data, format='json')
+
+    def put_chunk(self, session_id, start, end):
+        return self.client.put(
+            f'/api/uploads/{session_id}/',
+            data=self.payload[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.payload)}',
+        )
+
+    def test_chunks_resume_and_finalize_into_new_sound(self):
+        session_id = self.open_session().data['id']
+        self.assertEqual(self.put_chunk(session_id, 0, 99_999).data['offset'], 100_000)
+
+        # A retried chunk at a stale offset is rejected with the offset to resume from
+        response = self.put_chunk(session_id, 0, 99_999)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 100_000)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').data['offset'], 100_000)
+
+        response = self.client.post(f'/api/uploads/{session_id}/finalize/', {'name': 'Early'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.put_chunk(session_id, 100_000, 199_999)
+        self.assertEqual(self.put_chunk(session_id, 200_000, 299_999).data['offset'], 300_000)
+
+        tag = Tag.objects.create(name='Field')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/uploads/{session_id}/finalize/',
+                {'name': 'Forest', 'description': 'Dawn chorus', 'tags': [tag.pk]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        sound = Sound.objects.get(pk=response.data['id'])
+        self.assertEqual(sound.uploaded_by, self.admin)
+        self.assertEqual(list(sound.tags.all()), [tag])
+        with sound.mp3_file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.payload)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_finalize_replaces_existing_audio(self):
+        sound = Sound.objects.create(name='Old', uploaded_by=self.admin)
+        session_id = self.open_session().data['id']
+        self.put_chunk(session_id, 0, len(self.payload) - 1)
+        response = self.client.post(f'/api/uploads/{session_id}/finalize/', {'sound': sound.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sound.refresh_from_db()
+        self.assertEqual(sound.name, 'Old')
+        self.assertEqual(sound.mp3_file.size, len(self.payload))
+
+    def test_finalize_is_all_or_nothing_and_happens_once(self):
+        session_id = self.open_session().data['id']
+        self.put_chunk(session_id, 0, len(self.payload) - 1)
+        url = f'/api/uploads/{session_id}/finalize/'
+
+        self.client.raise_request_exception = False
+        with mock.patch('sounds.views.SoundDetailSerializer', side_effect=RuntimeError):
+            response = self.client.post(url, {'name': 'Broken'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(Sound.objects.exists())
+        self.assertTrue(UploadSession.objects.filter(pk=session_id).exists())
+        self.assertEqual(os.listdir(self.upload_dir), [f'{session_id}.part'])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'sounds', 'mp3')), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'name': 'Forest'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+        # A retry of a finalize that went through finds the session gone
+        self.assertEqual(self.client.post(url, {'name': 'Forest'}, format='json').status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Sound.objects.count(), 1)
+
+    def test_checksum_mismatch(self):
+        session_id = self.open_session(checksum='0' * 64).data['id']
+        self.put_chunk(session_id, 0, len(self.payload) - 1)
+        response = self.client.post(f'/api/uploads/{session_id}/finalize/', {'name': 'Bad'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error'], 'Checksum mismatch.')
+        self.assertFalse(Sound.objects.exists())
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.open_session(filename='notes.txt').status_code, status.HTTP_400_BAD_REQUEST)
+        session_id = self.open_session().data['id']
+        response = self.client.put(
+            f'/api/uploads/{session_id}/', data=b'abc', content_type='application/octet-stream'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=User.objects.create_user(username='user', password='pass12345'))
+        self.assertEqual(self.open_session().status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_abandoned_sessions_are_collected(self):
+        stale_id = self.open_session().data['id']
+        self.put_chunk(stale_id, 0, 9)
+        fresh_id = self.open_session().data['id']
+        UploadSession.objects.filter(pk=stale_id).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        orphan = os.path.join(self.upload_dir, 'orphan.part')
+        open(orphan, 'wb').close()
+        os.utime(orphan, (0, 0))
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cleanup_upload_sessions', stdout=out)
+        self.assertIn('Removed 1 expired upload session(s).', out.getvalue())
+        self.assertEqual(list(UploadSession.objects.values_list('pk', flat=True)), [uuid.UUID(fresh_id)])
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(os.path.join(self.upload_dir, f'{stale_id}.part')))
+
+
+class ImportSoundsCommandTest(TempMediaMixin, TestCase):
+    """Test the bulk import command"""
+
+    def setUp(self):
+        super().setUp()
+        self.library = self.temp_dir()
+        self.admin = User.objects.create_superuser(username='admin', password='admin123')
+        Tag.objects.create(name='Nature')
+
+    def add_file(self, relative, content):
+        path = os.path.join(self.library, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, source):
+        out = StringIO()
+        call_command('import_sounds', source, '--workers', '1', '--batch-size', '2', stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_directory_import_is_batched_deduplicated_and_resumable(self):
+        self.add_file('Nature/Birds/dawn_chorus.mp3', b'ID3 dawn')
+        self.add_file('Nature/river.mp3', b'ID3 river')
+        self.add_file('Urban/traffic.mp3', b'ID3 traffic')
+        self.add_file('Urban/copy of river.mp3', b'ID3 river')
+        self.add_file('Urban/readme.txt', b'not audio')
+
+        output = self.run_import(self.library)
+        self.assertIn('Imported 3, skipped 1 duplicate(s), 0 failed', output)
+
+        dawn = Sound.objects.get(name='dawn chorus')
+        self.assertEqual(dawn.uploaded_by, self.admin)
+        self.assertEqual(dawn.content_hash, hashlib.sha256(b'ID3 dawn').hexdigest())
+        self.assertEqual(sorted(dawn.tags.values_list('name', flat=True)), ['Birds', 'Nature'])
+        self.assertEqual(Tag.objects.filter(name='Nature').count(), 1)
+        with dawn.mp3_file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'ID3 dawn')
+        response = self.client.get('/api/sounds/', {'search': 'chorus'})
+        self.assertEqual([item['name'] for item in response.data['results']], ['dawn chorus'])
+
+        # A second run (or a resumed one) skips everything already stored
+        self.add_file('Urban/siren.mp3', b'ID3 siren')
+        output = self.run_import(self.library)
+        self.assertIn('Imported 1, skipped 4 duplicate(s)', output)
+        self.assertEqual(Sound.objects.count(), 4)
+
+    def test_manifest_import(self):
+        self.add_file('audio/wind.mp3', b'ID3 wind')
+        manifest = os.path.join(self.library, 'pack.csv')
+        with open(manifest, 'w', newline='') as f:
+            f.write('path,name,description,tags\n')
+            f.write('audio/wind.mp3,Mountain Wind,Gusts at the summit,Nature;Weather\n')
+            f.write('audio/missing.mp3,Missing,,\n')
+
+        output = self.run_import(manifest)
+        self.assertIn('Imported 1, skipped 0 duplicate(s), 1 failed', output)
+        wind = Sound.objects.get()
+        self.assertEqual(wind.name, 'Mountain Wind')
+        self.assertEqual(wind.description, 'Gusts at the summit')
+        self.assertEqual(sorted(wind.tags.values_list('name', flat=True)), ['Nature', 'Weather'])
+
+
+@override_settings(DEBUG=True)
+class GenerateDatasetCommandTest(TestCase):
+    """Test the synthetic dataset generator"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def generate(self, prefix):
+        call_command(
+            'generate_dataset', '--users', '20', '--tags', '8', '--sounds', '50',
+            '--comments-per-sound', '2', '--favorites-per-user', '3', '--seed', '7',
+            '--prefix', prefix, '--batch-size', '16', stdout=StringIO(),
+        )
+        sounds = Sound.objects.filter(uploaded_by__username__startswith=f'{prefix}_').order_by('pk')
+        return [
+            (sound.name, sound.comment_count, sound.favorite_count, sound.tags.count(), sound.created_at)
+            for sound in sounds
+        ]
+
+    def test_generates_consistent_reproducible_rows(self):
+        first = self.generate('alpha')
+        self.assertEqual(User.objects.filter(username__startswith='alpha_').count(), 20)
+        self.assertEqual(len(first), 50)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(sum(row[1] for row in first), 100)
+        self.assertEqual(sum(row[2] for row in first), Favorite.objects.count())
+        self.assertTrue(all(1 <= row[3] <= 5 for row in first))
+        self.assertTrue(all(row[4] <= dataset.DATASET_EPOCH for row in first))
+        # Rows are indexed for search as they are inserted
+        name = first[0][0]
+        response = APIClient().get('/api/sounds/', {'search': name})
+        self.assertIn(name, [item['name'] for item in response.data['results']])
+
+        self.assertEqual(self.generate('beta'), first)
+
+    def test_refuses_existing_prefix(self):
+        User.objects.create_user(username='alpha_0000000', password='x')
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', '--prefix', 'alpha', stdout=StringIO())
+
+    def test_generated_users_are_not_staff_and_cannot_log_in(self):
+        self.generate('gamma')
+        users = User.objects.filter(username__startswith='gamma_')
+        self.assertFalse(users.filter(is_staff=True).exists())
+        self.assertFalse(any(user.has_usable_password() for user in users))
+
+        call_command('generate_dataset', '--users', '2', '--sounds', '1', '--prefix', 'delta',
+                     '--password', 'chosen-password-1', stdout=StringIO())
+        self.assertTrue(User.objects.get(username='delta_0000000').check_password('chosen-password-1'))
+
+    @override_settings(DEBUG=False)
+    def test_refuses_to_run_without_debug(self):
+        with self.assertRaisesMessage(CommandError, 'DEBUG'):
+            call_command('generate_dataset', '--prefix', 'prod', stdout=StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='prod_').exists())
+
+
+class BenchmarkAPICommandTest(TempDirMixin, TestCase):
+    """Test the API benchmark command and baseline comparison"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.directory = self.temp_dir()
+        self.baseline = os.path.join(self.directory, 'baseline.json')
+
+    def run_benchmark(self, *args):
+        call_command(
+            'benchmark_api', '--sounds', '30', '--users', '10', '--repeat', '2', '--warmup', '1',
+            *args, stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_saves_baseline_and_leaves_no_rows_behind(self):
+        self.run_benchmark('--save', self.baseline)
+        with open(self.baseline) as f:
+            report = json.load(f)
+        self.assertEqual(set(report['results']), set(benchmarks.SCENARIOS))
+        for name, row in report['results'].items():
+            self.assertIn(row['status'], (200, 201), name)
+            self.assertGreater(row['queries'] + row['bytes'], 0)
+        self.assertEqual(report['meta']['sounds'], 30)
+        self.assertFalse(Sound.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_compare_flags_extra_queries(self):
+        self.run_benchmark('--only', 'sound_list,sound_detail', '--save', self.baseline)
+        with open(self.baseline) as f:
+            report = json.load(f)
+        report['results']['sound_detail']['queries'] -= 1
+        with open(self.baseline, 'w') as f:
+            json.dump(report, f)
+        with self.assertRaisesMessage(CommandError, '1 regression(s)'):
+            self.run_benchmark('--only', 'sound_list,sound_detail', '--compare', self.baseline,
+                               '--threshold', '100')
+
+    def test_compare_results_thresholds(self):
+        before = {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3, 'bytes': 1000, 'status': 200}
+        self.assertEqual(benchmarks.compare_results({'x': before}, {'x': dict(before, p50_ms=12.0)}), [])
+        self.assertEqual(
+            benchmarks.compare_results({'x': before}, {'x': dict(before, p95_ms=30.0, bytes=2000)}),
+            ['x: p95_ms 20.00 -> 30.00', 'x: bytes 1000 -> 2000'],
+        )
+
+
+class RequestTimingMiddlewareTest(TestCase):
+    """Test Server-Timing instrumentation"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(username='uploader', password='pass123')
+        self.sound = Sound.objects.create(name='Rain', uploaded_by=user)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_LOG_SAMPLE_RATE=0)
+    def test_reports_query_count_and_phases(self):
+        response = APIClient().get(f'/api/sounds/{self.sound.pk}/')
+        header = response['Server-Timing']
+        for phase in ('db;dur=', 'view;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(phase, header)
+        self.assertRegex(header, r'desc="[1-9][0-9]* queries"')
+        self.assertNotIn('n-plus-one', header)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_REPEAT_THRESHOLD=3,
+                       REQUEST_TIMING_LOG_SAMPLE_RATE=1)
+    def test_repeated_queries_are_flagged_and_logged(self):
+        def n_plus_one_view(request):
+            for sound in Sound.objects.all():
+                for _ in range(3):
+                    User.objects.get(pk=sound.uploaded_by_id)
+            return HttpResponse('ok')
+
+        middleware = RequestTimingMiddleware(n_plus_one_view)
+        with self.assertLogs('request_timing', level='WARNING') as logs:
+            response = middleware(RequestFactory().get('/api/sounds/'))
+        self.assertIn('n-plus-one;desc="3x same query"', response['Server-Timing'])
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/api/sounds/')
+        self.assertEqual(record['queries'], 4)
+        self.assertEqual(record['repeated_queries'][0]['count'], 3)
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_disabled_middleware_adds_nothing(self):
+        response = APIClient().get(f'/api/sounds/{self.sound.pk}/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class MetricsEndpointTest(TestCase):
+    """Test the Prometheus metrics middleware and endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_records_route_metrics_and_requires_token(self):
+        APIClient().get('/api/sounds/')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="sound-list",le="+Inf"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="sound-list"} 1', body)
+        self.assertIn('http_responses_total{method="GET",route="sound-list",status="200"} 1', body)
+        self.assertIn('http_request_db_queries_bucket', body)
+        self.assertIn('response_cache_requests_total{result="miss",view="sound-list"} 1', body)
+        # The scrape itself is in flight while the page is rendered
+        self.assertIn('http_requests_in_flight 1', body)
+
+    def test_unknown_methods_share_one_label(self):
+        for method in ('FOO123', 'BAR456'):
+            self.client.generic(method, '/api/sounds/')
+        body = metrics.render()
+        self.assertIn('http_request_duration_seconds_count{method="other",route="sound-list"} 2', body)
+        self.assertNotIn('FOO123', body)
+        self.assertNotIn('BAR456', body)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.describe('test_latency_seconds', 'histogram', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            metrics.observe('test_latency_seconds', value, route='x')
+        body = metrics.render()
+        self.assertIn('test_latency_seconds_bucket{route="x",le="0.1"} 1', body)
+        self.assertIn('test_latency_seconds_bucket{route="x",le="1"} 3', body)
+        self.assertIn('test_latency_seconds_bucket{route="x",le="+Inf"} 4', body)
+        self.assertIn('test_latency_seconds_sum{route="x"} 4.25', body)
+
+    def test_multiprocess_mode_sums_worker_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(METRICS_MULTIPROC_DIR=directory):
+            metrics.increment('test_jobs_total', 2, kind='a')
+            metrics.gauge_add('http_requests_in_flight', 1)
+            # Files as left by another live worker and by one that has exited
+            live = metrics._FileStore(directory, pid=os.getppid())
+            live.add(('test_jobs_total', (('kind', 'a'),)), 3)
+            live.add(('http_requests_in_flight', ()), 2)
+            dead = metrics._FileStore(directory, pid=2 ** 22 + 12345)
+            dead.add(('test_jobs_total', (('kind', 'a'),)), 5)
+            dead.add(('http_requests_in_flight', ()), 4)
+
+            body = metrics.render()
+            metrics.reset()
+        self.assertIn('test_jobs_total{kind="a"} 10', body)
+        self.assertIn('http_requests_in_flight 3', body)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncReadPathTest(TestCase):
+    """Test the native async read path against the sync viewsets"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='asyncuser', password='testpass123')
+        drums = Tag.objects.create(name='drums')
+        self.sounds = []
+        for i in range(3):
+            sound = Sound.objects.create(name=f'Async {i}', uploaded_by=self.user)
+            sound.tags.add(drums)
+            self.sounds.append(sound)
+        for i in range(4):
+            Comment.objects.create(sound=self.sounds[0], user=self.user, content=f'comment {i}')
+        Favorite.objects.create(user=self.user, sound=self.sounds[1])
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def get_async(self, path, headers=None):
+        with override_settings(ROOT_URLCONF='soundvault_backend.asgi_urls'):
+            response = async_to_sync(self.async_client.get)(path, headers=headers)
+            # resolver_match is lazy; resolve it while the async URLconf is active
+            response.served_async = iscoroutinefunction(response.resolver_match.func)
+        return response
+
+    def assert_same_response(self, path, headers=None):
+        expected = self.client.get(path, headers=headers)
+        response = self.get_async(path, headers)
+        self.assertTrue(response.served_async, path)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.json(), expected.json(), path)
+        return response
+
+    def test_reads_match_sync_viewsets(self):
+        sound = self.sounds[0]
+        for path in (
+            '/api/sounds/',
+            '/api/sounds/?tag=drums',
+            '/api/sounds/?page=1',
+            f'/api/sounds/{sound.id}/',
+            '/api/sounds/999999/',
+            '/api/tags/',
+            f'/api/comments/?sound={sound.id}',
+            '/api/auth/me/',
+        ):
+            self.assert_same_response(path)
+        auth = {'Authorization': f'Bearer {self.token}'}
+        response = self.assert_same_response('/api/sounds/', auth)
+        favorites = {item['id'] for item in response.json()['results'] if item['is_favorite']}
+        self.assertEqual(favorites, {self.sounds[1].id})
+        response = self.assert_same_response('/api/auth/me/', auth)
+        self.assertEqual(response.json()['username'], 'asyncuser')
+        response = self.get_async('/api/sounds/', {'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_detail_embeds_comments_without_per_row_queries(self):
+        sound = self.sounds[0]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/sounds/{sound.id}/')
+        self.assertEqual(len(response.data['comments']), 4)
+        # Only the uploader is fetched; comment authors come with the comments
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "auth_user"' in q['sql']]), 1)
+
+    def test_conditional_get_and_writes(self):
+        url = f'/api/sounds/{self.sounds[0].id}/'
+        etag = self.get_async(url)['ETag']
+        self.assertEqual(etag, self.client.get(url)['ETag'])
+        response = self.get_async(url, {'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Writes on the same URL fall through to the sync viewset
+        with override_settings(ROOT_URLCONF='soundvault_backend.asgi_urls'):
+            response = async_to_sync(self.async_client.delete)(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(Sound.objects.filter(pk=self.sounds[0].pk).exists())
+
+    def test_cache_is_never_called_on_the_event_loop(self):
+        calls = []
+
+        def off_loop(method):
+            def wrapper(cache_self, *args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    calls.append(method.__name__)
+                    return method(cache_self, *args, **kwargs)
+                raise AssertionError(f'cache.{method.__name__}() blocked the event loop')
+            return wrapper
+
+        patches = [
+            mock.patch.object(LocMemCache, name, off_loop(getattr(LocMemCache, name)))
+            for name in ('get', 'set', 'add', 'incr', 'delete', 'get_many', 'set_many')
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        sound = self.sounds[0]
+        auth = {'Authorization': f'Bearer {self.token}'}
+        for path, headers in (
+            ('/api/sounds/', None),
+            ('/api/sounds/', None),
+            (f'/api/sounds/{sound.id}/', None),
+            ('/api/sounds/', auth),
+            (f'/api/comments/?sound={sound.id}', None),
+        ):
+            response = self.get_async(path, headers)
+            self.assertTrue(response.served_async, path)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, path)
+        self.assertIn('get', calls)
+        self.assertIn('set', calls)
+
+
+class BenchmarkConcurrencyCommandTest(TransactionTestCase):
+    """Test the WSGI/ASGI concurrency benchmark command"""
+
+    def test_compares_both_servers(self):
+        user = User.objects.create_user(username='concurrency', password='testpass123')
+        sound = Sound.objects.create(name='Load', uploaded_by=user)
+        Comment.objects.create(sound=sound, user=user, content='hello')
+        out = StringIO()
+        call_command(
+            'benchmark_concurrency', clients=4, requests=2, threads=2, client_delay=0.01, stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn('wsgi', output)
+        self.assertIn('asgi', output)
+        self.assertIn('ASGI throughput', output)
+
+    def test_requires_data(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_concurrency', stdout=StringIO())
+
+
+class ServerSizingTest(TestCase):
+    """Test worker sizing of the production server"""
+
+    def write(self, root, name, content):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_reads_cgroup_limits(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.write(root, 'cpu.max', '150000 100000\n')
+        self.write(root, 'memory.max', f'{2048 * server.MIB}\n')
+        self.assertEqual(server.cpu_limit(root), 1.5)
+        self.assertLessEqual(server.available_cpus(root), 2)
+        self.assertEqual(server.available_memory(root), 2048 * server.MIB)
+
+        self.write(root, 'cpu.max', 'max 100000\n')
+        self.write(root, 'memory.max', 'max\n')
+        self.assertIsNone(server.cpu_limit(root))
+        meminfo = os.path.join(root, 'meminfo')
+        self.write(root, 'meminfo', 'MemTotal:        1024000 kB\n')
+        self.assertEqual(server.available_memory(root, meminfo), 1024000 * 1024)
+
+    def test_memory_caps_workers_and_threads_compensate(self):
+        self.assertEqual(server.size_workers(2, 8192 * server.MIB), (5, 2))
+        workers, threads = server.size_workers(4, 1024 * server.MIB)
+        self.assertEqual(workers, 4)
+        self.assertEqual(threads, 5)
+        self.assertEqual(server.size_workers(1, 64 * server.MIB), (1, 6))
+        self.assertEqual(server.size_workers(64, None)[0], server.MAX_WORKERS)
+
+
+@override_settings(JWT_USER_CACHE_TTL=30)
+class StatelessJWTAuthenticationTest(TestCase):
+    """Test request.user from token claims and revocation within the cache TTL"""
+
+    def setUp(self):
+        clear_user_cache()
+        self.addCleanup(clear_user_cache)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='claims', email='claims@example.com', password='testpass123'
+        )
+        self.sound = Sound.objects.create(name='Claims', uploaded_by=self.user)
+        response = self.client.post('/api/auth/login/', {'username': 'claims', 'password': 'testpass123'})
+        self.access = response.data['tokens']['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def user_queries(self, path='/api/auth/me/'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path)
+        return response, [q for q in ctx.captured_queries if 'FROM "auth_user"' in q['sql']]
+
+    def test_claims_serve_requests_without_user_lookup(self):
+        self.assertEqual(AccessToken(self.access)['username'], 'claims')
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.user_queries()
+        self.assertEqual(response.data['email'], 'claims@example.com')
+        self.assertEqual(queries, [])
+
+        # Writes that need a real User get the cached row
+        response = self.client.post('/api/comments/', {'sound': self.sound.id, 'content': 'hi'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/api/favorites/', {'sound': self.sound.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Favorite.objects.get().user, self.user)
+
+    def test_revocation_is_immediate_in_this_process(self):
+        self.user_queries()
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_staff = False
+        self.user.set_password('another-pass-456')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_from_other_processes_within_ttl(self):
+        self.user_queries()
+        # A bulk update sends no signal, like a write made by another process
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, status.HTTP_200_OK)
+
+        later = time.monotonic() + 31
+        with mock.patch('sounds.authentication.time.monotonic', return_value=later):
+            self.assertEqual(self.client.get('/api/auth/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SharedBitmaps:
+    """Stand-in for a Redis client's bitmap commands, shared like Redis between "processes"."""
+
+    def __init__(self):
+        self.bitmaps = {}
+
+    def pipeline(self, transaction=True):
+        return SharedBitmapsPipeline(self.bitmaps)
+
+
+class SharedBitmapsPipeline:
+    def __init__(self, bitmaps):
+        self.bitmaps, self.results = bitmaps, []
+
+    def setbit(self, key, position, value):
+        self.bitmaps.setdefault(key, set()).add(position)
+        self.results.append(0)
+
+    def getbit(self, key, position):
+        self.results.append(int(position in self.bitmaps.get(key, ())))
+
+    def expireat(self, key, when):
+        self.results.append(True)
+
+    def execute(self):
+        return self.results
+
+
+class RefreshTokenBlacklistTest(TestCase):
+    """Test the Bloom filter in front of the blacklist and pruning of expired tokens"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        clear_user_cache()
+        reset_blacklist_filter()
+        self.addCleanup(reset_blacklist_filter)
+        # The filter needs a store every process shares, as Redis is
+        self.redis = SharedBitmaps()
+        patcher = mock.patch(
+            'sounds.token_blacklist._shared_store', lambda: token_blacklist._RedisBitmaps(self.redis)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='rotating', password='testpass123')
+        response = self.client.post('/api/auth/login/', {'username': 'rotating', 'password': 'testpass123'})
+        self.refresh = response.data['tokens']['refresh']
+
+    def rotate(self, refresh):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+
+    def blacklist_lookups(self, queries):
+        return [q for q in queries if 'FROM "token_blacklist_blacklistedtoken" INNER JOIN' in q['sql']]
+
+    def test_filter_skips_blacklist_query_and_rejects_replays(self):
+        # The first check rebuilds the filter and asks the database
+        first = self.rotate(self.refresh)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.rotate(first.data['refresh'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.blacklist_lookups(ctx.captured_queries), [])
+        self.assertEqual(metrics.get_value('token_blacklist_checks_total', answered_by='filter'), 1)
+
+        for replayed in (self.refresh, first.data['refresh']):
+            self.assertEqual(self.rotate(replayed).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+
+    def test_filter_failure_falls_back_to_database(self):
+        self.rotate(self.refresh)
+        with mock.patch('sounds.token_blacklist._RedisBitmaps.get_bits', side_effect=ConnectionError), \
+                self.assertLogs('sounds.token_blacklist', 'WARNING'):
+            self.assertEqual(self.rotate(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_blacklisted_elsewhere_are_rejected(self):
+        self.rotate(self.rotate(self.refresh).data['refresh'])
+        token = ClaimsRefreshToken.for_user(self.user)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        self.assertEqual(self.rotate(str(token)).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_filter_is_shared_between_processes(self):
+        refresh = self.rotate(self.refresh).data['refresh']
+        self.rotate(refresh)
+        # Another process: its own filter object over the same Redis
+        reset_blacklist_filter()
+        token = ClaimsRefreshToken(refresh, verify=False)
+        self.assertTrue(token_blacklist.get_blacklist_filter().might_contain(token['jti'], token['exp']))
+        self.assertEqual(self.rotate(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_without_redis_every_process_asks_the_database(self):
+        with mock.patch('sounds.token_blacklist._shared_store', return_value=None):
+            refresh = self.rotate(self.refresh).data['refresh']
+            # Blacklisted by one process (logout) ...
+            ClaimsRefreshToken(refresh).blacklist(self.user)
+            # ... and replayed against another
+            reset_blacklist_filter()
+            self.assertIsNone(token_blacklist.get_blacklist_filter())
+            self.assertEqual(self.rotate(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(metrics.get_value('token_blacklist_checks_total', answered_by='filter'), 0)
+
+    def test_refresh_schedules_pruning_once_per_interval(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            refresh = self.rotate(self.refresh).data['refresh']
+            self.rotate(refresh)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_prune_deletes_expired_tokens_in_batches(self):
+        for _ in range(4):
+            self.rotate(ClaimsRefreshToken.for_user(self.user))
+        live = OutstandingToken.objects.latest('id')
+        OutstandingToken.objects.exclude(pk=live.pk).update(expires_at=timezone.now() - timedelta(days=1))
+        expired = OutstandingToken.objects.count() - 1
+
+        self.assertEqual(prune_expired_tokens(batch_size=3, max_batches=1), 3)
+        self.assertEqual(prune_expired_tokens(batch_size=3), expired - 3)
+        self.assertEqual(list(OutstandingToken.objects.all()), [live])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_prune_tokens_command(self):
+        OutstandingToken.objects.update(expires_at=timezone.now() - timedelta(days=1))
+        out = StringIO()
+        call_command('prune_tokens', '--batch-size', '10', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 1 expired token(s).', out.getvalue())
+        self.assertFalse(OutstandingToken.objects.exists())
+
+
+class SlidingWindowThrottleTest(TestCase):
+    """Test the sliding-window throttle counters"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.now = 600.0
+        self.throttle_class = type('TestThrottle', (throttling.AnonRateThrottle,), {
+            'rate': '4/min', 'timer': lambda throttle: self.now,
+        })
+        self.request = RequestFactory().get('/api/sounds/', REMOTE_ADDR='10.0.0.1')
+        self.request.user = AnonymousUser()
+
+    def allowed(self, times=1):
+        return [self.throttle_class().allow_request(self.request, None) for _ in range(times)]
+
+    def test_limit_slides_over_the_previous_window(self):
+        self.assertEqual(self.allowed(5), [True] * 4 + [False])
+        throttle = self.throttle_class()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertAlmostEqual(throttle.wait(), 60)
+
+        # Halfway into the next window two of the previous four still count
+        self.now += 90
+        self.assertEqual(self.allowed(3), [True, True, False])
+        throttle = self.throttle_class()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertAlmostEqual(throttle.wait(), 15)
+
+        self.now += 15
+        self.assertEqual(self.allowed(2), [True, False])
+
+    def test_redis_script_checks_and_counts_atomically(self):
+        script = mock.Mock(side_effect=[[1, 0, 0], [0, 4, 0]])
+        with mock.patch('sounds.throttling._uses_redis', return_value=True), \
+                mock.patch('sounds.throttling._redis_script', return_value=script):
+            self.assertEqual(self.allowed(2), [True, False])
+        keys = script.call_args.kwargs['keys']
+        self.assertEqual(keys, [cache.make_key('throttle_anon_10.0.0.1:10'),
+                                cache.make_key('throttle_anon_10.0.0.1:9')])
+        self.assertEqual(script.call_args.kwargs['args'], [1.0, 4, 120])
+
+    def test_cache_failure_allows_requests(self):
+        with mock.patch.object(cache, 'incr', side_effect=ConnectionError), \
+                self.assertLogs('sounds.throttling', 'WARNING'):
+            self.assertEqual(self.allowed(6), [True] * 6)
+
+    def test_login_throttle_fails_closed(self):
+        User.objects.create_user(username='locked', password='testpass123')
+        client = APIClient()
+        with mock.patch.object(cache, 'incr', side_effect=ConnectionError), \
+                mock.patch.object(cache, 'add', side_effect=ConnectionError), \
+                self.assertLogs('sounds.throttling', 'ERROR'):
+            response = client.post('/api/auth/login/', {'username': 'locked', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_throttles', '--rate', '20/hour', stdout=out)
+        self.assertIn('sliding window', out.getvalue())
+        self.assertIn('drf (timestamp list)', out.getvalue())
+
+
+class PasswordHashingPoolTest(TestCase):
+    """Test login and register hashing on the bounded pool"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='hasher', email='hasher@example.com', password='testpass123'
+        )
+
+    def login(self, **credentials):
+        return self.client.post('/api/auth/login/', dict(credentials, password='testpass123'))
+
+    def test_email_login_reads_the_user_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login(email='hasher@example.com')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user_reads = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and '"auth_user"' in q['sql']]
+        self.assertEqual(len(user_reads), 1)
+        self.assertEqual(self.login(username='nobody').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        weak = PBKDF2PasswordHasher().encode('testpass123', 'salt1234', iterations=1000)
+        User.objects.filter(pk=self.user.pk).update(password=weak)
+        self.assertEqual(self.login(username='hasher').status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, weak)
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    @override_settings(JWT_USER_CACHE_TTL=30)
+    def test_hash_upgrade_keeps_existing_tokens(self):
+        clear_user_cache()
+        self.addCleanup(clear_user_cache)
+        weak = PBKDF2PasswordHasher().encode('testpass123', 'salt1234', iterations=1000)
+        User.objects.filter(pk=self.user.pk).update(password=weak)
+        self.user.refresh_from_db()
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.assertEqual(other.get('/api/auth/me/').status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.login(username='hasher').status_code, status.HTTP_200_OK)
+        self.assertEqual(other.get('/api/auth/me/').status_code, status.HTTP_200_OK)
+        response = other.post('/api/auth/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        rotated = RefreshToken(response.data['refresh'])
+        self.assertEqual(rotated['hash_password'], get_md5_hash_password(self.user.password))
+
+        # A real password change still revokes them
+        self.user.set_password('another-pass-456')
+        self.user.save()
+        self.assertEqual(other.get('/api/auth/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        self.assertEqual(other.get('/api/auth/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_saturated_pool_sheds_with_retry_after(self):
+        executor, slots = passwords.get_executor()
+        full = threading.BoundedSemaphore(1)
+        full.acquire()
+        with mock.patch('sounds.passwords.get_executor', return_value=(executor, full)):
+            response = self.login(username='hasher')
+            register = self.client.post('/api/auth/register/', {
+                'username': 'later', 'email': 'later@example.com', 'password': 'another-pass-456',
+            })
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(register.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(User.objects.filter(username='later').exists())
+
+    def test_register_stores_pool_hashed_password(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'fresh', 'email': 'Fresh@EXAMPLE.com', 'password': 'another-pass-456',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = User.objects.get(username='fresh')
+        self.assertEqual(user.email, 'Fresh@example.com')
+        self.assertTrue(user.check_password('another-pass-456'))
+
+
+class SecurityLogPipelineTest(TempDirMixin, TestCase):
+    """Test the queued, batched security log writer"""
+
+    def setUp(self):
+        metrics.reset()
+        self.directory = self.temp_dir()
+        self.path = os.path.join(self.directory, 'security.log')
+
+    def handler(self, **options):
+        handler = security_log.SecurityLogHandler(self.path, **options)
+        self.addCleanup(handler.close)
+        return handler
+
+    def record(self, message='event', **fields):
+        record = logging.LogRecord('security', logging.WARNING, __file__, 1, message, None, None)
+        record.security = fields
+        return record
+
+    def read_lines(self, path=None):
+        with open(path or self.path, encoding='utf-8') as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_records_are_written_as_json_lines(self):
+        handler = self.handler(flush_interval=0.01)
+        handler.handle(self.record('Failed login', event='login_failed', ip='10.0.0.1', username='eve'))
+        handler.handle(self.record('plain'))
+        handler.flush()
+        first, second = self.read_lines()
+        self.assertEqual(
+            (first['event'], first['ip'], first['username'], first['message']),
+            ('login_failed', '10.0.0.1', 'eve', 'Failed login'),
+        )
+        self.assertEqual(second['event'], 'log')
+        self.assertTrue(first['time'].endswith('+00:00'))
+        self.assertEqual(metrics.get_value('security_log_written_total'), 2)
+        self.assertEqual(metrics.get_value('security_log_queue_depth'), 0)
+
+    def test_size_rotation_compresses_segments(self):
+        handler = self.handler(max_bytes=200, backup_count=2, compress=True, flush_interval=0.01)
+        for number in range(12):
+            handler.handle(self.record(f'event {number}'))
+            handler.flush()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not all(
+                path.endswith('.gz') for path in handler.file.segments()):
+            time.sleep(0.01)
+        segments = handler.file.segments()
+        self.assertEqual(len(segments), 2)
+        with gzip.open(segments[-1], 'rt', encoding='utf-8') as segment:
+            self.assertTrue(json.loads(segment.readline())['message'].startswith('event'))
+        self.assertEqual(self.read_lines()[-1]['message'], 'event 11')
+
+    def test_time_rotation_across_processes(self):
+        first = security_log.RotatingLogFile(self.path, rotate_interval=3600)
+        second = security_log.RotatingLogFile(self.path, rotate_interval=3600)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        with mock.patch('soundvault_backend.security_log.time.time', return_value=7200.0):
+            first.write('a\n')
+            second.write('b\n')
+        with mock.patch('soundvault_backend.security_log.time.time', return_value=10800.0):
+            first.write('c\n')
+            # Already rotated by the other process: reopen, do not rotate again
+            second.write('d\n')
+        self.assertEqual(len(first.segments()), 1)
+        with open(first.segments()[0]) as segment:
+            self.assertEqual(segment.read(), 'a\nb\n')
+        with open(self.path) as current:
+            self.assertEqual(current.read(), 'c\nd\n')
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = self.handler(queue_size=2, flush_interval=0.01)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        run = security_log.SecurityLogHandler._run
+
+        def stalled_writer(writer):
+            release.wait(5)
+            run(writer)
+
+        with mock.patch.object(security_log.SecurityLogHandler, '_run', stalled_writer):
+            for number in range(6):
+                handler.handle(self.record(f'event {number}'))
+        self.assertEqual(metrics.get_value('security_log_dropped_total'), 4)
+        self.assertEqual(metrics.get_value('security_log_queue_depth'), 2)
+        release.set()
+        handler.flush()
+        self.assertEqual([line['message'] for line in self.read_lines()], ['event 0', 'event 1'])
+
+    def test_failed_login_is_a_security_event(self):
+        cache.clear()
+        with self.assertLogs('security', 'WARNING') as logs:
+            response = APIClient().post('/api/auth/login/', {'username': 'ghost', 'password': 'wrong-pass-123'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        record = logs.records[0]
+        self.assertEqual(record.security['event'], 'login_failed')
+        self.assertEqual(record.security['username'], 'ghost')
+        self.assertEqual(record.security['ip'], '127.0.0.1')
+
+
+class SecurityLogIndexTest(TempDirMixin, TestCase):
+    """Test the incremental security log index and its query command"""
+
+    def setUp(self):
+        self.directory = self.temp_dir()
+        self.path = os.path.join(self.directory, 'security.log')
+        self.index_dir = os.path.join(self.directory, 'index')
+
+    def write(self, path, minute, count, event='login_failed', ip='10.0.0.1', username='eve'):
+        with open(path, 'a', encoding='utf-8') as log_file:
+            for second in range(count):
+                log_file.write(json.dumps({
+                    'time': f'2026-10-16T12:{minute:02d}:{second:02d}.000+00:00', 'level': 'WARNING',
+                    'event': event, 'ip': ip, 'username': username, 'message': f'{minute}:{second}',
+                }) + '\n')
+
+    def at(self, minute):
+        return datetime(2026, 10, 16, 12, minute, tzinfo=dt_timezone.utc)
+
+    def build_log(self):
+        rotated = f'{self.path}.20261016T120200000000Z'
+        self.write(rotated, 0, 3)
+        self.write(rotated, 1, 2, ip='10.0.0.2')
+        with open(rotated, 'rb') as source, gzip.open(f'{rotated}.gz', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+        self.write(self.path, 2, 4, event='throttled', username=None)
+
+    def test_queries_span_segments_and_update_incrementally(self):
+        self.build_log()
+        index = SecurityLogIndex(self.path, self.index_dir)
+        self.assertEqual(index.update(), 9)
+        self.assertEqual(index.update(), 0)
+
+        events = list(index.events(since=self.at(1), until=self.at(3)))
+        self.assertEqual([event['message'] for event in events], ['1:0', '1:1', '2:0', '2:1', '2:2', '2:3'])
+        self.assertEqual(len(list(index.events(event='login_failed', ip='10.0.0.1'))), 3)
+        self.assertEqual(list(index.events(ip='192.0.2.1')), [])
+
+        self.assertEqual(index.count(by=['ip'], per='minute', event='login_failed'), {
+            (self.at(0), '10.0.0.1'): 3,
+            (self.at(1), '10.0.0.2'): 2,
+        })
+
+        # Appended lines, then a rotation: only the new lines are read
+        self.write(self.path, 3, 2, event='throttled', username=None)
+        self.assertEqual(index.update(), 2)
+        os.rename(self.path, f'{self.path}.20261016T120400000000Z')
+        self.write(self.path, 4, 1)
+        self.assertEqual(index.update(), 1)
+        self.assertEqual(index.count(by=['event']), {('login_failed',): 6, ('throttled',): 6})
+        self.assertEqual([event['message'] for event in index.events(since=self.at(3))], ['3:0', '3:1', '4:0'])
+
+    def test_deleted_segments_leave_the_index(self):
+        self.build_log()
+        index = SecurityLogIndex(self.path, self.index_dir)
+        index.update()
+        for segment in security_log.log_segments(self.path):
+            os.remove(segment)
+        index.update()
+        self.assertEqual(index.count(by=['event']), {('throttled',): 4})
+        self.assertEqual(len([name for name in os.listdir(self.index_dir) if name.endswith('.idx')]), 1)
+
+    def test_command_counts_failed_logins_per_ip_per_minute(self):
+        self.build_log()
+        out = StringIO()
+        with override_settings(SECURITY_LOG_DIR=Path(self.directory), SECURITY_LOG_INDEX_DIR=Path(self.index_dir)):
+            call_command(
+                'security_log_query', '--event', 'login_failed', '--count-by', 'ip', '--per', 'minute',
+                '--min-count', '3', stdout=out, stderr=StringIO(),
+            )
+            self.assertEqual(out.getvalue().splitlines(), ['2026-10-16T12:00:00+00:00\t10.0.0.1\t3'])
+
+            out = StringIO()
+            call_command('security_log_query', '--since', '2026-10-16T12:02', '--limit', '1',
+                         stdout=out, stderr=StringIO())
+            self.assertEqual(json.loads(out.getvalue())['event'], 'throttled')
+
+
+
+class SoundCommentsTest(TestCase):
+    """Test latest-comment windows and the per-sound comment endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.users = [User.objects.create_user(username=f'commenter{i}', password='testpass123') for i in range(3)]
+        self.sounds = [Sound.objects.create(name=f'Commented {i}', uploaded_by=self.users[0]) for i in range(3)]
+        for i in range(12):
+            Comment.objects.create(sound=self.sounds[0], user=self.users[i % 3], content=f'first {i}')
+        for i in range(2):
+            Comment.objects.create(sound=self.sounds[1], user=self.users[i], content=f'second {i}')
+        # Identical timestamps exercise the id tiebreaker
+        Comment.objects.filter(sound=self.sounds[0]).update(created_at=timezone.now())
+
+    def newest(self, sound, limit):
+        return list(sound_comments(sound.pk)[:limit])
+
+    def test_latest_comments_of_many_sounds_in_one_query(self):
+        with self.assertNumQueries(1):
+            comments = latest_comments([sound.pk for sound in self.sounds], limit=10)
+            authors = {comment.user.username for sound_comments in comments.values() for comment in sound_comments}
+        self.assertEqual(comments[self.sounds[0].pk], self.newest(self.sounds[0], 10))
+        self.assertEqual(comments[self.sounds[1].pk], self.newest(self.sounds[1], 10))
+        self.assertEqual(comments[self.sounds[2].pk], [])
+        self.assertEqual(authors, {'commenter0', 'commenter1', 'commenter2'})
+        self.assertEqual(latest_comments([]), {})
+
+    def test_detail_embeds_the_newest_ten(self):
+        response = self.client.get(f'/api/sounds/{self.sounds[0].id}/')
+        self.assertEqual(
+            [comment['id'] for comment in response.data['comments']],
+            [comment.pk for comment in self.newest(self.sounds[0], 10)],
+        )
+
+    def test_endpoint_pages_through_one_sound(self):
+        url = f'/api/sounds/{self.sounds[0].id}/comments/'
+        ids = []
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'page_size': 5})
+        # Validators, existence check and the page with its authors
+        self.assertEqual(len(ctx.captured_queries), 3)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(comment['id'] for comment in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, [comment.pk for comment in self.newest(self.sounds[0], 20)])
+        self.assertEqual(response.data['results'][0]['user_name'], 'commenter1')
+
+    def test_endpoint_revalidates_and_sees_new_comments(self):
+        url = f'/api/sounds/{self.sounds[1].id}/comments/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.client.force_authenticate(user=self.users[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/comments/', {'sound': self.sounds[1].id, 'content': 'third'})
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['content'], 'third')
+
+    def test_endpoint_unknown_sound(self):
+        response = self.client.get('/api/sounds/999999/comments/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/sounds/abc/comments/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+def explain(sql, params=None):
+    """The query plan of ``sql`` as text, with sequential scans discouraged on PostgreSQL."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class QueryPlanTest(TestCase):
+    """Test that the hot read queries are served by their indexes"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        drums = Tag.objects.create(name='drums')
+        self.sounds = [Sound.objects.create(name=f'Planned {i}', uploaded_by=self.user) for i in range(5)]
+        for sound in self.sounds:
+            sound.tags.add(drums)
+            Comment.objects.create(sound=sound, user=self.user, content='planned')
+            Favorite.objects.create(user=self.user, sound=sound)
+        Sound.objects.filter(pk=self.sounds[0].pk).update(analysis_status=Sound.AnalysisStatus.DONE)
+
+    def page_plans(self, url, table):
+        """Plans of the ordered SELECTs from ``table`` made by GET ``url``."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            explain(query['sql']) for query in ctx.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql'] and 'ORDER BY' in query['sql']
+        ]
+
+    def assert_served_by(self, index, plans):
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertIn(index, plan)
+            # The index also yields the order: no sort step
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+            self.assertNotRegex(plan, r'(?m)^\s*(->\s*)?Sort\b')
+
+    def test_sound_list(self):
+        self.assert_served_by('sound_created_id_idx', self.page_plans('/api/sounds/', 'sounds_sound'))
+        self.assert_served_by('sound_name_id_idx', self.page_plans('/api/sounds/?ordering=name', 'sounds_sound'))
+
+    def test_comments_by_sound_and_recent(self):
+        sound = self.sounds[1]
+        self.assert_served_by(
+            'comment_sound_created_idx', self.page_plans(f'/api/sounds/{sound.id}/comments/', 'sounds_comment')
+        )
+        self.assert_served_by(
+            'comment_sound_created_idx', self.page_plans(f'/api/comments/?sound={sound.id}', 'sounds_comment')
+        )
+        self.assert_served_by('comment_created_id_idx', self.page_plans('/api/comments/', 'sounds_comment'))
+
+    def test_favorites_by_user(self):
+        self.client.force_authenticate(user=self.user)
+        self.assert_served_by('favorite_user_created_id_idx', self.page_plans('/api/favorites/', 'sounds_favorite'))
+
+    def test_analysis_backlog(self):
+        self.addCleanup(analysis.shutdown_executor)
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('analyze_sounds', stdout=StringIO())
+        self.assert_served_by('sound_analysis_backlog_idx', [explain(ctx.captured_queries[0]['sql'])])
+
+    @skipUnless(connection.vendor == 'postgresql', 'trigram indexes are PostgreSQL only')
+    def test_tag_name_trigram(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/tags/?search=rum')
+        plans = [explain(query['sql']) for query in ctx.captured_queries if 'FROM "sounds_tag"' in query['sql']]
+        self.assertTrue(any('sounds_tag_name_upper_trgm' in plan for plan in plans))
@@ -0,0 +1,138 @@
+"""
+Sliding-window rate throttles.
+
+DRF's ``SimpleRateThrottle`` keeps a list with the timestamp of every
+request in the window. Each request reads that list from the cache, trims
+it and writes it back. The cost grows with the rate, and two workers
+handling the same client can both read the list before either writes it.
+
+``SlidingWindowRateThrottle`` keeps two counters per client instead: one for
+the current fixed window and one for the previous window. The previous
+window is weighted by how much of it still overlaps the sliding window. So
+a client at 10/hour, 15 minutes into the hour, is allowed
+``previous * 0.75 + current < 10``. With Redis as the cache, the check and
+the increment are one Lua script: a single atomic round trip for any rate.
+Other caches (LocMem in development and tests) use ``incr``, and ``add``
+for a window's first request. LocMem runs both under its own lock.
+
+When the cache cannot be reached, throttles with ``fail_open`` (the API-wide
+anon and user throttles) let requests through rather than take the API down.
+Those without it, such as the login throttle, refuse them: an outage must not
+switch off brute-force protection.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import throttling
+
+from soundvault_backend.security_log import security_event
+
+logger = logging.getLogger(__name__)
+
+# KEYS: current window counter, previous window counter
+# ARGV: weight of the previous window, limit, counter lifetime in seconds
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current + 1 > tonumber(ARGV[2]) then
+    return {0, current, previous}
+end
+if redis.call('INCR', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {1, current, previous}
+"""
+
+_script = None
+
+
+def _uses_redis():
+    return settings.CACHES['default']['BACKEND'].startswith('django_redis')
+
+
+def _redis_script():
+    global _script
+    if _script is None:
+        from django_redis import get_redis_connection
+
+        _script = get_redis_connection('default').register_script(SLIDING_WINDOW_SCRIPT)
+    return _script
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """``SimpleRateThrottle`` with two window counters instead of a timestamp list."""
+
+    # Whether to allow requests while the counters are unavailable
+    fail_open = True
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, elapsed = divmod(self.timer(), self.duration)
+        self.weight = 1 - elapsed / self.duration
+        current_key = f'{self.key}:{int(window)}'
+        previous_key = f'{self.key}:{int(window) - 1}'
+        try:
+            if _uses_redis():
+                allowed = self.count_in_redis(current_key, previous_key)
+            else:
+                allowed = self.count_in_cache(current_key, previous_key)
+        except Exception:
+            if self.fail_open:
+                # An unreachable cache must not take the API down with it
+                logger.warning('Throttle counters unavailable; allowing the request', exc_info=True)
+                return True
+            logger.error('Throttle counters unavailable; refusing the request', exc_info=True)
+            # wait() then reports the rest of the window
+            self.current, self.previous = self.num_requests, 0
+            return self.throttle_failure()
+        if not allowed:
+            security_event('throttled', request, scope=self.scope, path=request.path)
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def count_in_redis(self, current_key, previous_key):
+        allowed, self.current, self.previous = _redis_script()(
+            keys=[cache.make_key(current_key), cache.make_key(previous_key)],
+            args=[self.weight, self.num_requests, 2 * self.duration],
+        )
+        return bool(allowed)
+
+    def count_in_cache(self, current_key, previous_key):
+        try:
+            self.current = cache.incr(current_key) - 1
+        except ValueError:
+            # First request of the window; the counter outlives the window
+            if cache.add(current_key, 1, 2 * self.duration):
+                self.current = 0
+            else:
+                self.current = cache.incr(current_key) - 1
+        self.previous = cache.get(previous_key, 0)
+        if self.previous * self.weight + self.current + 1 > self.num_requests:
+            cache.decr(current_key)
+            return False
+        return True
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Seconds until the previous window's share has dropped enough for one more request."""
+        remaining = self.weight * self.duration
+        if self.current + 1 > self.num_requests or not self.previous:
+            return remaining
+        allowed_weight = (self.num_requests - self.current - 1) / self.previous
+        return max(0.0, (self.weight - allowed_weight) * self.duration)
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(SlidingWindowRateThrottle, throttling.UserRateThrottle):
+    pass
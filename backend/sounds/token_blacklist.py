@@ -0,0 +1,249 @@
+"""
+Refresh-token blacklist: a Bloom filter in front of the database check, and
+pruning of expired tokens.
+
+Every refresh rotates the token and blacklists the old one, so the blacklist
+is checked on each refresh and the answer is almost always "no".
+``BlacklistFilter`` gives that answer without a query. There is one filter
+per expiry day of the tokens it covers, because a token can only be
+replayed until it expires. A filter is dropped as a whole once its day has
+passed, so it never fills up.
+
+The filters are Redis bitmaps shared by every process. Without a Redis
+cache there is no filter and every check asks the database: a filter in
+one server process would never see tokens blacklisted by the others, and
+would accept them. A filter answers "not blacklisted" only after it has
+been rebuilt from the database, which its last bit records. A filter
+that Redis evicted or lost on a restart is therefore rebuilt on first use
+instead of silently missing entries. Tokens are added to the filter before
+their blacklist row is written, so the filter never lags the database.
+
+``prune_expired_tokens`` deletes expired outstanding tokens, and their
+blacklist rows, in short bounded batches. Refreshes start it in the
+background at most once per ``TOKEN_PRUNE_INTERVAL`` seconds, and
+``manage.py prune_tokens`` runs it on demand.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from soundvault_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 24 * 60 * 60
+KEY_PREFIX = 'token-bloom'
+REBUILD_BATCH_SIZE = 2000
+PRUNE_LEASE_KEY = 'token-prune:lease'
+
+metrics.describe(
+    'token_blacklist_checks_total', 'counter',
+    'Refresh-token blacklist checks, by whether the Bloom filter answered or the database did.',
+)
+
+_filter = None
+_filter_lock = threading.Lock()
+_prune_executor = None
+
+
+def filter_size(capacity, error_rate):
+    """Return ``(bits, hashes)`` for a Bloom filter of ``capacity`` entries."""
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+def _expiry_day(exp):
+    return int(exp) // SECONDS_PER_DAY
+
+
+class _RedisBitmaps:
+    """One Redis bitmap per expiry day, expiring an hour after the day ends."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def set_bits(self, day, positions):
+        key = f'{KEY_PREFIX}:{day}'
+        pipe = self.client.pipeline(transaction=False)
+        for position in positions:
+            pipe.setbit(key, position, 1)
+        pipe.expireat(key, (day + 1) * SECONDS_PER_DAY + 3600)
+        pipe.execute()
+
+    def get_bits(self, day, positions):
+        key = f'{KEY_PREFIX}:{day}'
+        pipe = self.client.pipeline(transaction=False)
+        for position in positions:
+            pipe.getbit(key, position)
+        return [bool(value) for value in pipe.execute()]
+
+
+class BlacklistFilter:
+    def __init__(self, store, capacity, error_rate):
+        self.store = store
+        self.bits, self.hashes = filter_size(capacity, error_rate)
+        # Set once the day's filter holds every blacklisted token
+        self.ready_bit = self.bits
+
+    def positions(self, jti):
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.bits for i in range(self.hashes)]
+
+    def add(self, jti, exp):
+        # Errors propagate: a blacklisted token missing from a ready filter would be accepted
+        self.store.set_bits(_expiry_day(exp), self.positions(jti))
+
+    def might_contain(self, jti, exp):
+        """False only when ``jti`` is certainly not blacklisted."""
+        day = _expiry_day(exp)
+        if day < _expiry_day(time.time()):
+            return True
+        try:
+            values = self.store.get_bits(day, self.positions(jti) + [self.ready_bit])
+            if not values[-1]:
+                self.rebuild(day)
+                return True
+        except Exception:
+            logger.warning('Token blacklist filter unavailable; checking the database', exc_info=True)
+            return True
+        return all(values[:-1])
+
+    def rebuild(self, day):
+        """Add every blacklisted token expiring on ``day``, then mark the filter ready."""
+        lock_key = f'{KEY_PREFIX}:rebuild:{day}'
+        if not cache.add(lock_key, 1, 300):
+            return
+        try:
+            start = datetime.fromtimestamp(day * SECONDS_PER_DAY, tz=dt_timezone.utc)
+            end = datetime.fromtimestamp((day + 1) * SECONDS_PER_DAY, tz=dt_timezone.utc)
+            jtis = BlacklistedToken.objects.filter(
+                token__expires_at__gte=start, token__expires_at__lt=end,
+            ).values_list('token__jti', flat=True)
+            batch = []
+            for jti in jtis.iterator(chunk_size=REBUILD_BATCH_SIZE):
+                batch.extend(self.positions(jti))
+                if len(batch) >= REBUILD_BATCH_SIZE * self.hashes:
+                    self.store.set_bits(day, batch)
+                    batch = []
+            self.store.set_bits(day, batch + [self.ready_bit])
+        finally:
+            cache.delete(lock_key)
+
+
+def _shared_store():
+    """Redis bitmaps, or None when the cache is not shared between processes."""
+    if not settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+        return None
+    from django_redis import get_redis_connection
+
+    return _RedisBitmaps(get_redis_connection('default'))
+
+
+def get_blacklist_filter():
+    """
+    Return the shared filter, or None when ``TOKEN_BLOOM_FILTER_ENABLED`` is
+    off or the cache is not Redis.
+    """
+    global _filter
+    if not getattr(settings, 'TOKEN_BLOOM_FILTER_ENABLED', True):
+        return None
+    with _filter_lock:
+        if _filter is None:
+            store = _shared_store()
+            if store is None:
+                return None
+            capacity = getattr(settings, 'TOKEN_BLOOM_CAPACITY', 200000)
+            error_rate = getattr(settings, 'TOKEN_BLOOM_ERROR_RATE', 0.01)
+            _filter = BlacklistFilter(store, capacity, error_rate)
+        return _filter
+
+
+def reset_blacklist_filter():
+    global _filter
+    with _filter_lock:
+        _filter = None
+
+
+def is_blacklisted(jti, exp):
+    token_filter = get_blacklist_filter()
+    if token_filter is not None and not token_filter.might_contain(jti, exp):
+        metrics.increment('token_blacklist_checks_total', answered_by='filter')
+        return False
+    metrics.increment('token_blacklist_checks_total', answered_by='database')
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def remember_blacklisted(jti, exp):
+    token_filter = get_blacklist_filter()
+    if token_filter is not None:
+        token_filter.add(jti, exp)
+
+
+def prune_expired_tokens(batch_size=1000, max_batches=None, pause=0.0, now=None):
+    """
+    Delete outstanding tokens that expired before ``now``, with their
+    blacklist rows, ``batch_size`` at a time. Each batch is its own short
+    transaction on primary keys, so no lock is held for long. Returns the
+    number of outstanding tokens deleted.
+    """
+    now = now or timezone.now()
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        batches += 1
+        if pause and len(ids) == batch_size:
+            time.sleep(pause)
+    return deleted
+
+
+def schedule_pruning():
+    """Start a bounded prune in the background, at most once per ``TOKEN_PRUNE_INTERVAL``."""
+    interval = getattr(settings, 'TOKEN_PRUNE_INTERVAL', 3600)
+    if interval <= 0 or not cache.add(PRUNE_LEASE_KEY, 1, interval):
+        return
+    transaction.on_commit(lambda: _get_prune_executor().submit(_prune_in_background))
+
+
+def _get_prune_executor():
+    global _prune_executor
+    with _filter_lock:
+        if _prune_executor is None:
+            _prune_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='token-prune')
+        return _prune_executor
+
+
+def _prune_in_background():
+    try:
+        deleted = prune_expired_tokens(
+            batch_size=getattr(settings, 'TOKEN_PRUNE_BATCH_SIZE', 1000),
+            max_batches=getattr(settings, 'TOKEN_PRUNE_MAX_BATCHES', 10),
+            pause=0.05,
+        )
+        if deleted:
+            logger.info('Pruned %d expired refresh tokens', deleted)
+    except Exception:
+        logger.exception('Pruning expired refresh tokens failed')
+    finally:
+        connection.close()
@@ -0,0 +1,198 @@
+"""
+Resumable chunked uploads for large audio files.
+
+Protocol (admin only, see ``UploadSessionViewSet``):
+
+1. ``POST /api/uploads/`` with ``filename``, ``size`` and ``checksum``
+   (hex SHA-256) opens a session.
+2. ``PUT /api/uploads/<id>/`` with a raw body and
+   ``Content-Range: bytes <start>-<end>/<size>`` appends a chunk. ``start``
+   must equal the current offset; ``GET /api/uploads/<id>/`` reports it, so
+   an interrupted client resumes from there.
+3. ``POST /api/uploads/<id>/finalize/`` verifies size and checksum and
+   attaches the file to a new or existing ``Sound``.
+
+Chunks are streamed from the request straight into a per-session part file
+under ``UPLOAD_SESSION_DIR``; the part file's size *is* the offset, and an
+exclusive ``flock`` serializes writers. Sessions idle for longer than
+``UPLOAD_SESSION_TTL`` are removed by ``purge_expired_sessions``.
+"""
+import fcntl
+import hashlib
+import os
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+
+
+STREAM_BLOCK_SIZE = 256 * 1024
+PART_SUFFIX = '.part'
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """A chunk or finalize request that cannot be applied to the session."""
+
+    def __init__(self, message, offset=None):
+        super().__init__(message)
+        self.offset = offset
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start at the session's current offset."""
+
+
+class SessionFile(File):
+    """
+    A finished part file. ``temporary_file_path`` lets ``FileSystemStorage``
+    move it into place instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_dir():
+    path = str(getattr(settings, 'UPLOAD_SESSION_DIR'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def part_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}{PART_SUFFIX}')
+
+
+def current_offset(session):
+    try:
+        return os.path.getsize(part_path(session))
+    except FileNotFoundError:
+        return 0
+
+
+def parse_content_range(header):
+    """Return ``(start, end, total)`` from ``Content-Range``, or raise UploadError."""
+    match = _CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise UploadError('Content-Range: bytes <start>-<end>/<size> is required.')
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError('Content-Range end precedes start.')
+    return start, end, total
+
+
+def write_chunk(session, stream, content_range):
+    """
+    Append the chunk in ``stream`` at the offset named by ``content_range``.
+    The body is copied in fixed-size blocks, never held in memory as a whole.
+    Returns the new offset.
+    """
+    start, end, total = parse_content_range(content_range)
+    if total != session.size:
+        raise UploadError('Content-Range size does not match the session.')
+    if end >= session.size:
+        raise UploadError('Chunk extends past the end of the file.')
+
+    with open(part_path(session), 'ab') as part:
+        fcntl.flock(part, fcntl.LOCK_EX)
+        try:
+            offset = part.seek(0, os.SEEK_END)
+            if start != offset:
+                raise OffsetMismatch('Chunk does not start at the current offset.', offset)
+            remaining = end - start + 1
+            while remaining > 0:
+                block = stream.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                part.write(block)
+                remaining -= len(block)
+            part.flush()
+            offset = part.tell()
+        finally:
+            fcntl.flock(part, fcntl.LOCK_UN)
+
+    # Keep the session alive for the garbage collector
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+    return offset
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(STREAM_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify_complete(session):
+    """Raise UploadError unless the part file is complete and matches the checksum."""
+    offset = current_offset(session)
+    if offset != session.size:
+        raise UploadError('Upload is incomplete.', offset)
+    if file_checksum(part_path(session)) != session.checksum.lower():
+        raise UploadError('Checksum mismatch.', offset)
+
+
+def attach_to_sound(session, sound):
+    """
+    Store the verified part file as ``sound.mp3_file`` and end the session.
+    What gets moved into storage is a hard link to the part file, and the
+    part file itself is only removed once the session's deletion commits, so
+    a finalize whose transaction rolls back can be retried.
+    """
+    path = part_path(session)
+    link = f'{path}.{os.getpid()}.{threading.get_ident()}.attach'
+    os.link(path, link)
+    try:
+        with open(link, 'rb') as part:
+            sound.mp3_file.save(session.filename, SessionFile(part, name=session.filename), save=False)
+    finally:
+        # Still there if the storage copied it instead of moving it
+        if os.path.exists(link):
+            os.remove(link)
+    sound.save()
+    discard(session)
+    return sound
+
+
+def discard(session):
+    """Delete a session, and its part file once the deletion has committed."""
+    path = part_path(session)
+
+    def remove_part():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    session.delete()
+    transaction.on_commit(remove_part)
+
+
+def purge_expired_sessions(now=None):
+    """
+    Delete sessions idle for longer than ``UPLOAD_SESSION_TTL`` seconds and
+    part files that no session owns. Returns the number of sessions removed.
+    """
+    now = now or timezone.now()
+    ttl = timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 60 * 60 * 24))
+    expired = list(UploadSession.objects.filter(updated_at__lt=now - ttl))
+    for session in expired:
+        discard(session)
+
+    directory = upload_dir()
+    live = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+    for filename in os.listdir(directory):
+        if filename.endswith(PART_SUFFIX) and filename[:-len(PART_SUFFIX)] not in live:
+            path = os.path.join(directory, filename)
+            # Parts younger than the TTL may belong to a session being created
+            if now.timestamp() - os.path.getmtime(path) > ttl.total_seconds():
+                os.remove(path)
+    return len(expired)
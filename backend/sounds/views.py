@@ -1,21 +1,41 @@
-from rest_framework import viewsets, status, filters, serializers
+from rest_framework import mixins, viewsets, status, filters, serializers
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
-from django.db.models import Q
-from .models import Sound, Tag, Comment, Favorite
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+from soundvault_backend import metrics
+from .models import Sound, Tag, Comment, Favorite, UploadSession
+from .async_views import AsyncReadMixin
+from .comments import prefetch_latest_comments, sound_comments
+from .conditional import ConditionalGetMixin
+from .images import VARIANT_FORMATS, ensure_variant, variant_widths
+from .media import serve_field_file, serve_stored_file
+from .pagination import KeysetPagination
+from .response_cache import CachedCatalogMixin, SOUND_LIST_SCOPE, TAG_LIST_SCOPE, sound_scope
+from .search import SoundSearchFilter
 from .serializers import (
     SoundListSerializer, SoundDetailSerializer, SoundCreateUpdateSerializer,
-    TagSerializer, CommentSerializer, FavoriteSerializer, UserSerializer
+    TagSerializer, CommentSerializer, FavoriteSerializer, UserSerializer,
+    UploadSessionSerializer, UploadFinalizeSerializer
 )
+from .uploads import (
+    OffsetMismatch, UploadError, attach_to_sound, discard, purge_expired_sessions,
+    verify_complete, write_chunk
+)
+import hmac
 import socket
 import os
 from datetime import datetime, timezone
 import logging
 
 security_logger = logging.getLogger("security")
-class SoundViewSet(viewsets.ModelViewSet):
+class SoundViewSet(ConditionalGetMixin, CachedCatalogMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Sound model.
     - List/Retrieve: Public access
@@ -23,10 +43,14 @@ class SoundViewSet(viewsets.ModelViewSet):
     """
     queryset = Sound.objects.all()
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description', 'tags__name']
-    ordering_fields = ['created_at', 'name']
+    pagination_class = KeysetPagination
+    # ?search= is handled by SoundSearchFilter only; it must run after
+    # OrderingFilter so relevance ordering wins when no ?ordering= is given.
+    filter_backends = [filters.OrderingFilter, SoundSearchFilter]
+    ordering_fields = ['created_at', 'name', 'favorite_count', 'comment_count']
     ordering = ['-created_at']
+    object_validator_fields = ('updated_at', 'favorite_count', 'comment_count', 'analysis_status')
+    last_modified_key = 'updated_at'
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -35,6 +59,8 @@ class SoundViewSet(viewsets.ModelViewSet):
             return SoundDetailSerializer
         elif self.action in ['create', 'update', 'partial_update']:
             return SoundCreateUpdateSerializer
+        elif self.action == 'comments':
+            return CommentSerializer
         return SoundListSerializer
 
     def get_permissions(self):
@@ -49,30 +75,44 @@ class SoundViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = Sound.objects.all().prefetch_related('tags', 'uploaded_by')
+        if self.action == 'retrieve':
+            # SoundDetailSerializer embeds the 10 latest comments with their authors
+            queryset = queryset.prefetch_related(prefetch_latest_comments())
         
         # Filter by tags
         tag = self.request.query_params.get('tag', None)
         if tag:
             queryset = queryset.filter(tags__name__icontains=tag).distinct()
         
-        # Filter by search query
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(tags__name__icontains=search)
-            ).distinct()
-        
         return queryset
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, context={'request': request})
-        return Response(serializer.data)
+    def get_cache_scopes(self):
+        if self.action == 'list':
+            return [SOUND_LIST_SCOPE]
+        lookup = str(self.kwargs.get(self.lookup_field, ''))
+        if not lookup.isdigit():
+            return None
+        return [sound_scope(int(lookup))]
+
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """Keyset-paginated comments of one sound, newest first."""
+        # The sound's validators cover its comments: every comment write bumps its scope
+        return self.conditional_response(request, self.comments_page, pk)
+
+    def comments_page(self, request, pk):
+        try:
+            found = Sound.objects.filter(pk=pk).exists()
+        except (TypeError, ValueError):
+            found = False
+        if not found:
+            raise Http404('No Sound matches the given query.')
+        page = self.paginate_queryset(sound_comments(pk))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, CachedCatalogMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Tag model.
     - List/Retrieve: Public access
@@ -83,6 +123,7 @@ class TagViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
+    object_validator_fields = ('name',)
 
     def get_permissions(self):
         """
@@ -94,8 +135,11 @@ class TagViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
+    def get_cache_scopes(self):
+        return [TAG_LIST_SCOPE]
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(ConditionalGetMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Comment model.
     - Create: Authenticated users
@@ -105,6 +149,9 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all().select_related('user', 'sound')
     serializer_class = CommentSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+    object_validator_fields = ('sound_id', 'content', 'created_at')
+    last_modified_key = 'created_at'
 
     def get_permissions(self):
         if self.action == 'create':
@@ -115,8 +162,15 @@ class CommentViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
+    def get_cache_scopes(self):
+        # Every comment write bumps its sound's scope and the sound list scope
+        sound_id = self.request.query_params.get('sound', '')
+        if self.action == 'list' and sound_id.isdigit():
+            return [sound_scope(int(sound_id))]
+        return [SOUND_LIST_SCOPE]
+
     def get_queryset(self):
-        queryset = Comment.objects.all()
+        queryset = Comment.objects.select_related('user')
         sound_id = self.request.query_params.get('sound', None)
         if sound_id:
             queryset = queryset.filter(sound_id=sound_id)
@@ -147,9 +201,14 @@ class FavoriteViewSet(viewsets.ModelViewSet):
     """
     serializer_class = FavoriteSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user).select_related('sound', 'user')
+        return (
+            Favorite.objects.filter(user=self.request.user)
+            .select_related('sound__uploaded_by', 'user')
+            .prefetch_related('sound__tags')
+        )
 
     def perform_create(self, serializer):
         # Get sound from validated_data (PrimaryKeyRelatedField converts ID to object)
@@ -185,6 +244,82 @@ class FavoriteViewSet(viewsets.ModelViewSet):
             )
 
 
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    ViewSet for resumable audio uploads (protocol in sounds.uploads).
+    - Create/Retrieve/List/Delete: Admin only, own sessions
+    - PUT: append a chunk (raw body + Content-Range)
+    - finalize: verify and attach the file to a sound
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = UploadSession.objects.filter(user=self.request.user)
+        if self.action == 'finalize':
+            # Finalizes of one session run one after the other (see finalize)
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def perform_create(self, serializer):
+        # Opening a session is a natural point to collect abandoned ones
+        purge_expired_sessions()
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard(instance)
+
+    def update(self, request, pk=None):
+        """Append one chunk; the request body is streamed straight to disk."""
+        session = self.get_object()
+        try:
+            offset = write_chunk(session, request.stream, request.META.get('HTTP_CONTENT_RANGE'))
+        except OffsetMismatch as exc:
+            return Response({'error': str(exc), 'offset': exc.offset}, status=status.HTTP_409_CONFLICT)
+        except UploadError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'id': session.pk, 'offset': offset, 'size': session.size})
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Verify the checksum and attach the file to a new or existing sound."""
+        target = UploadFinalizeSerializer(data=request.data)
+        target.is_valid(raise_exception=True)
+        # The session row stays locked until the sound is saved and the session
+        # deleted; a retry that overlapped then finds it gone (404)
+        with transaction.atomic():
+            session = self.get_object()
+            return self.finalize_session(request, session, target.validated_data)
+
+    def finalize_session(self, request, session, data):
+        try:
+            verify_complete(session)
+        except UploadError as exc:
+            return Response(
+                {'error': str(exc), 'offset': exc.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        sound = data.get('sound') or Sound(uploaded_by=request.user)
+        for field in ('name', 'description'):
+            if field in data:
+                setattr(sound, field, data[field])
+        created = sound.pk is None
+        attach_to_sound(session, sound)
+        try:
+            if 'tags' in data:
+                sound.tags.set(data['tags'])
+            body = SoundDetailSerializer(sound, context={'request': request}).data
+        except Exception:
+            # The transaction rolls back to the open session; drop the stored copy
+            sound.mp3_file.storage.delete(sound.mp3_file.name)
+            raise
+
+        return Response(body, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def whoami(request):
@@ -197,3 +332,51 @@ def whoami(request):
             "timestamp_utc": datetime.now(timezone.utc).isoformat(),
         }
     )
+
+
+@require_safe
+def prometheus_metrics(request):
+    """
+    Prometheus text exposition of ``soundvault_backend.metrics``, summed over
+    all worker processes. A plain Django view so scrapes are not throttled.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    elif not settings.DEBUG:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_safe
+def sound_audio(request, pk):
+    """
+    Stream a sound's MP3 with Range/If-Range support (see sounds.media).
+
+    A plain Django view: audio is public, and players issue many range
+    requests per track, which must not count against the API throttles.
+    """
+    sound = get_object_or_404(Sound.objects.only('mp3_file'), pk=pk)
+    if not sound.mp3_file:
+        raise Http404('Sound has no audio file')
+    return serve_field_file(request, sound.mp3_file)
+
+
+@require_safe
+def image_variant(request, image_hash, width, ext):
+    """
+    Serve a resized image variant, generating it on first request. Names are
+    content-addressed (see sounds.images), so responses are immutable.
+    """
+    width = int(width)
+    sound = (
+        Sound.objects.filter(image_hash=image_hash)
+        .only('image', 'image_hash', 'image_width')
+        .first()
+    )
+    if sound is None or ext not in VARIANT_FORMATS or width not in variant_widths(sound.image_width):
+        raise Http404('Unknown image variant')
+    name = ensure_variant(sound, width, ext)
+    return serve_stored_file(request, default_storage, name, immutable=True)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'soundvault_backend.settings')
+# Serve the hot catalog reads with the native async views (see asgi_urls)
+os.environ.setdefault('ASYNC_READ_API', 'True')
 
 application = get_asgi_application()
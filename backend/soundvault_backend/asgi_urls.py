@@ -0,0 +1,44 @@
+"""
+URL configuration for ASGI deployments (``ASYNC_READ_API``).
+
+The hot catalog reads are served natively async by ``sounds.async_views``;
+the same URLs keep their sync viewset for every other method, and all other
+routes come from ``soundvault_backend.urls``.
+"""
+from django.urls import path
+
+from sounds.async_views import async_read_view
+from sounds.auth_views import AsyncMeView, me
+from sounds.views import CommentViewSet, SoundViewSet, TagViewSet
+
+from .urls import urlpatterns as sync_urlpatterns
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+
+def catalog_views(viewset, basename):
+    return (
+        async_read_view(
+            viewset, {'get': 'list'}, viewset.as_view(LIST_ACTIONS, basename=basename, detail=False),
+            basename=basename, detail=False,
+        ),
+        async_read_view(
+            viewset, {'get': 'retrieve'}, viewset.as_view(DETAIL_ACTIONS, basename=basename, detail=True),
+            basename=basename, detail=True,
+        ),
+    )
+
+
+sound_list, sound_detail = catalog_views(SoundViewSet, 'sound')
+tag_list, tag_detail = catalog_views(TagViewSet, 'tag')
+comment_list, _ = catalog_views(CommentViewSet, 'comment')
+
+urlpatterns = [
+    path('api/sounds/', sound_list, name='sound-list'),
+    path('api/sounds/<int:pk>/', sound_detail, name='sound-detail'),
+    path('api/tags/', tag_list, name='tag-list'),
+    path('api/tags/<int:pk>/', tag_detail, name='tag-detail'),
+    path('api/comments/', comment_list, name='comment-list'),
+    path('api/auth/me/', async_read_view(AsyncMeView, {'get': 'get'}, me), name='me'),
+] + sync_urlpatterns
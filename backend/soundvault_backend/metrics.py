@@ -0,0 +1,283 @@
+"""
+Lightweight metrics registry with Prometheus text exposition.
+
+Samples are keyed by name plus a sorted tuple of label pairs. Counters and
+gauges hold one float per key; a histogram is stored as one non-cumulative
+counter per bucket plus ``_sum`` and ``_count``, so an observation costs
+three updates and the buckets are accumulated only when rendered.
+
+By default values live in a per-process dict guarded by a single lock. When
+``METRICS_MULTIPROC_DIR`` is set, each process instead writes its values
+into its own memory-mapped file in that directory (``metrics-<pid>.db``);
+``render`` sums the files of every process, skipping gauges of processes
+that are no longer running. The directory should be emptied when the
+server starts (see ``clear_multiprocess_dir``).
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_store = None
+_metadata = {}
+
+
+def describe(name, kind, documentation='', buckets=None):
+    """Register ``name`` as a ``counter``, ``gauge`` or ``histogram``."""
+    if kind == 'histogram':
+        buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+    _metadata[name] = (kind, documentation, buckets)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.values = defaultdict(float)
+
+    def add(self, key, value):
+        self.values[key] += value
+
+    def get(self, key):
+        return self.values.get(key, 0)
+
+    def collect(self):
+        return [(os.getpid(), dict(self.values))]
+
+    def clear(self):
+        self.values.clear()
+
+
+class _FileStore:
+    """
+    This process's values in an mmap'd file. Layout: an 8-byte header holding
+    the number of bytes in use, then entries of ``<key length><JSON key>``
+    padded to 8 bytes and followed by a float64 value.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, directory, pid=None):
+        self.directory = directory
+        self.pid = pid or os.getpid()
+        self.path = os.path.join(directory, f'metrics-{self.pid}.db')
+        self.offsets = {}
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a+b')
+        if os.path.getsize(self.path) == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self.used = struct.unpack_from('<Q', self._map, 0)[0] or 8
+        for key, _, offset in _read_entries(self._map, self.used):
+            self.offsets[key] = offset
+
+    def _allocate(self, key):
+        encoded = json.dumps([key[0], list(key[1])]).encode()
+        header = struct.pack('<I', len(encoded)) + encoded
+        header += b' ' * (-len(header) % 8)
+        needed = self.used + len(header) + 8
+        if needed > len(self._map):
+            size = len(self._map)
+            while size < needed:
+                size *= 2
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map[self.used:self.used + len(header)] = header
+        offset = self.used + len(header)
+        struct.pack_into('<d', self._map, offset, 0.0)
+        self.used = needed
+        # Publish the entry only once it is fully written
+        struct.pack_into('<Q', self._map, 0, self.used)
+        self.offsets[key] = offset
+        return offset
+
+    def add(self, key, value):
+        offset = self.offsets.get(key)
+        if offset is None:
+            offset = self._allocate(key)
+        current = struct.unpack_from('<d', self._map, offset)[0]
+        struct.pack_into('<d', self._map, offset, current + value)
+
+    def get(self, key):
+        offset = self.offsets.get(key)
+        return struct.unpack_from('<d', self._map, offset)[0] if offset is not None else 0
+
+    def collect(self):
+        result = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.db')):
+            try:
+                pid = int(os.path.basename(path)[len('metrics-'):-len('.db')])
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except (OSError, ValueError):
+                continue
+            if len(data) < 8:
+                continue
+            used = struct.unpack_from('<Q', data, 0)[0]
+            result.append((pid, {key: value for key, value, _ in _read_entries(data, used)}))
+        return result
+
+    def clear(self):
+        for offset in self.offsets.values():
+            struct.pack_into('<d', self._map, offset, 0.0)
+
+
+def _read_entries(buffer, used):
+    position = 8
+    while position + 4 <= used:
+        length = struct.unpack_from('<I', buffer, position)[0]
+        raw = bytes(buffer[position + 4:position + 4 + length])
+        position += 4 + length
+        position += -position % 8
+        name, labels = json.loads(raw)
+        value = struct.unpack_from('<d', buffer, position)[0]
+        yield (name, tuple(tuple(pair) for pair in labels)), value, position
+        position += 8
+
+
+def _get_store():
+    """Return this process's store, reopening it after a fork or setting change."""
+    global _store
+    from django.conf import settings
+
+    directory = getattr(settings, 'METRICS_MULTIPROC_DIR', '') if settings.configured else ''
+    store = _store
+    if store is not None and (
+        (directory and isinstance(store, _FileStore) and store.directory == directory
+         and store.pid == os.getpid())
+        or (not directory and isinstance(store, _MemoryStore))
+    ):
+        return store
+    _store = _FileStore(directory) if directory else _MemoryStore()
+    return _store
+
+
+def increment(name, value=1, **labels):
+    """Add ``value`` to the counter ``name`` with the given labels."""
+    key = _key(name, labels)
+    with _lock:
+        _get_store().add(key, value)
+
+
+def gauge_add(name, delta, **labels):
+    """Move the gauge ``name`` up or down by ``delta``."""
+    increment(name, delta, **labels)
+
+
+def observe(name, value, **labels):
+    """Record ``value`` in the histogram ``name`` (see ``describe``)."""
+    buckets = _metadata[name][2]
+    bound = next((_format_value(edge) for edge in buckets if value <= edge), '+Inf')
+    base = tuple(sorted(labels.items()))
+    with _lock:
+        store = _get_store()
+        store.add((f'{name}_bucket', tuple(sorted(base + (('le', bound),)))), 1)
+        store.add((f'{name}_sum', base), value)
+        store.add((f'{name}_count', base), 1)
+
+
+def get_value(name, **labels):
+    with _lock:
+        return _get_store().get(_key(name, labels))
+
+
+def snapshot():
+    """Return every value, summed across processes, as ``{(name, labels): value}``."""
+    with _lock:
+        per_process = _get_store().collect()
+    totals = defaultdict(float)
+    for pid, values in per_process:
+        alive = _pid_alive(pid)
+        for key, value in values.items():
+            if alive or _metadata.get(key[0], ('counter',))[0] != 'gauge':
+                totals[key] += value
+    return dict(totals)
+
+
+def reset():
+    with _lock:
+        _get_store().clear()
+
+
+def clear_multiprocess_dir(directory):
+    """Remove the files of previous server runs; call before workers start."""
+    for path in glob.glob(os.path.join(directory, 'metrics-*.db')):
+        os.remove(path)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        base = name[:-len(suffix)]
+        if name.endswith(suffix) and _metadata.get(base, ('',))[0] == 'histogram':
+            return base
+    return name
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    families = defaultdict(list)
+    for (name, labels), value in snapshot().items():
+        families[_family(name)].append((name, labels, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, documentation, buckets = _metadata.get(family, ('untyped', '', None))
+        if documentation:
+            lines.append(f'# HELP {family} {documentation}')
+        lines.append(f'# TYPE {family} {kind}')
+        samples = sorted(families[family])
+        if kind != 'histogram':
+            lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}' for name, labels, value in samples)
+            continue
+
+        bucket_counts = defaultdict(dict)
+        for name, labels, value in samples:
+            if name.endswith('_bucket'):
+                le = dict(labels)['le']
+                bucket_counts[tuple(pair for pair in labels if pair[0] != 'le')][le] = value
+        for base, counts in sorted(bucket_counts.items()):
+            running = 0
+            for edge in [_format_value(edge) for edge in buckets] + ['+Inf']:
+                running += counts.get(edge, 0)
+                lines.append(f'{family}_bucket{_format_labels(base + (("le", edge),))} {_format_value(running)}')
+        lines.extend(
+            f'{name}{_format_labels(labels)} {_format_value(value)}'
+            for name, labels, value in samples if not name.endswith('_bucket')
+        )
+    return '\n'.join(lines) + '\n'
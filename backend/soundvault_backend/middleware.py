@@ -1,17 +1,133 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+
+timing_logger = logging.getLogger("request_timing")
+
+metrics.describe("http_requests_in_flight", "gauge", "Requests currently being handled.")
+metrics.describe("http_responses_total", "counter", "Responses by route, method and status code.")
+metrics.describe(
+    "http_request_duration_seconds", "histogram", "Request latency by route and method."
+)
+metrics.describe(
+    "http_request_db_queries", "histogram", "SQL queries per request by route.",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+metrics.describe("throttle_rejections_total", "counter", "Requests rejected with 429 by route.")
+
+# Callbacks ``(sql, seconds)`` interested in the current request's queries.
+# A context variable rather than per-connection state, so queries that the
+# async ORM runs on a worker thread are attributed to the right request.
+_query_observers = contextvars.ContextVar("query_observers", default=())
+
+
+def _notify_query_observers(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for observer in observers:
+            observer(sql, elapsed)
+
 
+def _install_query_hook(connection, **kwargs):
+    if _notify_query_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _notify_query_observers)
 
-class SecurityHeadersMiddleware:
+
+def enable_query_observation():
+    """Hook every current and future connection; called by middleware that observes queries."""
+    connection_created.connect(_install_query_hook, dispatch_uid="observe-queries")
+    for connection in connections.all(initialized_only=True):
+        _install_query_hook(connection)
+
+
+@contextmanager
+def observe_queries(callback):
+    """Report every query run while the block is active, on any thread, to ``callback``."""
+    for connection in connections.all(initialized_only=True):
+        _install_query_hook(connection)
+    token = _query_observers.set(_query_observers.get() + (callback,))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+class AsyncCapableMiddleware:
     """
-    Add selected security headers without introducing extra dependencies.
+    Base for middleware that runs natively in both modes: under ASGI the
+    chain stays async instead of hopping into a thread for each middleware.
+    Subclasses implement ``before(request)`` and ``after(request, response, state)``.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.before(request)
+        try:
+            with self.observing(state):
+                response = self.get_response(request)
+        except BaseException:
+            self.abort(request, state)
+            raise
+        return self.after(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.before(request)
+        try:
+            with self.observing(state):
+                response = await self.get_response(request)
+        except BaseException:
+            self.abort(request, state)
+            raise
+        return self.after(request, response, state)
 
+    def before(self, request):
+        return None
+
+    @contextmanager
+    def observing(self, state):
+        yield
+
+    def abort(self, request, state):
+        """Called instead of ``after`` when the inner chain raised."""
+
+    def after(self, request, response, state):
+        return response
+
+
+class SecurityHeadersMiddleware(AsyncCapableMiddleware):
+    """
+    Add selected security headers without introducing extra dependencies.
+    """
+
+    def after(self, request, response, state):
         csp_policy = getattr(settings, "CONTENT_SECURITY_POLICY", None)
         if csp_policy:
             response.setdefault("Content-Security-Policy", csp_policy)
@@ -29,3 +145,164 @@ class SecurityHeadersMiddleware:
         response.setdefault("X-Content-Type-Options", "nosniff")
 
         return response
+
+
+class RequestTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Measure where a request's time goes and report it in ``Server-Timing``.
+
+    Every query the request runs, on any connection or thread, is reported
+    through ``observe_queries``, which counts it and adds up its duration. Queries whose
+    SQL text (before parameter binding) repeats ``REQUEST_TIMING_REPEAT_THRESHOLD``
+    or more times are reported as a likely N+1. The view is timed from
+    ``process_view`` to ``process_template_response`` (or the returned
+    response), and rendering from there to the end of the middleware chain.
+
+    A ``REQUEST_TIMING_LOG_SAMPLE_RATE`` fraction of requests is logged as
+    JSON to the ``request_timing`` logger, at WARNING when a query repeats.
+    When ``REQUEST_TIMING_ENABLED`` is off the middleware removes itself from
+    the chain at startup.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, "REQUEST_TIMING_LOG_SAMPLE_RATE", 0.0)
+        self.repeat_threshold = getattr(settings, "REQUEST_TIMING_REPEAT_THRESHOLD", 3)
+        enable_query_observation()
+
+    def before(self, request):
+        stats = _RequestStats()
+        request._timing_stats = stats
+        return stats
+
+    def observing(self, stats):
+        return observe_queries(stats.record_query)
+
+    def after(self, request, response, stats):
+        stats.finish()
+        repeated = stats.repeated_queries(self.repeat_threshold)
+        response["Server-Timing"] = stats.server_timing(repeated)
+        if self.sample_rate and random.random() < self.sample_rate:
+            level = logging.WARNING if repeated else logging.INFO
+            timing_logger.log(level, stats.as_json(request, response, repeated))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_stats.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Runs after the view returns and before the response is rendered
+        request._timing_stats.view_finished = time.perf_counter()
+        return response
+
+
+class _RequestStats:
+    """Timings and query counts for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_finished = self.finished = None
+        self.query_count = 0
+        self.query_time = 0.0
+        self.statements = Counter()
+
+    def record_query(self, sql, seconds):
+        self.query_time += seconds
+        self.query_count += 1
+        self.statements[sql] += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = self.finished
+
+    def repeated_queries(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def durations(self):
+        """Milliseconds spent in the database, the view, rendering and in total."""
+        view = render = 0.0
+        if self.view_started is not None:
+            view = self.view_finished - self.view_started
+            render = self.finished - self.view_finished
+        return {
+            "db": self.query_time * 1000,
+            "view": view * 1000,
+            "render": render * 1000,
+            "total": (self.finished - self.started) * 1000,
+        }
+
+    def server_timing(self, repeated):
+        durations = self.durations()
+        entries = [
+            f'db;dur={durations["db"]:.1f};desc="{self.query_count} queries"',
+            f'view;dur={durations["view"]:.1f}',
+            f'render;dur={durations["render"]:.1f}',
+            f'total;dur={durations["total"]:.1f}',
+        ]
+        if repeated:
+            entries.append(f'n-plus-one;desc="{repeated[0][1]}x same query"')
+        return ", ".join(entries)
+
+    def as_json(self, request, response, repeated):
+        return json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": self.query_count,
+            **{f"{name}_ms": round(value, 2) for name, value in self.durations().items()},
+            "repeated_queries": [{"sql": sql[:500], "count": count} for sql, count in repeated],
+        })
+
+
+# Clients can send any token as the method; anything else is counted as "other"
+METRIC_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Record per-route request metrics in ``soundvault_backend.metrics``:
+    in-flight requests, latency and SQL query histograms, responses by status
+    and throttle rejections. Routes are URL pattern names (``sound-list``,
+    ``login``...) and methods outside ``METRIC_METHODS`` are counted as
+    ``other``, so label values stay bounded. ``METRICS_ENABLED`` removes the
+    middleware at startup.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        enable_query_observation()
+
+    def before(self, request):
+        metrics.gauge_add("http_requests_in_flight", 1)
+        return {"started": time.perf_counter(), "queries": 0}
+
+    def observing(self, state):
+        def count_query(sql, seconds):
+            state["queries"] += 1
+
+        return observe_queries(count_query)
+
+    def abort(self, request, state):
+        metrics.gauge_add("http_requests_in_flight", -1)
+
+    def after(self, request, response, state):
+        metrics.gauge_add("http_requests_in_flight", -1)
+        match = getattr(request, "resolver_match", None)
+        route = (match.url_name if match else None) or "unmatched"
+        method = request.method if request.method in METRIC_METHODS else "other"
+        metrics.observe(
+            "http_request_duration_seconds", time.perf_counter() - state["started"],
+            route=route, method=method,
+        )
+        metrics.observe("http_request_db_queries", state["queries"], route=route)
+        metrics.increment(
+            "http_responses_total", route=route, method=method, status=str(response.status_code)
+        )
+        if response.status_code == 429:
+            metrics.increment("throttle_rejections_total", route=route)
+        return response
@@ -0,0 +1,294 @@
+"""
+On-disk index over the JSON-lines security log (``security_log``).
+
+Each log segment (the active ``security.log`` and its rotated, possibly
+gzipped, segments) gets an index file of fixed-size binary entries:
+event time, byte offset and length of the line, and the ids of its client
+IP, username and event type. The strings behind the ids are kept once, in
+``strings.json``. An entry is 30 bytes, against a few hundred for the JSON
+line.
+
+Indexing is incremental. Every ``update`` appends the lines written since
+the previous one as a new run, sorted by time, and records the run's time
+range in ``manifest.json``. Once a segment has been rotated out its runs
+are merged into one. Segments are identified by a hash of their first
+line, which survives rotation and compression. Indexes of segments that
+were deleted are dropped.
+
+A time-range query memory-maps the index files. It skips runs whose time
+range does not overlap the query, and binary-searches the others for the
+first entry in range. IP, username and event filters, and counts by those
+fields per minute or hour, are answered from the index alone. Only the
+matching lines are read back from the log.
+"""
+import bisect
+import gzip
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+from collections import Counter
+from datetime import datetime, timezone
+
+from soundvault_backend.security_log import FileLock, log_segments
+
+# time (ms since the epoch), line offset, line length, ip id, username id, event id
+ENTRY = struct.Struct('<qQIIIH')
+FIELDS = ('ip', 'username', 'event')
+BUCKETS = {'minute': 60 * 1000, 'hour': 60 * 60 * 1000, 'day': 24 * 60 * 60 * 1000}
+
+
+def _open_segment(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _write_json(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as output:
+        json.dump(data, output)
+    os.replace(temporary, path)
+
+
+class _RunTimes:
+    """Sequence view of the times of one run, for ``bisect``."""
+
+    def __init__(self, buffer, start, end):
+        self.buffer, self.start, self.end = buffer, start, end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, position):
+        return ENTRY.unpack_from(self.buffer, (self.start + position) * ENTRY.size)[0]
+
+
+class SecurityLogIndex:
+    def __init__(self, log_path, index_dir):
+        self.log_path = os.fspath(log_path)
+        self.index_dir = os.fspath(index_dir)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.manifest_path = os.path.join(self.index_dir, 'manifest.json')
+        self.strings_path = os.path.join(self.index_dir, 'strings.json')
+        self._reload()
+
+    def _reload(self):
+        self.manifest = self._load(self.manifest_path, {'segments': {}})
+        self.strings = self._load(self.strings_path, {field: [] for field in FIELDS})
+        self.ids = {field: {value: number for number, value in enumerate(values, 1)}
+                    for field, values in self.strings.items()}
+
+    @staticmethod
+    def _load(path, default):
+        try:
+            with open(path, encoding='utf-8') as source:
+                return json.load(source)
+        except FileNotFoundError:
+            return default
+
+    def _index_file(self, key):
+        return os.path.join(self.index_dir, f'{key}.idx')
+
+    # Indexing
+
+    @staticmethod
+    def segment_key(path):
+        """Hash of the segment's first line, or None while it has no complete line."""
+        with _open_segment(path) as source:
+            first = source.readline()
+        if not first.endswith(b'\n'):
+            return None
+        return hashlib.blake2b(first, digest_size=12).hexdigest()
+
+    def _intern(self, field, value):
+        if value is None:
+            return 0
+        value = str(value)
+        number = self.ids[field].get(value)
+        if number is None:
+            self.strings[field].append(value)
+            number = self.ids[field][value] = len(self.strings[field])
+        return number
+
+    def _read_entries(self, path, offset):
+        entries = []
+        with _open_segment(path) as source:
+            source.seek(offset)
+            for line in source:
+                if not line.endswith(b'\n'):
+                    break  # still being written
+                try:
+                    event = json.loads(line)
+                    millis = int(datetime.fromisoformat(event['time']).timestamp() * 1000)
+                except (ValueError, KeyError, TypeError):
+                    offset += len(line)
+                    continue
+                entries.append((millis, offset, len(line), *(self._intern(field, event.get(field)) for field in FIELDS)))
+                offset += len(line)
+        return entries, offset
+
+    def update(self):
+        """Index what was written since the last update; return the number of new entries."""
+        with FileLock(os.path.join(self.index_dir, 'update.lock')):
+            # Another update may have finished while this one waited for the lock
+            self._reload()
+            return self._update()
+
+    def _update(self):
+        segments = self.manifest['segments']
+        files = log_segments(self.log_path)
+        if os.path.exists(self.log_path):
+            files.append(self.log_path)
+        seen, added = set(), 0
+        for path in files:
+            try:
+                key = self.segment_key(path)
+            except FileNotFoundError:  # rotated or compressed meanwhile; found again next time
+                continue
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            segment = segments.setdefault(key, {'indexed': 0, 'runs': [], 'complete': False})
+            segment['path'] = path
+            if segment['complete']:
+                continue
+            entries, segment['indexed'] = self._read_entries(path, segment['indexed'])
+            if entries:
+                added += len(entries)
+                self._append_run(key, segment, entries)
+            if path != self.log_path:
+                # Rotated out: nothing more will be appended
+                segment['complete'] = True
+                self._merge_runs(key, segment)
+
+        for key in set(segments) - seen:
+            if not os.path.exists(segments[key]['path']) and not self._still_present(segments[key]['path']):
+                del segments[key]
+                try:
+                    os.remove(self._index_file(key))
+                except FileNotFoundError:
+                    pass
+        _write_json(self.strings_path, self.strings)
+        _write_json(self.manifest_path, self.manifest)
+        return added
+
+    @staticmethod
+    def _still_present(path):
+        # The plain segment may have become ``.gz`` since it was indexed
+        return os.path.exists(f'{path}.gz')
+
+    def _append_run(self, key, segment, entries):
+        entries.sort()
+        with open(self._index_file(key), 'ab') as index:
+            start = index.tell() // ENTRY.size
+            index.write(b''.join(ENTRY.pack(*entry) for entry in entries))
+        segment['runs'].append([start, start + len(entries), entries[0][0], entries[-1][0]])
+
+    def _merge_runs(self, key, segment):
+        if len(segment['runs']) < 2:
+            return
+        with open(self._index_file(key), 'rb') as index:
+            data = index.read()
+        # Only entries of recorded runs: an interrupted update may have left others
+        entries = sorted(
+            entry for start, end, _, _ in segment['runs']
+            for entry in ENTRY.iter_unpack(data[start * ENTRY.size:end * ENTRY.size])
+        )
+        with open(f'{self._index_file(key)}.tmp', 'wb') as index:
+            index.write(b''.join(ENTRY.pack(*entry) for entry in entries))
+        os.replace(f'{self._index_file(key)}.tmp', self._index_file(key))
+        segment['runs'] = [[0, len(entries), entries[0][0], entries[-1][0]]]
+
+    # Queries
+
+    def _filter_ids(self, filters):
+        """Field position -> id for the given filters; None if a value was never seen."""
+        wanted = {}
+        for position, field in enumerate(FIELDS):
+            value = filters.get(field)
+            if value is not None:
+                number = self.ids[field].get(str(value))
+                if number is None:
+                    return None
+                wanted[3 + position] = number
+        return wanted
+
+    def _scan_run(self, key, buffer, run, since, until, wanted):
+        start, end, first, last = run
+        if (since is not None and last < since) or (until is not None and first >= until):
+            return
+        position = start
+        if since is not None:
+            position = start + bisect.bisect_left(_RunTimes(buffer, start, end), since)
+        for position in range(position, end):
+            entry = ENTRY.unpack_from(buffer, position * ENTRY.size)
+            if until is not None and entry[0] >= until:
+                return
+            if all(entry[index] == number for index, number in wanted.items()):
+                yield entry[0], key, entry
+
+    def entries(self, since=None, until=None, **filters):
+        """
+        Matching entries in time order, as ``(time_ms, segment_key, entry)``.
+        ``since`` and ``until`` are datetimes (``until`` exclusive); the
+        filters are ``ip``, ``username`` and ``event``.
+        """
+        wanted = self._filter_ids(filters)
+        if wanted is None:
+            return
+        since = int(since.timestamp() * 1000) if since else None
+        until = int(until.timestamp() * 1000) if until else None
+        maps, runs = [], []
+        try:
+            for key, segment in self.manifest['segments'].items():
+                path = self._index_file(key)
+                if not segment['runs'] or not os.path.getsize(path):
+                    continue
+                with open(path, 'rb') as index:
+                    buffer = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+                maps.append(buffer)
+                runs.extend(self._scan_run(key, buffer, run, since, until, wanted) for run in segment['runs'])
+            yield from heapq.merge(*runs, key=lambda item: item[0])
+        finally:
+            for buffer in maps:
+                buffer.close()
+
+    def events(self, since=None, until=None, limit=None, **filters):
+        """The matching log lines, parsed, in time order."""
+        sources = {}
+        try:
+            for count, (_, key, entry) in enumerate(self.entries(since, until, **filters)):
+                if limit is not None and count >= limit:
+                    break
+                source = sources.get(key)
+                if source is None:
+                    source = sources[key] = _open_segment(self.manifest['segments'][key]['path'])
+                source.seek(entry[1])
+                yield json.loads(source.read(entry[2]))
+        finally:
+            for source in sources.values():
+                source.close()
+
+    def count(self, by=(), per=None, since=None, until=None, **filters):
+        """
+        Count matching events by the ``by`` fields and, with ``per``
+        (``minute``, ``hour`` or ``day``), by time bucket. Keys are tuples:
+        the bucket start (a datetime) first when ``per`` is given, then the
+        field values.
+        """
+        positions = [3 + FIELDS.index(field) for field in by]
+        width = BUCKETS[per] if per else None
+        counts = Counter()
+        for millis, _, entry in self.entries(since, until, **filters):
+            bucket = (millis - millis % width,) if width else ()
+            counts[bucket + tuple(entry[position] for position in positions)] += 1
+        result = Counter()
+        for key, value in counts.items():
+            bucket = (datetime.fromtimestamp(key[0] / 1000, timezone.utc),) if width else ()
+            names = tuple(self._string(field, number) for field, number in zip(by, key[len(bucket):]))
+            result[bucket + names] = value
+        return result
+
+    def _string(self, field, number):
+        return self.strings[field][number - 1] if number else None
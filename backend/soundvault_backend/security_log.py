@@ -0,0 +1,283 @@
+"""
+Security event logging off the request path.
+
+Records sent to the ``security`` logger are put on a bounded in-memory
+queue by ``SecurityLogHandler``; that is all a request thread does. A
+background thread in each process takes them off the queue in batches,
+formats them as JSON lines and writes each batch with one ``write``.
+
+The log file is rotated when it reaches ``max_bytes`` or when a
+``rotate_interval`` boundary passes. Rotated segments are named
+``security.log.<UTC time of rotation>`` and gzipped in the background when
+``compress`` is set; the oldest are deleted beyond ``backup_count``.
+Server processes share the file: rotation happens under a lock file, and a
+process that finds the file already rotated just reopens it.
+
+When the queue is full (the disk cannot keep up with an attack, say),
+records are dropped rather than blocking requests, and counted in
+``security_log_dropped_total``.
+
+``security_event`` logs an event with the fields the security log is
+searched by: ``event``, ``ip`` and ``username``.
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+from soundvault_backend import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single development server, nothing to coordinate
+    fcntl = None
+
+logger = logging.getLogger('security')
+
+metrics.describe('security_log_queue_depth', 'gauge', 'Security log records waiting to be written.')
+metrics.describe('security_log_written_total', 'counter', 'Security log records written to disk.')
+metrics.describe('security_log_dropped_total', 'counter', 'Security log records dropped because the queue was full.')
+
+_STOP = object()
+
+
+def security_event(event, request=None, username=None, message='', level=logging.WARNING, **fields):
+    """Log a security ``event`` with the client IP of ``request`` and extra JSON ``fields``."""
+    # Imported here: this module is loaded while logging is configured, before apps
+    from rest_framework.throttling import BaseThrottle
+
+    if username is None and request is not None:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            username = user.username
+    logger.log(level, message or event, extra={'security': {
+        'event': event,
+        'ip': BaseThrottle().get_ident(request) if request is not None else None,
+        'username': username,
+        **fields,
+    }})
+
+
+class JSONLineFormatter(logging.Formatter):
+    """One JSON object per record: time, level, event, ip, username, message and extra fields."""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': 'log',
+            'ip': None,
+            'username': None,
+            **getattr(record, 'security', {}),
+            'message': record.getMessage(),
+        }
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+def log_segments(filename):
+    """Rotated segments of the log ``filename``, oldest first (``.gz`` when compressed)."""
+    directory, base = os.path.split(os.fspath(filename))
+    prefix = f'{base}.'
+    names = sorted(
+        name for name in os.listdir(directory or '.')
+        if name.startswith(prefix) and name[len(prefix):len(prefix) + 1].isdigit()
+        and not name.endswith('.tmp')
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+class RotatingLogFile:
+    """Append-only file rotated by size and time, safe to share between processes."""
+
+    def __init__(self, filename, max_bytes=0, rotate_interval=0, backup_count=0, compress=False):
+        self.filename = os.fspath(filename)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.stream = None
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+
+    def _open(self):
+        self.stream = open(self.filename, 'a', encoding='utf-8')
+        self.period = self._period(time.time())
+
+    def _period(self, now):
+        return int(now // self.rotate_interval) if self.rotate_interval else 0
+
+    def write(self, text):
+        if self.stream is None:
+            self._open()
+        if self._rotation_due():
+            self._rotate()
+        self.stream.write(text)
+        self.stream.flush()
+
+    def _rotation_due(self):
+        if self.rotate_interval and self._period(time.time()) != self.period:
+            return True
+        return bool(self.max_bytes) and self.stream.tell() >= self.max_bytes
+
+    def _rotate(self):
+        with self._lock():
+            try:
+                current = os.stat(self.filename)
+            except FileNotFoundError:
+                current = None
+            ours = os.fstat(self.stream.fileno())
+            # Another process may have rotated it already; then only reopen
+            if current is not None and (current.st_ino, current.st_dev) == (ours.st_ino, ours.st_dev):
+                stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+                segment = f'{self.filename}.{stamp}'
+                os.rename(self.filename, segment)
+                if self.compress:
+                    threading.Thread(target=self._compress, args=(segment,), daemon=True).start()
+                self._delete_old_segments()
+            self.stream.close()
+            self._open()
+
+    def _lock(self):
+        return FileLock(f'{self.filename}.lock')
+
+    @staticmethod
+    def _compress(segment):
+        with open(segment, 'rb') as source, gzip.open(f'{segment}.gz.tmp', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.rename(f'{segment}.gz.tmp', f'{segment}.gz')
+        os.remove(segment)
+
+    def segments(self):
+        return log_segments(self.filename)
+
+    def _delete_old_segments(self):
+        if not self.backup_count:
+            return
+        segments = self.segments()
+        for path in segments[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class FileLock:
+    """Exclusive ``flock`` on ``path`` for the duration of a ``with`` block."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+class SecurityLogHandler(logging.Handler):
+    """
+    Queue records for a background writer thread. The thread starts on the
+    first record in each process, so server workers forked after logging was
+    configured get their own.
+    """
+
+    def __init__(self, filename, max_bytes=100 * 1024 ** 2, rotate_interval=86400, backup_count=30,
+                 compress=True, queue_size=10000, batch_size=500, flush_interval=1.0):
+        super().__init__()
+        self.file = RotatingLogFile(filename, max_bytes, rotate_interval, backup_count, compress)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.setFormatter(JSONLineFormatter())
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(self.queue_size)
+                # A forked worker must not write through the parent's file object
+                self.file.close()
+                self.writer = threading.Thread(target=self._run, name='security-log', daemon=True)
+                self.writer.start()
+                self._pid = os.getpid()
+
+    def emit(self, record):
+        try:
+            self._ensure_started()
+            # Resolve what cannot cross threads; the JSON is built by the writer
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = self.formatter.formatException(record.exc_info)
+                record.exc_info = None
+            self.queue.put_nowait(record)
+            metrics.gauge_add('security_log_queue_depth', 1)
+        except queue.Full:
+            metrics.increment('security_log_dropped_total')
+        except Exception:
+            self.handleError(record)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is _STOP
+            records = batch[:-1] if stopping else batch
+            if records:
+                self._write(records)
+            for _ in batch:
+                self.queue.task_done()
+            if stopping:
+                return
+
+    def _write(self, records):
+        metrics.gauge_add('security_log_queue_depth', -len(records))
+        try:
+            self.file.write(''.join(f'{self.format(record)}\n' for record in records))
+            metrics.increment('security_log_written_total', len(records))
+        except Exception:
+            for record in records:
+                self.handleError(record)
+
+    def flush(self, timeout=5.0):
+        """Wait until every record queued so far is written."""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        if self._pid == os.getpid():
+            try:
+                self.queue.put(_STOP, timeout=5)
+                self.writer.join(timeout=5)
+            except queue.Full:
+                pass
+            self._pid = None
+        self.file.close()
+        super().close()
@@ -0,0 +1,83 @@
+"""
+Worker sizing for the production application server (see ``gunicorn.conf.py``).
+
+CPU and memory are read from the container's cgroup limits when present
+(App Runner and Docker both set them), falling back to the host's CPU
+affinity and ``/proc/meminfo``. Nothing here imports Django, so the server
+configuration can size itself before the application is loaded.
+"""
+import math
+import os
+
+MIB = 1024 * 1024
+
+# Resident memory of one worker after preloading, with headroom for requests
+DEFAULT_WORKER_MEMORY_MB = 160
+# Left for the master process, the page cache and ffmpeg during uploads
+RESERVED_MEMORY_MB = 256
+THREADS_PER_WORKER = 2
+MAX_THREADS = 8
+MAX_WORKERS = 16
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit(cgroup_root='/sys/fs/cgroup'):
+    """Return the cgroup CPU quota in CPUs, or None when unlimited."""
+    cpu_max = _read(os.path.join(cgroup_root, 'cpu.max'))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(cgroup_root, 'cpu', 'cpu.cfs_quota_us'))
+    period = _read(os.path.join(cgroup_root, 'cpu', 'cpu.cfs_period_us'))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus(cgroup_root='/sys/fs/cgroup'):
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cpu_limit(cgroup_root)
+    if limit:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def available_memory(cgroup_root='/sys/fs/cgroup', meminfo='/proc/meminfo'):
+    """Return the memory available to the container in bytes, or None if unknown."""
+    for path in (os.path.join(cgroup_root, 'memory.max'),
+                 os.path.join(cgroup_root, 'memory', 'memory.limit_in_bytes')):
+        value = _read(path)
+        # cgroup v1 reports "no limit" as a huge page-aligned number
+        if value and value != 'max' and int(value) < 1 << 60:
+            return int(value)
+    for line in (_read(meminfo) or '').splitlines():
+        if line.startswith('MemTotal:'):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def size_workers(cpus, memory=None, worker_memory_mb=DEFAULT_WORKER_MEMORY_MB):
+    """
+    Return ``(workers, threads)``. Workers follow the usual ``2 * CPUs + 1``
+    but are capped by what fits in memory; threads make up the concurrency
+    that memory-capped workers lose, up to ``MAX_THREADS``.
+    """
+    wanted = min(2 * cpus + 1, MAX_WORKERS)
+    workers = wanted
+    if memory:
+        fits = (memory // MIB - RESERVED_MEMORY_MB) // worker_memory_mb
+        workers = max(1, min(wanted, fits))
+    threads = min(MAX_THREADS, math.ceil(wanted * THREADS_PER_WORKER / workers))
+    return workers, threads
@@ -46,9 +46,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'soundvault_backend.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'soundvault_backend.middleware.SecurityHeadersMiddleware',
+    'soundvault_backend.middleware.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,7 +59,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'soundvault_backend.urls'
+# ASGI deployments serve the hot catalog reads natively async (sounds.async_views);
+# asgi.py turns this on by default
+ASYNC_READ_API = config('ASYNC_READ_API', default=False, cast=bool)
+ROOT_URLCONF = 'soundvault_backend.asgi_urls' if ASYNC_READ_API else 'soundvault_backend.urls'
 
 TEMPLATES = [
     {
@@ -123,6 +128,12 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Login and register hash passwords on PASSWORD_HASH_WORKERS threads per
+# process (sounds.passwords), with up to PASSWORD_HASH_QUEUE more requests
+# waiting; past that they are refused with 503 and Retry-After.
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=2, cast=int)
+PASSWORD_HASH_QUEUE = config('PASSWORD_HASH_QUEUE', default=8, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -146,6 +157,24 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Sound audio delivery (sounds.media). Offload modes:
+# - 'x-accel-redirect': nginx serves the file from an internal location, e.g.
+#       location /protected-media/ { internal; alias /app/media/; }
+# - 'x-sendfile': Apache mod_xsendfile / lighttpd serve the absolute path
+SOUND_MEDIA_OFFLOAD = config('SOUND_MEDIA_OFFLOAD', default='')
+SOUND_MEDIA_ACCEL_PREFIX = config('SOUND_MEDIA_ACCEL_PREFIX', default='/protected-media/')
+SOUND_MEDIA_MAX_AGE = config('SOUND_MEDIA_MAX_AGE', default=60 * 60 * 24, cast=int)
+
+# Resumable chunked uploads (sounds.uploads). Keep UPLOAD_SESSION_DIR on the
+# same filesystem as MEDIA_ROOT so finished files are moved, not copied.
+UPLOAD_SESSION_DIR = config('UPLOAD_SESSION_DIR', default=str(BASE_DIR / 'upload_sessions'))
+UPLOAD_SESSION_TTL = config('UPLOAD_SESSION_TTL', default=60 * 60 * 24, cast=int)
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)
+
+# Responsive variants of Sound.image (sounds.images), generated on first request
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_QUALITY = config('IMAGE_VARIANT_QUALITY', default=80, cast=int)
+
 # Security settings for production (behind proxy like App Runner)
 # Trust proxy headers to detect HTTPS
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -197,7 +226,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'sounds.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -208,37 +237,72 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # Sliding-window counters; one atomic Redis round trip per request
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'sounds.throttling.AnonRateThrottle',
+        'sounds.throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '10/hour',
-        'user': '1000/hour',
+        'anon': config('ANON_THROTTLE_RATE', default='10/hour'),
+        'user': config('USER_THROTTLE_RATE', default='1000/hour'),
         'login': config('LOGIN_THROTTLE_RATE', default='5/min'),
     },
 }
 
-# Security logs
-
-SECURITY_LOG_DIR = BASE_DIR / "logs"
-os.makedirs(SECURITY_LOG_DIR, exist_ok=True)
+# Response cache for anonymous catalog reads (sounds.response_cache)
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Background audio analysis on upload (sounds.analysis); needs ffmpeg/ffprobe.
+# SOUND_ANALYSIS_EAGER runs it inline on commit instead of on the worker pool.
+SOUND_ANALYSIS_ENABLED = config('SOUND_ANALYSIS_ENABLED', default=True, cast=bool)
+SOUND_ANALYSIS_WORKERS = config('SOUND_ANALYSIS_WORKERS', default=2, cast=int)
+SOUND_ANALYSIS_EAGER = config('SOUND_ANALYSIS_EAGER', default=False, cast=bool)
+
+# Per-request SQL and timing instrumentation (RequestTimingMiddleware):
+# Server-Timing header, N+1 detection and a sampled JSON log
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=DEBUG, cast=bool)
+REQUEST_TIMING_LOG_SAMPLE_RATE = config('REQUEST_TIMING_LOG_SAMPLE_RATE', default=0.01, cast=float)
+REQUEST_TIMING_REPEAT_THRESHOLD = config('REQUEST_TIMING_REPEAT_THRESHOLD', default=3, cast=int)
+
+# Prometheus metrics (MetricsMiddleware, GET /metrics). Scrapes must send
+# "Authorization: Bearer $METRICS_TOKEN"; without a token the endpoint is
+# only open in DEBUG. METRICS_MULTIPROC_DIR aggregates across worker processes.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+
+# Security logs: JSON lines written by a background thread per process
+# (soundvault_backend.security_log). The file is rotated at
+# SECURITY_LOG_MAX_BYTES or every SECURITY_LOG_ROTATE_INTERVAL seconds, and
+# rotated segments are gzipped when SECURITY_LOG_COMPRESS is set. At most
+# SECURITY_LOG_QUEUE_SIZE records wait in memory; more are dropped.
+SECURITY_LOG_DIR = Path(config('SECURITY_LOG_DIR', default=str(BASE_DIR / "logs")))
+SECURITY_LOG_MAX_BYTES = config('SECURITY_LOG_MAX_BYTES', default=100 * 1024 ** 2, cast=int)
+SECURITY_LOG_ROTATE_INTERVAL = config('SECURITY_LOG_ROTATE_INTERVAL', default=60 * 60 * 24, cast=int)
+SECURITY_LOG_BACKUP_COUNT = config('SECURITY_LOG_BACKUP_COUNT', default=30, cast=int)
+SECURITY_LOG_COMPRESS = config('SECURITY_LOG_COMPRESS', default=True, cast=bool)
+SECURITY_LOG_QUEUE_SIZE = config('SECURITY_LOG_QUEUE_SIZE', default=10000, cast=int)
+# Index over the security log for manage.py security_log_query
+SECURITY_LOG_INDEX_DIR = Path(config('SECURITY_LOG_INDEX_DIR', default=str(SECURITY_LOG_DIR / "index")))
 
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {
-            "format": "[{levelname}] {asctime} {name}: {message}",
-            "style": "{",
-        },
-    },
     "handlers": {
+        "console": {
+            "level": "INFO",
+            "class": "logging.StreamHandler",
+        },
         "security_file": {
             "level": "WARNING",
-            "class": "logging.FileHandler",
+            "()": "soundvault_backend.security_log.SecurityLogHandler",
             "filename": SECURITY_LOG_DIR / "security.log",
-            "formatter": "verbose",
+            "max_bytes": SECURITY_LOG_MAX_BYTES,
+            "rotate_interval": SECURITY_LOG_ROTATE_INTERVAL,
+            "backup_count": SECURITY_LOG_BACKUP_COUNT,
+            "compress": SECURITY_LOG_COMPRESS,
+            "queue_size": SECURITY_LOG_QUEUE_SIZE,
         },
     },
     "loggers": {
@@ -247,6 +311,11 @@ LOGGING = {
             "level": "WARNING",
             "propagate": False,
         },
+        "request_timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
@@ -262,8 +331,32 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Tokens carry a hash of the password hash; changing the password revokes them
+    'CHECK_REVOKE_TOKEN': True,
+    # Checks the user from the cached row and the blacklist through a Bloom filter
+    'TOKEN_REFRESH_SERIALIZER': 'sounds.authentication.ClaimsTokenRefreshSerializer',
 }
 
+# Stateless JWT authentication (sounds.authentication): request.user comes from
+# token claims, and each process re-reads a user's row for revocation checks at
+# most once per JWT_USER_CACHE_TTL seconds (0 reads it on every request).
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=30, cast=int)
+
+# Refresh-token blacklist (sounds.token_blacklist): a Bloom filter per token
+# expiry day answers most blacklist checks without a query. It lives in Redis,
+# shared by every server process; with any other cache there is no filter and
+# every check goes to the database. The capacity
+# is blacklisted tokens per day; above it the filter sends more checks to the
+# database but never accepts a blacklisted token. Expired tokens are deleted
+# in batches at most once per TOKEN_PRUNE_INTERVAL seconds (0 disables it;
+# see also manage.py prune_tokens).
+TOKEN_BLOOM_FILTER_ENABLED = config('TOKEN_BLOOM_FILTER_ENABLED', default=True, cast=bool)
+TOKEN_BLOOM_CAPACITY = config('TOKEN_BLOOM_CAPACITY', default=200000, cast=int)
+TOKEN_BLOOM_ERROR_RATE = config('TOKEN_BLOOM_ERROR_RATE', default=0.01, cast=float)
+TOKEN_PRUNE_INTERVAL = config('TOKEN_PRUNE_INTERVAL', default=3600, cast=int)
+TOKEN_PRUNE_BATCH_SIZE = config('TOKEN_PRUNE_BATCH_SIZE', default=1000, cast=int)
+TOKEN_PRUNE_MAX_BATCHES = config('TOKEN_PRUNE_MAX_BATCHES', default=10, cast=int)
+
 # CORS settings
 # Read from environment variable, default to localhost for development
 # In production (App Runner), this will be set to the CloudFront domain
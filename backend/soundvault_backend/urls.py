@@ -2,7 +2,7 @@
 URL configuration for soundvault_backend project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
@@ -11,7 +11,11 @@ from sounds.views import (
     TagViewSet,
     CommentViewSet,
     FavoriteViewSet,
+    UploadSessionViewSet,
+    sound_audio,
+    image_variant,
     whoami,
+    prometheus_metrics,
 )
 from sounds.auth_views import register, login, logout, me
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -22,11 +26,18 @@ router.register(r'sounds', SoundViewSet, basename='sound')
 router.register(r'tags', TagViewSet, basename='tag')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'favorites', FavoriteViewSet, basename='favorite')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # API routes
+    path('api/sounds/<int:pk>/audio/', sound_audio, name='sound-audio'),
+    re_path(
+        r'^api/images/(?P<image_hash>[0-9a-f]{16})/(?P<width>[0-9]+)\.(?P<ext>webp|jpg)$',
+        image_variant,
+        name='image-variant',
+    ),
     path('api/', include(router.urls)),
     
     # Authentication routes
@@ -36,6 +47,7 @@ urlpatterns = [
     path('api/auth/me/', me, name='me'),
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/whoami/', whoami, name='whoami'),
+    path('metrics', prometheus_metrics, name='metrics'),
     
     # Note: Admin sound routes are handled by the SoundViewSet
     # POST /api/sounds/ - create (admin only)
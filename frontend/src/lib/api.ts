@@ -48,7 +48,7 @@ export interface AuthResponse {
 }
 
 export interface SoundsResponse {
-  count: number;
+  count?: number; // only present in ?page= (page-number) mode
   next: string | null;
   previous: string | null;
   results: Sound[];